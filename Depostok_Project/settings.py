@@ -41,8 +41,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # En dışta durur ki diğer ara katmanların sorguları da sayılsın (bkz. depo/instrumentation.py)
+    'depo.instrumentation.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # Seçili deponun veritabanı; DEPO_WAREHOUSE_DATABASES boşsa devre dışı (bkz. depo/routers.py)
+    'depo.routers.WarehouseMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -76,11 +80,30 @@ WSGI_APPLICATION = 'Depostok_Project.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # WAL, PRAGMA ayarları ve BEGIN IMMEDIATE işlemleri ekleyen sqlite3 arka ucu (bkz. depo/sqlite_backend)
+        'ENGINE': 'depo.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Bağlantı her istekte yeniden açılmaz; PRAGMA'lar bağlantı başına bir kez çalışır
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 20000,
+            },
+        },
     }
 }
 
+# Depo veritabanları: {depo kodu: DATABASES takma adı}. Boşsa tüm depolar 'default'ta tutulur.
+# Örnek: 'izmir' deposu için DATABASES'e 'izmir' girişi (aynı ayarlar, NAME=BASE_DIR / 'izmir.sqlite3')
+# eklenir, DEPO_WAREHOUSE_DATABASES = {'izmir': 'izmir'} yazılır ve
+# `manage.py migrate --database izmir` çalıştırılır (bkz. depo/routers.py).
+DEPO_WAREHOUSE_DATABASES = {}
+DATABASE_ROUTERS = ['depo.routers.WarehouseRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -133,6 +156,53 @@ SHORT_DATETIME_FORMAT = 'd.m.Y H:i'
 
 STATIC_URL = 'static/'
 
+# Önbellek: sürüm sayaçları ve önbelleğe alınan sonuçlar burada tutulur.
+# Birden fazla worker süreci varsa sayaçların paylaşılması için FileBasedCache kullanın.
+# Dashboard satırları ve raf blokları da ürün/raf başına birer kayıt tuttuğu için (bkz.
+# depo/fragments.py) kayıt sınırı ürün sayısının birkaç katı olmalı; varsayılan 300'dür.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'depo',
+        # Depo veritabanı seçiliyse anahtarlara onun adı katılır
+        'KEY_FUNCTION': 'depo.routers.make_cache_key',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    }
+}
+
+# Önbellek süreç içiyse (LocMemCache) sürüm sayacına bağlı kayıtlar (dashboard satırları, raf
+# blokları, stok yanıtları ve ETag'leri, referans tabloları) en fazla bu kadar saniye tutulur;
+# diğer worker süreçlerinde yapılan değişiklikler en geç bu sürede görünür (bkz. depo/versions.py)
+DEPO_LOCAL_CACHE_SECONDS = 30
+
+# Arka planda hazırlanan Excel dosyalarının klasörü ve iş parçacığı sayısı (0: istek içinde çalışır)
+DEPO_EXPORT_DIR = BASE_DIR / 'exports'
+DEPO_EXPORT_WORKERS = 2
+# Bu kadar dakikadır "hazırlanıyor" durumunda kalan iş (ör. süreç çöktüyse) yeniden kullanılmaz
+DEPO_EXPORT_STALE_MINUTES = 30
+
+# archive_ledger komutunun varsayılan ufku: bu kadar günden eski hareketler arşive taşınır
+DEPO_ARCHIVE_AFTER_DAYS = 730
+
+# Ürün seçim kutuları bu kadar üründen büyük kataloglarda arama ucundan beslenir (bkz. depo/forms.py)
+DEPO_PRODUCT_PICKER_LIMIT = 500
+
+# Tüketim analizi (bkz. depo/analytics.py): geriye bakılan gün sayısı, tedarik süresi (gün) ve
+# sipariş önerisinin karşılayacağı gün sayısı
+DEPO_CONSUMPTION_WINDOW_DAYS = 90
+DEPO_REORDER_LEAD_DAYS = 7
+DEPO_REORDER_COVER_DAYS = 30
+
+# Dashboard'a canlı stok güncellemeleri (bkz. depo/live.py). Olay kuyruğu süreç içidir ve sadece ASGI
+# altında sunulur; birden fazla worker süreciyle çalışılıyorsa kapatılmalıdır, yoksa başka sürece
+# düşen istekler diğer sürecin olaylarını göremez
+DEPO_LIVE_UPDATES = True
+
+# İstek başına sorgu sayısı/süre ölçümü: Server-Timing başlığı ve /debug/query-stats/ tablosu
+DEPO_QUERY_STATS = DEBUG
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Product, EntryTransaction, ExitTransaction, Shelf, Department, QuantityType
+from . import search
+from .models import (
+    Product, EntryTransaction, ExitTransaction, Shelf, Department, QuantityType, StockBalance, LowStockAlert, StockSnapshot,
+    ArchivedEntryTransaction, ArchivedExitTransaction, Warehouse, WarehouseStock,
+)
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -8,26 +12,102 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     ordering = ('name',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # LIKE taraması yerine arama indeksi; Türkçe harf katlama ve yazım hatası toleransı dahil
+        return search.filter_queryset(queryset, search_term), False
+
 @admin.register(EntryTransaction)
 class EntryTransactionAdmin(admin.ModelAdmin):
-    list_display = ('product', 'quantity', 'entry_date')
-    list_filter = ('entry_date', 'product')
+    list_display = ('product', 'quantity', 'warehouse', 'entry_date', 'is_opening_balance')
+    list_filter = ('entry_date', 'is_opening_balance', 'warehouse', 'product')
     search_fields = ('product__name',)
     ordering = ('-entry_date',)
 
 @admin.register(ExitTransaction)
 class ExitTransactionAdmin(admin.ModelAdmin):
-    list_display = ('product', 'quantity', 'department', 'exit_date')
-    list_filter = ('exit_date', 'product', 'department')
+    list_display = ('product', 'quantity', 'department', 'warehouse', 'exit_date', 'is_opening_balance')
+    list_filter = ('exit_date', 'is_opening_balance', 'warehouse', 'product', 'department')
     search_fields = ('product__name', 'department__name')
     ordering = ('-exit_date',)
 
+class ArchivedMovementAdmin(admin.ModelAdmin):
+    search_fields = ('product__name',)
+    list_select_related = ('product',)
+
+    def has_add_permission(self, request):
+        # Arşiv archive_ledger komutuyla doldurulur
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedEntryTransaction)
+class ArchivedEntryTransactionAdmin(ArchivedMovementAdmin):
+    list_display = ('product', 'quantity', 'entry_date', 'archived_at')
+    ordering = ('-entry_date',)
+
+@admin.register(ArchivedExitTransaction)
+class ArchivedExitTransactionAdmin(ArchivedMovementAdmin):
+    list_display = ('product', 'quantity', 'department', 'exit_date', 'archived_at')
+    ordering = ('-exit_date',)
+
+@admin.register(StockBalance)
+class StockBalanceAdmin(admin.ModelAdmin):
+    list_display = ('product', 'total_in', 'total_out', 'on_hand', 'last_movement_at')
+    search_fields = ('product__name',)
+    ordering = ('product__name',)
+    readonly_fields = ('product', 'total_in', 'total_out', 'on_hand', 'last_movement_at')
+
+    def has_add_permission(self, request):
+        # Bakiyeler hareketlerden türetilir, elle eklenmez
+        return False
+
+@admin.register(WarehouseStock)
+class WarehouseStockAdmin(admin.ModelAdmin):
+    list_display = ('product', 'warehouse', 'total_in', 'total_out', 'on_hand')
+    list_filter = ('warehouse',)
+    search_fields = ('product__name',)
+    list_select_related = ('product', 'warehouse')
+    readonly_fields = ('product', 'warehouse', 'total_in', 'total_out', 'on_hand')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('product', 'taken_at', 'period', 'total_in', 'total_out', 'on_hand')
+    list_filter = ('period', 'taken_at')
+    search_fields = ('product__name',)
+    readonly_fields = ('product', 'taken_at', 'period', 'total_in', 'total_out', 'on_hand')
+
+    def has_add_permission(self, request):
+        # Görüntüler take_stock_snapshot komutuyla oluşturulur
+        return False
+
+@admin.register(LowStockAlert)
+class LowStockAlertAdmin(admin.ModelAdmin):
+    list_display = ('product', 'on_hand', 'minimum_quantity', 'opened_at', 'resolved_at')
+    list_filter = ('resolved_at',)
+    search_fields = ('product__name',)
+    readonly_fields = ('product', 'on_hand', 'minimum_quantity', 'opened_at', 'resolved_at')
+
+    def has_add_permission(self, request):
+        # Uyarılar stok hareketlerinden türetilir, elle eklenmez
+        return False
+
 @admin.register(Shelf)
 class ShelfAdmin(admin.ModelAdmin):
-    list_display = ('name',)
+    list_display = ('name', 'warehouse')
+    list_filter = ('warehouse',)
     search_fields = ('name',)
     ordering = ('name',)
 
+@admin.register(Warehouse)
+class WarehouseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code')
+    search_fields = ('name', 'code')
+    ordering = ('name',)
+
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ('name',)
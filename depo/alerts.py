@@ -0,0 +1,61 @@
+"""Kritik stok uyarıları.
+
+Uyarı, ürünün kalan stoğu minimum miktara eşit ya da altında olduğunda açılır (dashboard'daki
+kırmızı satır ile aynı kural) ve stok minimumun üstüne çıkınca kapanır. Her hareketten sonra
+sadece etkilenen ürünler değerlendirilir; tüm kataloğu tarayan tam kontrol reconcile() ile yapılır.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Product, LowStockAlert
+
+
+def _apply(products, open_alerts):
+    """(ürün id, stok, minimum) üçlülerine göre uyarı açar/kapatır, (açılan, kapanan) sayısını döner"""
+    now = timezone.now()
+    to_open = []
+    to_resolve = []
+    for product_id, on_hand, minimum_quantity in products:
+        below = on_hand <= minimum_quantity
+        if below and product_id not in open_alerts:
+            to_open.append(LowStockAlert(product_id=product_id, on_hand=on_hand, minimum_quantity=minimum_quantity))
+        elif not below and product_id in open_alerts:
+            to_resolve.append(open_alerts[product_id])
+
+    if to_open:
+        LowStockAlert.objects.bulk_create(to_open)
+    if to_resolve:
+        LowStockAlert.objects.filter(pk__in=to_resolve).update(resolved_at=now)
+    return len(to_open), len(to_resolve)
+
+
+def _open_alerts(product_ids=None):
+    alerts = LowStockAlert.objects.filter(resolved_at__isnull=True)
+    if product_ids is not None:
+        alerts = alerts.filter(product_id__in=product_ids)
+    return dict(alerts.values_list('product_id', 'pk'))
+
+
+def evaluate(product_ids):
+    """Sadece verilen ürünlerin uyarı durumunu günceller"""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return 0, 0
+    products = Product.objects.with_stock().filter(pk__in=product_ids).values_list('pk', 'current_stock', 'minimum_quantity')
+    return _apply(products, _open_alerts(product_ids))
+
+
+def reconcile():
+    """Tüm ürünleri tarayarak uyarıları stok durumuyla eşitler"""
+    products = Product.objects.with_stock().values_list('pk', 'current_stock', 'minimum_quantity')
+    return _apply(products.iterator(chunk_size=2000), _open_alerts())
+
+
+def open_alerts():
+    """Açık uyarıları ürünün güncel stoğuyla birlikte döner"""
+    return (
+        LowStockAlert.objects.filter(resolved_at__isnull=True)
+        .select_related('product__quantity_type')
+        .annotate(current_stock=F('product__stock_balance__on_hand'), current_minimum=F('product__minimum_quantity'))
+        .order_by('opened_at')
+    )
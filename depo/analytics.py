@@ -0,0 +1,181 @@
+"""Ürün ve departman bazında tüketim analizi ve sipariş noktası önerisi.
+
+Son DEPO_CONSUMPTION_WINDOW_DAYS günün çıkışlarından her ürünün günlük ortalama tüketimi ve günlük
+tüketiminin standart sapması hesaplanır; çıkış olmayan günler sıfır sayılır. Bunlardan:
+
+- stok yeterlilik süresi: kalan stok / günlük ortalama (gün),
+- sipariş noktası: tedarik süresi (DEPO_REORDER_LEAD_DAYS) boyunca beklenen tüketim + emniyet stoğu
+  (SERVICE_FACTOR x standart sapma x kök(tedarik süresi)),
+- önerilen sipariş miktarı: stok sipariş noktasına inmişse stoğu sipariş noktası +
+  DEPO_REORDER_COVER_DAYS günlük tüketime tamamlayan miktar.
+
+Çıkışlar tek sorguda okunur ve pandas ile (ürün, departman, gün) toplamlarına indirilir. Toplamlar
+önbellekte tutulur; sonraki çağrılarda sadece en son okunan id'den sonraki çıkışlar okunup eklenir,
+pencereden çıkan günler atılır. SQLite'ta yazmalar sıralı olduğundan id'ler onay sırasıyla artar,
+okunan en büyük id'nin altına sonradan onaylanan bir çıkış girmez. Bir çıkış değiştirildiğinde ya
+da silindiğinde CONSUMPTION sürümü artırılır ve toplamlar baştan hesaplanır (bkz. signals.py);
+önbellek süreç içiyse toplamlar en fazla DEPO_LOCAL_CACHE_SECONDS saniye tutulur (bkz. versions.py).
+Kalan stok her çağrıda bakiye tablosundan okunur.
+
+Arşivlenen hareketler (DEPO_ARCHIVE_AFTER_DAYS) pencereden çok eski olduğu için okunmaz.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .archive import movement_sources
+from .models import StockBalance
+from .versions import CONSUMPTION, cache_timeout, get_version
+
+KEY_PREFIX = 'depo:consumption:'
+TIMEOUT = 24 * 60 * 60
+
+# Normal dağılımda yaklaşık %95 hizmet düzeyi
+SERVICE_FACTOR = 1.65
+
+# Departmanı olmayan çıkışlar
+NO_DEPARTMENT = 0
+
+_LEVELS = ['product_id', 'department_id', 'day']
+
+
+def window_start(days=None):
+    """Pencerenin ilk günü (bugün dahil `days` gün)"""
+    days = days or settings.DEPO_CONSUMPTION_WINDOW_DAYS
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def read_exits(since, after_pk=0):
+    """since gününden itibaren, after_pk'den sonraki çıkışları DataFrame olarak tek sorguda okur.
+
+    Tarih metin olarak okunup pandas'ta dönüştürülür; satır başına datetime nesnesi oluşturulmaz.
+    """
+    exits = movement_sources('exit')[0][0].filter(
+        exit_date__gte=timezone.make_aware(datetime.combine(since, time.min)),
+    )
+    if after_pk:
+        exits = exits.filter(pk__gt=after_pk)
+    rows = exits.annotate(moment=Cast('exit_date', CharField())).values_list(
+        'pk', 'product_id', 'department_id', 'moment', 'quantity',
+    )
+    frame = pd.DataFrame.from_records(rows.iterator(), columns=['pk', 'product_id', 'department_id', 'moment', 'quantity'])
+    moments = pd.to_datetime(frame.pop('moment'), utc=True, format='ISO8601')
+    frame['day'] = moments.dt.tz_convert(timezone.get_current_timezone()).dt.tz_localize(None).dt.normalize()
+    # Departmansız çıkışlarda sütun None içeren object türündedir; önce sayıya çevrilir
+    frame['department_id'] = pd.to_numeric(frame['department_id']).fillna(NO_DEPARTMENT).astype('int64')
+    return frame
+
+
+def daily_totals(frame):
+    """(ürün, departman, gün) -> çıkış miktarı toplamı"""
+    return frame.groupby(_LEVELS)['quantity'].sum()
+
+
+def consumption_rates(daily, days):
+    """Ürün başına pencere toplamı, günlük ortalama ve günlük standart sapma"""
+    per_day = daily.groupby(level=['product_id', 'day']).sum().astype('float64')
+    consumed = per_day.groupby(level='product_id').sum()
+    rate = consumed / days
+    squares = (per_day ** 2).groupby(level='product_id').sum()
+    # Çıkış olmayan günler sıfır olduğu için varyans tüm günler üzerinden hesaplanır
+    std = np.sqrt((squares / days - rate ** 2).clip(lower=0))
+    return pd.DataFrame({'consumed': consumed.astype('int64'), 'daily_rate': rate, 'daily_std': std})
+
+
+def _key(days):
+    return f'{KEY_PREFIX}{get_version(CONSUMPTION)}:{days}'
+
+
+def _empty_daily():
+    index = pd.MultiIndex.from_arrays([[], [], pd.DatetimeIndex([])], names=_LEVELS)
+    return pd.Series([], index=index, dtype='int64', name='quantity')
+
+
+def consumption_state(days=None):
+    """Önbellekteki günlük toplamları yeni çıkışlarla güncelleyip döner.
+
+    {'days', 'start', 'last_pk', 'daily', 'rates', 'departments'} sözlüğü; rates ürün, departments
+    (departman, ürün) bazında pencere toplamlarıdır. Aşağıdaki rapor fonksiyonlarına verilerek aynı
+    istekte tekrar okunmaz.
+    """
+    days = days or settings.DEPO_CONSUMPTION_WINDOW_DAYS
+    key = _key(days)
+    start = window_start(days)
+    state = cache.get(key)
+    if state is None:
+        state = {'days': days, 'start': start, 'last_pk': 0, 'daily': _empty_daily(), 'rates': None}
+
+    new = read_exits(start, state['last_pk'])
+    changed = state['rates'] is None or not new.empty or state['start'] != start
+    if not new.empty:
+        state['last_pk'] = int(new['pk'].max())
+        state['daily'] = pd.concat([state['daily'], daily_totals(new)]).groupby(level=_LEVELS).sum()
+    if state['start'] != start:
+        daily = state['daily']
+        state['daily'] = daily[daily.index.get_level_values('day') >= pd.Timestamp(start)]
+        state['start'] = start
+    if changed:
+        daily = state['daily']
+        state['rates'] = consumption_rates(daily, days)
+        state['departments'] = daily.groupby(level=['department_id', 'product_id']).sum()
+        # Süreç içi önbellekte başka süreçlerin değiştirdiği/sildiği çıkışlar kısa sürede görünsün
+        cache.set(key, state, timeout=cache_timeout(TIMEOUT))
+    return state
+
+
+def product_report(product_ids=None, state=None):
+    """Ürün id indeksli tüketim ve sipariş önerisi tablosu.
+
+    Sütunlar: on_hand, consumed, daily_rate, daily_std, days_of_cover (tüketim yoksa NaN),
+    reorder_point, reorder_quantity. Tüketimi olmayan ürünler de yer alır.
+    """
+    lead = settings.DEPO_REORDER_LEAD_DAYS
+    cover = settings.DEPO_REORDER_COVER_DAYS
+    rates = (state or consumption_state())['rates']
+
+    balances = StockBalance.objects.all()
+    if product_ids is not None:
+        balances = balances.filter(product_id__in=product_ids)
+    report = pd.DataFrame.from_records(
+        balances.values_list('product_id', 'on_hand').iterator(), columns=['product_id', 'on_hand'], index='product_id',
+    )
+    report = report.join(rates, how='left')
+    report[['consumed', 'daily_rate', 'daily_std']] = report[['consumed', 'daily_rate', 'daily_std']].fillna(0)
+    report['consumed'] = report['consumed'].astype('int64')
+    on_hand = report['on_hand'].clip(lower=0)
+    rate = report['daily_rate']
+
+    report['days_of_cover'] = (on_hand / rate).where(rate > 0)
+    report['reorder_point'] = np.ceil(rate * lead + SERVICE_FACTOR * report['daily_std'] * np.sqrt(lead)).astype('int64')
+    needed = np.ceil(report['reorder_point'] + rate * cover - on_hand)
+    report['reorder_quantity'] = needed.where((rate > 0) & (on_hand <= report['reorder_point']), 0).astype('int64')
+    return report
+
+
+def department_report(state=None):
+    """Departman id indeksli tüketim tablosu: consumed, daily_rate, share, products"""
+    state = state or consumption_state()
+    days = state['days']
+    departments = state['departments']
+    grouped = departments.groupby(level='department_id')
+    report = pd.DataFrame({'consumed': grouped.sum(), 'products': grouped.size()})
+    total = report['consumed'].sum()
+    report['daily_rate'] = report['consumed'] / days
+    report['share'] = report['consumed'] / total if total else 0.0
+    return report.sort_values('consumed', ascending=False)
+
+
+def product_departments(product_ids, state=None):
+    """{ürün id: {departman id: pencere toplamı}}; çok tüketenden aza"""
+    departments = (state or consumption_state())['departments']
+    selected = departments[departments.index.get_level_values('product_id').isin(product_ids)]
+    result = {product_id: {} for product_id in product_ids}
+    for (department_id, product_id), quantity in selected.sort_values(ascending=False).items():
+        result[product_id][department_id] = int(quantity)
+    return result
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DepoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'depo'
+
+    def ready(self):
+        from . import signals  # noqa: F401
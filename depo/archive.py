@@ -0,0 +1,103 @@
+"""Eski hareketlerin arşivlenmesi.
+
+Ufuk tarihinden eski giriş/çıkışlar arşiv tablolarına taşınır; her ürünün taşınan miktarları canlı
+tablolardaki ürün ve depo başına tek bir devir kaydında (is_opening_balance) toplanır. Böylece ürünün toplam giriş,
+çıkış ve kalan stoğu değişmez, stok bakiyeleri ve doğrulama komutu arşivden habersiz çalışır.
+
+Taşıma küçük partiler halinde, her parti ayrı bir veritabanı işleminde yapılır. İşlem yarıda
+kesilirse yeniden çalıştırmak kaldığı yerden devam eder. Taşıma ve silme model sinyali göndermez;
+bakiyeler devir kayıtlarıyla korunduğu için sinyallerin çalışması zaten yanlış olurdu.
+
+Hareketin kendisine ihtiyaç duyan yerler (ürün geçmişi, dışa aktarma, geçmiş tarihli stok) devir
+kayıtlarını dışarıda bırakıp arşiv tablolarını da okur (bkz. movement_sources).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import ArchivedEntryTransaction, ArchivedExitTransaction, EntryTransaction, ExitTransaction
+from .routers import current_database
+from .versions import DATASET, bump_version
+
+BATCH_SIZE = 2000
+
+# (canlı model, arşiv modeli, tarih alanı, taşınan ek alanlar)
+TABLES = (
+    (EntryTransaction, ArchivedEntryTransaction, 'entry_date', ('warehouse_id',)),
+    (ExitTransaction, ArchivedExitTransaction, 'exit_date', ('department_id', 'warehouse_id')),
+)
+
+
+def movement_sources(kind):
+    """Bir hareket türünün gerçek hareketlerini tutan sorgular: (canlı, arşiv), tarih alanı"""
+    live, archived, date_field, _ = TABLES[0] if kind == 'entry' else TABLES[1]
+    return (live.objects.filter(is_opening_balance=False), archived.objects.all()), date_field
+
+
+def pending_count(horizon):
+    """Ufuktan eski, henüz arşivlenmemiş hareket sayısı"""
+    return sum(
+        live.objects.filter(is_opening_balance=False, **{f'{date_field}__lt': horizon}).count()
+        for live, _, date_field, _ in TABLES
+    )
+
+
+def _archive_batch(live, archived, date_field, extra_fields, horizon, batch_size):
+    rows = list(
+        live.objects.filter(is_opening_balance=False, **{f'{date_field}__lt': horizon})
+        .order_by(date_field, 'pk')
+        .values('pk', 'product_id', date_field, 'quantity', *extra_fields)[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    archived.objects.bulk_create([
+        archived(id=row['pk'], product_id=row['product_id'], quantity=row['quantity'], **{
+            date_field: row[date_field], **{field: row[field] for field in extra_fields},
+        })
+        for row in rows
+    ])
+    # Sinyal göndermeden siler; miktarlar aşağıda devir kaydına eklenir
+    live.objects.filter(pk__in=[row['pk'] for row in rows])._raw_delete(live.objects.db)
+
+    moved = defaultdict(lambda: [0, None])
+    for row in rows:
+        item = moved[row['product_id'], row['warehouse_id']]
+        item[0] += row['quantity']
+        item[1] = row[date_field] if item[1] is None else max(item[1], row[date_field])
+
+    openings = live.objects.filter(is_opening_balance=True, product_id__in={product_id for product_id, _ in moved})
+    existing = set(openings.values_list('product_id', 'warehouse_id'))
+    # auto_now_add tarihi ezdiği için yeni devir kayıtları önce oluşturulup sonra güncellenir
+    live.objects.bulk_create([
+        live(product_id=product_id, warehouse_id=warehouse_id, quantity=0, is_opening_balance=True)
+        for product_id, warehouse_id in moved if (product_id, warehouse_id) not in existing
+    ])
+    for (product_id, warehouse_id), (quantity, last_date) in moved.items():
+        # Devir kaydının tarihi arşivlenen son hareketin tarihidir; son hareket tarihi böylece korunur
+        date = Greatest(F(date_field), last_date) if (product_id, warehouse_id) in existing else last_date
+        live.objects.filter(is_opening_balance=True, product_id=product_id, warehouse_id=warehouse_id).update(
+            quantity=F('quantity') + quantity, **{date_field: date},
+        )
+    return len(rows)
+
+
+def archive_movements(horizon, batch_size=BATCH_SIZE, max_batches=None, progress=None):
+    """Ufuktan eski hareketleri partiler halinde arşivler, taşınan hareket sayısını döner"""
+    total = 0
+    batches = 0
+    for live, archived, date_field, extra_fields in TABLES:
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic(using=current_database()):
+                moved = _archive_batch(live, archived, date_field, extra_fields, horizon, batch_size)
+                if moved:
+                    transaction.on_commit(lambda: bump_version(DATASET), using=current_database())
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            if progress:
+                progress(live, moved)
+    return total
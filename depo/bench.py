@@ -0,0 +1,607 @@
+"""Performans ölçümleri.
+
+`python manage.py benchmark <ad>` ile çalıştırılır. Her ölçüm geçici bir SQLite dosyasında
+oluşturulan ayrı bir veritabanında çalışır; asıl veritabanı etkilenmez. Sonuçlar JSON'a
+çevrilebilir sözlükler olarak döner; `--output` ile kaydedilen bir önceki çalıştırmayla
+`--compare` seçeneği üzerinden karşılaştırılabilir.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection, connections, transaction
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+@contextmanager
+def scratch_database():
+    """Ölçüm süresince bağlantıyı geçici bir test veritabanına yönlendirir"""
+    directory = tempfile.mkdtemp(prefix='depo-bench-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    previous_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        # Bellek içi test veritabanı iş parçacıkları arasında gerçekçi kilitlenme davranışı göstermez
+        test_settings['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    original_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(original_name, verbosity=0)
+        test_settings['NAME'] = previous_name
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def compare(previous, current, path=''):
+    """İki ölçüm sonucunun sayısal alanlarını karşılaştırır: [(yol, önceki, şimdiki)]"""
+    if isinstance(previous, dict) and isinstance(current, dict):
+        return [
+            change for key in current if key in previous
+            for change in compare(previous[key], current[key], f'{path}.{key}' if path else str(key))
+        ]
+    if isinstance(previous, list) and isinstance(current, list):
+        return [
+            change for index, (old, new) in enumerate(zip(previous, current))
+            for change in compare(old, new, f'{path}[{index}]')
+        ]
+    numbers = (int, float)
+    if isinstance(previous, numbers) and isinstance(current, numbers) and not isinstance(current, bool) and previous != current:
+        return [(path, previous, current)]
+    return []
+
+
+def run_threads(count, target):
+    """target(index) fonksiyonunu `count` iş parçacığında çalıştırır, geçen süreyi döner"""
+    def run(index):
+        try:
+            target(index)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+@benchmark('stock_exit')
+def bench_stock_exit(threads=8, exits=50, stock=None):
+    """Eşzamanlı stok çıkışı: kilitli servis ile kilitsiz oku-kontrol et-yaz akışının karşılaştırması"""
+    from .ledger import InsufficientStock, record_exit
+    from .models import Product, EntryTransaction, ExitTransaction, StockBalance
+
+    # Varsayılan stok, isteklerin yarısını karşılar; kalan yarısı reddedilmelidir
+    stock = stock if stock is not None else threads * exits // 2
+    results = {}
+
+    def unlocked_exit(product):
+        # Eski product_exit akışı: kilit yok, kontrol ile yazma arasında yarış var
+        with transaction.atomic():
+            if product.calculated_stock < 1:
+                raise InsufficientStock(product, 1, product.calculated_stock)
+            ExitTransaction.objects.create(product=product, quantity=1)
+
+    for mode, exit_func in (('locked', lambda product: record_exit(product, 1)), ('unlocked', unlocked_exit)):
+        product = Product.objects.create(name=f'bench-{mode}')
+        EntryTransaction.objects.create(product=product, quantity=stock)
+        counts = {'accepted': 0, 'rejected': 0, 'errors': 0}
+        counts_lock = threading.Lock()
+
+        def worker(index):
+            for _ in range(exits):
+                fresh = Product.objects.get(pk=product.pk)
+                try:
+                    exit_func(fresh)
+                    outcome = 'accepted'
+                except InsufficientStock:
+                    outcome = 'rejected'
+                except Exception:
+                    outcome = 'errors'
+                with counts_lock:
+                    counts[outcome] += 1
+
+        elapsed = run_threads(threads, worker)
+        final = StockBalance.objects.get(product=product).on_hand
+        results[mode] = {
+            **counts,
+            'seconds': round(elapsed, 4),
+            'attempts_per_second': round(threads * exits / elapsed, 1),
+            'final_on_hand': final,
+            'oversold': max(0, -final),
+        }
+
+    return {'threads': threads, 'exits_per_thread': exits, 'initial_stock': stock, **results}
+
+
+@benchmark('stock_as_of')
+def bench_stock_as_of(products=200, movements=100000, delta=1000, repeat=5):
+    """Geçmiş tarihli stok: tüm defteri toplamak ile anlık görüntü + aradaki hareketlerin karşılaştırması"""
+    import random
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from .models import Product, EntryTransaction, ExitTransaction, explicit_movement_dates
+    from .snapshots import stock_as_of, take_snapshot
+
+    rng = random.Random(0)
+    now = timezone.now()
+    cutoff = now - timedelta(days=1)
+    product_ids = [product.pk for product in Product.objects.bulk_create(
+        [Product(name=f'bench-{i}') for i in range(products)]
+    )]
+
+    def generate(count, start, end):
+        # bulk_create sinyal göndermez; ölçüm sadece hareket tablolarını okur
+        span = (end - start).total_seconds()
+        entries, exits = [], []
+        for _ in range(count):
+            moment = start + timedelta(seconds=rng.random() * span)
+            product_id = rng.choice(product_ids)
+            if rng.random() < 0.6:
+                entries.append(EntryTransaction(product_id=product_id, quantity=rng.randint(1, 20), entry_date=moment))
+            else:
+                exits.append(ExitTransaction(product_id=product_id, quantity=rng.randint(1, 10), exit_date=moment))
+        with explicit_movement_dates():
+            EntryTransaction.objects.bulk_create(entries, batch_size=5000)
+            ExitTransaction.objects.bulk_create(exits, batch_size=5000)
+
+    generate(movements - delta, now - timedelta(days=365), cutoff)
+    started = time.perf_counter()
+    take_snapshot(cutoff)
+    snapshot_seconds = time.perf_counter() - started
+    generate(delta, cutoff, now)
+
+    results = {}
+    for mode, use_snapshots in (('full_scan', False), ('snapshot', True)):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            stock = stock_as_of(now, use_snapshots=use_snapshots)
+            timings.append(time.perf_counter() - started)
+        results[mode] = {'best_ms': round(min(timings) * 1000, 2), 'median_ms': round(sorted(timings)[len(timings) // 2] * 1000, 2)}
+        results[mode]['stock'] = stock
+
+    matches = results['full_scan'].pop('stock') == results['snapshot'].pop('stock')
+    return {
+        'products': products,
+        'movements': movements,
+        'movements_after_snapshot': delta,
+        'snapshot_seconds': round(snapshot_seconds, 3),
+        'results_match': matches,
+        **results,
+    }
+
+
+# Django'nun sqlite3 varsayılanlarına denk profil: rollback journal, synchronous=FULL, DEFERRED işlem
+SQLITE_DEFAULT_PROFILE = {
+    'transaction_mode': 'DEFERRED',
+    'pragmas': {
+        'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': None,
+        'mmap_size': 0, 'cache_size': -2000, 'temp_store': 'DEFAULT',
+    },
+}
+
+
+@contextmanager
+def sqlite_profile(options):
+    """Bağlantı seçeneklerini geçici olarak değiştirir; yeni bağlantılar bu profille açılır"""
+    settings_dict = connection.settings_dict
+    previous = settings_dict['OPTIONS']
+    connections.close_all()
+    settings_dict['OPTIONS'] = {**previous, **options}
+    try:
+        yield
+    finally:
+        connections.close_all()
+        settings_dict['OPTIONS'] = previous
+
+
+@benchmark('sqlite_writes')
+def bench_sqlite_writes(threads=8, writes=100, readers=2, products=50):
+    """Eşzamanlı giriş/çıkış yazma hızı: Django varsayılan SQLite ayarları ile ayarlı profilin karşılaştırması"""
+    from django.db import OperationalError
+
+    from .listing import product_page
+    from .models import Product, EntryTransaction, ExitTransaction, StockBalance
+
+    if connection.vendor != 'sqlite':
+        return {'skipped': 'Sadece SQLite için anlamlı'}
+
+    product_ids = [Product.objects.create(name=f'bench-{i}').pk for i in range(products)]
+    results = {}
+    for name, options in (('django_default', SQLITE_DEFAULT_PROFILE), ('tuned', {'transaction_mode': 'IMMEDIATE', 'pragmas': {}})):
+        counts = {'writes': 0, 'locked_errors': 0, 'reads': 0}
+        counts_lock = threading.Lock()
+        writers_done = threading.Event()
+
+        def write(index):
+            for n in range(writes):
+                product_id = product_ids[(index * writes + n) % products]
+                try:
+                    # Önce okuyup sonra yazan işlem (stok kontrolü ardından hareket kaydı gibi)
+                    with transaction.atomic():
+                        on_hand = StockBalance.objects.get(product_id=product_id).on_hand
+                        if n % 2 and on_hand > 0:
+                            ExitTransaction.objects.create(product_id=product_id, quantity=1)
+                        else:
+                            EntryTransaction.objects.create(product_id=product_id, quantity=1)
+                    outcome = 'writes'
+                except OperationalError:
+                    outcome = 'locked_errors'
+                with counts_lock:
+                    counts[outcome] += 1
+
+        def read():
+            while not writers_done.is_set():
+                product_page({'sort': '-stock'}, 50)
+                with counts_lock:
+                    counts['reads'] += 1
+
+        with sqlite_profile(options):
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+            reader_threads = [threading.Thread(target=run_threads, args=(1, lambda index: read())) for _ in range(readers)]
+            for thread in reader_threads:
+                thread.start()
+            elapsed = run_threads(threads, write)
+            writers_done.set()
+            for thread in reader_threads:
+                thread.join()
+
+        results[name] = {
+            **counts,
+            'journal_mode': journal_mode,
+            'seconds': round(elapsed, 4),
+            'writes_per_second': round(counts['writes'] / elapsed, 1),
+            'reads_per_second': round(counts['reads'] / elapsed, 1),
+        }
+
+    return {'threads': threads, 'writes_per_thread': writes, 'readers': readers, **results}
+
+
+def _latency(timings):
+    timings = sorted(timings)
+    def percentile(percent):
+        return round(timings[min(len(timings) - 1, int(len(timings) * percent / 100))] * 1000, 2)
+    return {'p50_ms': percentile(50), 'p95_ms': percentile(95), 'max_ms': round(timings[-1] * 1000, 2)}
+
+
+def _view_requests(product_id, department_id, shelf_id):
+    """Ölçülen istekler: ad -> (metot, URL, POST verisi)"""
+    from django.urls import reverse
+
+    return {
+        'dashboard': ('get', reverse('dashboard'), None),
+        'product_detail': ('get', reverse('product_detail', args=[product_id]), None),
+        'shelf_visualization': ('get', reverse('shelf_visualization'), None),
+        'get_product_stock': ('get', f"{reverse('get_product_stock')}?product_id={product_id}", None),
+        'export_products_to_excel': ('get', reverse('export_products_to_excel'), None),
+        'export_transactions_to_excel': ('get', reverse('export_transactions_to_excel'), None),
+        'export_transactions_to_csv': ('get', reverse('export_transactions_to_csv'), None),
+        'export_parameters_to_excel': ('get', reverse('export_parameters_to_excel'), None),
+        'product_entry_post': ('post', reverse('product_entry'), {'product_select': product_id, 'quantity': 5, 'shelf': shelf_id}),
+        'product_exit_post': ('post', reverse('product_exit'), {'product': product_id, 'quantity': 1, 'department': department_id}),
+    }
+
+
+def _parse_scales(scales):
+    # "1000:20000,5000:100000" -> [(1000, 20000), (5000, 100000)]
+    return [tuple(int(part) for part in scale.split(':')) for scale in str(scales).split(',')]
+
+
+@benchmark('views')
+def bench_views(scales='200:5000,1000:50000', repeat=10, seed=0):
+    """Görünümlerin gecikme yüzdelikleri, sorgu sayıları ve bellek tepesi; her ölçekte sentetik veriyle"""
+    import tracemalloc
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.test import Client, override_settings
+
+    from .instrumentation import RequestStats
+    from .models import Department, Product, StockBalance
+    from .synthetic import generate_dataset
+
+    def send(client, method, url, data):
+        response = getattr(client, method)(url, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    results = []
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for products, movements in _parse_scales(scales):
+            call_command('flush', interactive=False, verbosity=0)
+            cache.clear()
+            started = time.perf_counter()
+            dataset = generate_dataset(products=products, movements=movements, seed=seed)
+            generate_seconds = time.perf_counter() - started
+
+            client = Client()
+            client.force_login(User.objects.create_user('bench'))
+            # En çok hareket gören ürün; geçmiş ve dışa aktarma için en kötü durum
+            product_id = StockBalance.objects.order_by('-total_in').values_list('product_id', flat=True).first()
+            product = Product.objects.get(pk=product_id)
+            requests = _view_requests(product_id, Department.objects.values_list('pk', flat=True).first(), product.shelf_id)
+
+            views = {}
+            for name, (method, url, data) in requests.items():
+                timings, db_times = [], []
+                for _ in range(repeat):
+                    # Önbelleğe alınan stok sorgusu her seferinde soğuk ölçülür
+                    cache.clear()
+                    # DEBUG açıkken sorgu günlüğü dolu olabileceğinden sorgular execute_wrapper ile sayılır
+                    stats = RequestStats()
+                    with stats.capture():
+                        started = time.perf_counter()
+                        response = send(client, method, url, data)
+                        timings.append(time.perf_counter() - started)
+                    db_times.append(stats.db_time)
+                tracemalloc.start()
+                send(client, method, url, data)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                views[name] = {
+                    'status': response.status_code,
+                    **_latency(timings),
+                    'queries': stats.queries,
+                    'db_ms_p50': _latency(db_times)['p50_ms'],
+                    'peak_memory_kb': round(peak / 1024, 1),
+                }
+            results.append({
+                'products': products,
+                'movements': movements,
+                'generate_seconds': round(generate_seconds, 2),
+                'dataset': dataset,
+                'views': views,
+            })
+    return {'repeat': repeat, 'seed': seed, 'scales': results}
+
+
+SEARCH_QUERIES = ['vida', 'VİDA M6', 'kağıt havlu', 'KAGIT', 'streç', 'eldivn', 'rulmn büyük', 'a-01', 'm8', 'kutu deterjan']
+
+
+@benchmark('search')
+def bench_search(products=100000, repeat=20, seed=0):
+    """Ürün araması: FTS5 trigram indeksi ile ad/raf üzerinde icontains (LIKE) taramasının karşılaştırması"""
+    from django.db.models import Q
+
+    from . import search
+    from .models import Product
+    from .synthetic import generate_dataset
+
+    started = time.perf_counter()
+    generate_dataset(products=products, movements=0, seed=seed)
+    build_seconds = time.perf_counter() - started
+
+    def measure(run):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - started)
+        return {**_latency(timings), 'results': len(result)}
+
+    results = {}
+    for query in SEARCH_QUERIES:
+        results[query] = {
+            'index': measure(lambda: search.search(query)),
+            'icontains': measure(lambda: list(
+                Product.objects.filter(Q(name__icontains=query) | Q(shelf__name__icontains=query)).values_list('pk', flat=True)[:20]
+            )),
+        }
+        top = search.search(query, 3)
+        names = Product.objects.in_bulk(top)
+        results[query]['top'] = [names[pk].name for pk in top]
+    started = time.perf_counter()
+    search.rebuild_index()
+    return {
+        'products': products,
+        'generate_seconds': round(build_seconds, 2),
+        'rebuild_index_seconds': round(time.perf_counter() - started, 2),
+        'queries': results,
+    }
+
+
+@benchmark('consumption')
+def bench_consumption(products=5000, movements=2000000, new_exits=1000, repeat=5, seed=0):
+    """Tüketim analizi: baştan hesaplama, önbellekten okuma ve yeni çıkışlarla artımlı güncelleme"""
+    import random
+    import tracemalloc
+    from datetime import datetime
+
+    from django.core.cache import cache
+    from django.db.models import Sum
+    from django.utils import timezone
+
+    from . import analytics
+    from .models import ExitTransaction, Product
+    from .synthetic import generate_dataset
+
+    started = time.perf_counter()
+    dataset = generate_dataset(products=products, movements=movements, seed=seed)
+    generate_seconds = time.perf_counter() - started
+    since = timezone.make_aware(datetime.combine(analytics.window_start(), datetime.min.time()))
+    window_exits = ExitTransaction.objects.filter(exit_date__gte=since).count()
+
+    def timed(run, clear=False):
+        timings = []
+        for _ in range(repeat):
+            if clear:
+                cache.clear()
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return _latency(timings)
+
+    cache.clear()
+    tracemalloc.start()
+    analytics.consumption_state()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(seed)
+    product_ids = list(Product.objects.values_list('pk', flat=True))
+
+    def add_exits():
+        ExitTransaction.objects.bulk_create([
+            ExitTransaction(product_id=rng.choice(product_ids), quantity=1) for _ in range(new_exits)
+        ])
+
+    incremental = []
+    for _ in range(repeat):
+        with transaction.atomic():
+            add_exits()
+        started = time.perf_counter()
+        analytics.consumption_state()
+        incremental.append(time.perf_counter() - started)
+
+    return {
+        'products': products,
+        'movements': movements,
+        'window_exits': window_exits,
+        'generate_seconds': round(generate_seconds, 2),
+        'dataset': dataset,
+        'full_build': timed(analytics.consumption_state, clear=True),
+        'full_build_peak_memory_mb': round(peak / 1024 / 1024, 1),
+        'cached_refresh': timed(analytics.consumption_state),
+        f'incremental_refresh_{new_exits}_exits': _latency(incremental),
+        'product_report': timed(analytics.product_report),
+        'department_report': timed(analytics.department_report),
+        # Karşılaştırma için: sadece ürün toplamlarını veren SQL GROUP BY (sapma ve departman yok)
+        'sql_group_by': timed(lambda: list(
+            ExitTransaction.objects.filter(exit_date__gte=since).values('product_id').annotate(total=Sum('quantity'))
+        )),
+    }
+
+
+@benchmark('fragments')
+def bench_fragments(products=5000, movements=100000, changed=20, limit=200, repeat=10, seed=0):
+    """Parça önbelleği: dashboard satırları ve raf blokları soğuk, sıcak ve birkaç hareketten sonra"""
+    import random
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from . import fragments
+    from .listing import product_page
+    from .models import ExitTransaction
+    from .synthetic import generate_dataset
+    from .utils import get_shelf_data
+
+    started = time.perf_counter()
+    dataset = generate_dataset(products=products, movements=movements, seed=seed)
+    generate_seconds = time.perf_counter() - started
+    rng = random.Random(seed)
+    page, _ = product_page({}, limit)
+    page_ids = [product.pk for product in page]
+
+    def add_exits():
+        # Sayfadaki ürünlerden birkaçı; sürümler işlem onaylanınca artar. Değişen satırlar canlı
+        # güncelleme olayı için hemen yeniden çizildiğinden dashboard'da çoğunlukla isabet görülür
+        with transaction.atomic():
+            for product_id in rng.sample(page_ids, min(changed, len(page_ids))):
+                ExitTransaction.objects.create(product_id=product_id, quantity=1)
+
+    def measure(run, prepare=None):
+        fragments.reset()
+        timings = []
+        for _ in range(repeat):
+            if prepare:
+                prepare()
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return {**_latency(timings), 'hit_ratio': fragments.stats()}
+
+    def scenarios(run):
+        run()
+        return {
+            'cold': measure(run, cache.clear),
+            'warm': measure(run),
+            f'after_{changed}_exits': measure(run, add_exits),
+        }
+
+    results = {
+        'products': products,
+        'movements': movements,
+        'generate_seconds': round(generate_seconds, 2),
+        'dataset': dataset,
+        # Sadece çizim: aynı ürün listesinden satırların HTML'i
+        f'render_rows_{limit}': scenarios(lambda: fragments.product_rows(page)),
+        'shelf_data': scenarios(get_shelf_data),
+    }
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        client = Client()
+        client.force_login(User.objects.create_user('bench'))
+        results['dashboard_view'] = scenarios(lambda: client.get(reverse('dashboard')))
+        results['shelf_view'] = scenarios(lambda: client.get(reverse('shelf_visualization')))
+    return results
+
+
+STARTUP_SCRIPT = """
+import resource, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+loaded = [name for name in ('pandas', 'numpy', 'openpyxl') if name in sys.modules]
+started = time.perf_counter()
+import io
+from depo.exports import write_xlsx
+write_xlsx([('Sheet1', ['a'], [(1,)])], io.BytesIO())
+print(ready, rss, ','.join(loaded), time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+@benchmark('startup')
+def bench_startup(repeat=5):
+    """Yeni bir worker sürecinin uygulamayı ve URL'leri yükleme süresi, bellek tepesi ve ilk xlsx yazımı"""
+    import subprocess
+    import sys
+
+    from django.conf import settings
+
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'Depostok_Project.settings')}
+    ready, rss, first_export, export_rss = [], [], [], []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT], capture_output=True, text=True, env=env, cwd=settings.BASE_DIR, check=True,
+        ).stdout.split(' ')
+        ready.append(float(output[0]))
+        rss.append(int(output[1]))
+        loaded = [name for name in output[2].split(',') if name]
+        first_export.append(float(output[3]))
+        export_rss.append(int(output[4]))
+    # ru_maxrss Linux'ta KB cinsindendir
+    return {
+        'repeat': repeat,
+        'ready': _latency(ready),
+        'peak_rss_mb': round(max(rss) / 1024, 1),
+        'heavy_modules_loaded': loaded,
+        'first_xlsx_export': _latency(first_export),
+        'peak_rss_after_export_mb': round(max(export_rss) / 1024, 1),
+    }
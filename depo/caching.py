@@ -0,0 +1,70 @@
+"""Ürün stok bilgisinin önbelleği.
+
+Her ürünün kaydı, ürünün stok sürümünü ve miktar türü adları için PARAMETERS sürümünü anahtarına
+katar; hareket yazıldığında ya da miktar türü değiştiğinde sürüm artırıldığı için eski kayıtlar
+silinmeden geçersiz olur. Önbellek süreç içiyse diğer süreçlerin sayaç artışları görünmediği
+için kayıtlar kısa tutulur ve ETag'e zaman dilimi katılır (bkz. versions.cache_timeout). Sürüm listesi aynı zamanda ETag olarak kullanılır,
+böylece değişmemiş stok için veritabanına hiç gidilmez.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Product
+from .versions import PARAMETERS, cache_timeout, get_versions, process_local, product_stock
+
+KEY_PREFIX = 'depo:stock:'
+TIMEOUT = 60 * 60
+
+# Tek istekte sorgulanabilecek en fazla ürün sayısı
+MAX_PRODUCTS = 200
+
+
+def _time_slice():
+    return int(time.time() // settings.DEPO_LOCAL_CACHE_SECONDS)
+
+
+def stock_versions(product_ids):
+    """{ürün id: sürüm} döner; sürüm, stok ve PARAMETERS sayaçlarının birleşimidir"""
+    versions = get_versions([PARAMETERS, *(product_stock(product_id) for product_id in product_ids)])
+    # Yanıttaki miktar türü adı stok sayacını artırmadan da değişebilir
+    shared = f'{versions[PARAMETERS]}'
+    if process_local():
+        # Başka süreçte yazılan hareket buradaki sayacı artırmaz; ETag en fazla bir dilim boyunca geçerli kalır
+        shared += f'.{_time_slice()}'
+    return {product_id: f'{shared}.{versions[product_stock(product_id)]}' for product_id in product_ids}
+
+
+def stock_etag(versions):
+    """Ürün sürümlerinden ETag değeri üretir"""
+    digest = hashlib.sha1(
+        ','.join(f'{product_id}:{version}' for product_id, version in sorted(versions.items())).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def get_stock_payloads(versions):
+    """{ürün id: {'current_stock', 'quantity_type'}} döner; önbellekte olmayanlar tek sorguda okunur"""
+    keys = {f'{KEY_PREFIX}{product_id}:{version}': product_id for product_id, version in versions.items()}
+    cached = cache.get_many(keys)
+    payloads = {keys[key]: payload for key, payload in cached.items()}
+
+    missing = [product_id for product_id in versions if product_id not in payloads]
+    if missing:
+        fresh = {
+            product_id: {
+                'current_stock': max(0, current_stock),
+                'quantity_type': quantity_type or '',
+            }
+            for product_id, current_stock, quantity_type in Product.objects.with_stock()
+            .filter(pk__in=missing)
+            .values_list('pk', 'current_stock', 'quantity_type__name')
+        }
+        cache.set_many(
+            {f'{KEY_PREFIX}{product_id}:{versions[product_id]}': payload for product_id, payload in fresh.items()},
+            timeout=cache_timeout(TIMEOUT),
+        )
+        payloads.update(fresh)
+    return payloads
@@ -0,0 +1,201 @@
+"""Excel ve CSV dışa aktarma.
+
+Dosyalar openpyxl'in write-only modu ya da csv modülüyle satır satır yazılır. openpyxl ağır bir
+kütüphane olduğu için sadece bir dosya yazılırken yüklenir; stok sayfalarını sunan worker
+süreçleri onu hiç yüklemez.
+"""
+import csv
+import tempfile
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .archive import movement_sources
+from .models import Product, QuantityType, Shelf, Department
+from .parsing import parse_day, parse_int
+
+CHUNK_SIZE = 2000
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+TRANSACTION_HEADERS = ['Ürün', 'İşlem Türü', 'Miktar', 'Departman', 'Tarih']
+PRODUCT_HEADERS = ['Ürün Adı', 'Miktar Türü', 'Raf Numarası', 'Minimum Miktar', 'Mevcut Stok']
+
+
+class InvalidExportFilter(ValueError):
+    pass
+
+
+def parse_transaction_filters(params):
+    """İstek parametrelerinden tarih aralığı ve ürün filtrelerini okur"""
+    filters = {'date_from': None, 'date_to': None, 'product_ids': None}
+    for key in ('date_from', 'date_to'):
+        value = params.get(key)
+        if value:
+            day = parse_day(value)
+            if day is None:
+                raise InvalidExportFilter(f"{key}: {value}")
+            # Bitiş günü dahil: bir sonraki günün başlangıcına kadar
+            if key == 'date_to':
+                day += timedelta(days=1)
+            filters[key] = timezone.make_aware(datetime.combine(day, time.min))
+    product_ids = params.getlist('product') if hasattr(params, 'getlist') else params.get('product')
+    if product_ids:
+        try:
+            filters['product_ids'] = [parse_int(pk) for pk in product_ids]
+        except (TypeError, ValueError):
+            raise InvalidExportFilter(f"product: {product_ids}")
+    return filters
+
+
+def _filter_movements(queryset, date_field, date_from=None, date_to=None, product_ids=None):
+    if date_from is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': date_from})
+    if date_to is not None:
+        queryset = queryset.filter(**{f'{date_field}__lt': date_to})
+    if product_ids:
+        queryset = queryset.filter(product_id__in=product_ids)
+    return queryset.order_by('pk')
+
+
+def count_transactions(date_from=None, date_to=None, product_ids=None):
+    total = 0
+    for kind in ('entry', 'exit'):
+        sources, date_field = movement_sources(kind)
+        total += sum(_filter_movements(source, date_field, date_from, date_to, product_ids).count() for source in sources)
+    return total
+
+
+def transaction_rows(date_from=None, date_to=None, product_ids=None, using=None):
+    """Giriş ve çıkış hareketlerini ürün/departman adları SQL'de birleştirilmiş halde parça parça üretir.
+
+    Akış görünüm döndükten sonra okunduğunda seçili depo bağlamı kapanmış olur; veritabanı (using)
+    bu yüzden görünümde seçilip verilir.
+    """
+    # Arşivdeki hareketler canlı tablodakilerden önce gelir; devir kayıtları dışarıda kalır
+    entry_sources, date_field = movement_sources('entry')
+    for source in reversed(entry_sources):
+        entries = _filter_movements(source.using(using), date_field, date_from, date_to, product_ids)
+        for product_name, quantity, entry_date in entries.values_list(
+            'product__name', 'quantity', 'entry_date'
+        ).iterator(chunk_size=CHUNK_SIZE):
+            yield (product_name, 'Giriş', quantity, 'Depo', entry_date.strftime(DATE_FORMAT))
+
+    exit_sources, date_field = movement_sources('exit')
+    for source in reversed(exit_sources):
+        exits = _filter_movements(source.using(using), date_field, date_from, date_to, product_ids)
+        for product_name, quantity, department_name, exit_date in exits.values_list(
+            'product__name', 'quantity', 'department__name', 'exit_date'
+        ).iterator(chunk_size=CHUNK_SIZE):
+            yield (product_name, 'Çıkış', quantity, department_name or '', exit_date.strftime(DATE_FORMAT))
+
+
+def _header_cells(sheet, headers):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    # pandas 2.x DataFrame.to_excel başlık biçimiyle aynı
+    thin = Side(style='thin')
+    font = Font(bold=True)
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    alignment = Alignment(horizontal='center', vertical='top')
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = font
+        cell.border = border
+        cell.alignment = alignment
+        cells.append(cell)
+    return cells
+
+
+def write_xlsx(sheets, output=None):
+    """(sayfa adı, başlıklar, satırlar) listesini write-only modda xlsx olarak yazar.
+
+    Satırlar openpyxl'in geçici dosyasına aktığı için bellek kullanımı satır sayısından bağımsızdır.
+    Çıktı verilmezse diskte geçici bir dosya oluşturulur; dosya başa sarılmış olarak döner. Çıktı
+    geri sarılamayan bir akış (ör. HttpResponse) da olabilir.
+    """
+    from openpyxl import Workbook
+
+    if output is None:
+        output = tempfile.TemporaryFile()
+    workbook = Workbook(write_only=True)
+    for title, headers, rows in sheets:
+        sheet = workbook.create_sheet(title)
+        sheet.append(_header_cells(sheet, headers))
+        for row in rows:
+            sheet.append(row)
+    workbook.save(output)
+    if output.seekable():
+        output.seek(0)
+    return output
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(headers, rows):
+    """CSV satırlarını tek tek metin olarak üretir (StreamingHttpResponse için)"""
+    writer = csv.writer(_Echo())
+    # Excel'in Türkçe karakterleri doğru açması için BOM
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _report_progress(rows, progress, total, every=CHUNK_SIZE):
+    """Satırları değiştirmeden geçirir, her `every` satırda progress(yazılan, toplam) çağırır"""
+    written = 0
+    for row in rows:
+        yield row
+        written += 1
+        if written % every == 0:
+            progress(written, total)
+    progress(written, total)
+
+
+def product_rows():
+    """Ürün listesi satırları: ad, miktar türü, raf, minimum miktar ve mevcut stok"""
+    products = (
+        Product.objects.with_stock()
+        .order_by('pk')
+        .values_list('name', 'quantity_type__name', 'shelf__name', 'minimum_quantity', 'current_stock')
+    )
+    for name, quantity_type, shelf, minimum_quantity, current_stock in products.iterator(chunk_size=CHUNK_SIZE):
+        yield (name, quantity_type or '', shelf or '', minimum_quantity, current_stock)
+
+
+def export_products(output, progress=None):
+    rows = product_rows()
+    if progress:
+        rows = _report_progress(rows, progress, Product.objects.count())
+    return write_xlsx([('Sheet1', PRODUCT_HEADERS, rows)], output)
+
+
+def export_transactions(output, progress=None, date_from=None, date_to=None, product_ids=None):
+    rows = transaction_rows(date_from, date_to, product_ids)
+    if progress:
+        rows = _report_progress(rows, progress, count_transactions(date_from, date_to, product_ids))
+    return write_xlsx([('Sheet1', TRANSACTION_HEADERS, rows)], output)
+
+
+def export_parameters(output, progress=None):
+    sheets = [
+        ('Miktar Türleri', ['Miktar Türü'], QuantityType.objects.values_list('name').order_by('pk')),
+        ('Raflar', ['Raf Numarası'], Shelf.objects.values_list('name').order_by('pk')),
+        ('Departmanlar', ['Departman Adı'], Department.objects.values_list('name').order_by('pk')),
+    ]
+    write_xlsx(sheets, output)
+    if progress:
+        progress(1, 1)
+    return output
+
+
+# Dışa aktarma türü -> (dosya adı öneki, üretici fonksiyon)
+EXPORTERS = {
+    'products': ('products', export_products),
+    'transactions': ('transactions', export_transactions),
+    'parameters': ('parameters', export_parameters),
+}
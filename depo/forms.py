@@ -1,11 +1,57 @@
 from django import forms
-from .models import Product, EntryTransaction, ExitTransaction, QuantityType, Shelf, Department
-from .utils import calculate_product_stock
+from django.conf import settings
+from django.urls import reverse
+from .models import Product, EntryTransaction, ExitTransaction, QuantityType, Shelf, Department, Warehouse
+from .reference import ReferenceChoiceField
+
+
+def product_choices():
+    """Ürün seçim kutularının sorgusu: kalan stok tek sorguda, ada göre sıralı"""
+    return Product.objects.with_stock().select_related('quantity_type').order_by('name')
+
+
+def product_choice_label(product):
+    return f"{product.name} (Kalan: {max(0, product.current_stock)} {product.quantity_type})"
+
+
+class ProductPickerSelect(forms.Select):
+    """Ürün seçim kutusu.
+
+    Katalog DEPO_PRODUCT_PICKER_LIMIT ürünü aşmıyorsa tüm ürünler tek sorguyla listelenir. Aşıyorsa
+    sadece seçili ürün çizilir, seçenekler yazdıkça ürün arama ucundan yüklenir (product_search_api).
+    Böylece formun çizilmesi katalog büyüdükçe yavaşlamaz.
+    """
+    searchable = False
+
+    def optgroups(self, name, value, attrs=None):
+        iterator = self.choices
+        field = iterator.field
+        limit = settings.DEPO_PRODUCT_PICKER_LIMIT
+        # Katalog büyüklüğü ayrı bir COUNT yerine en fazla limit + 1 satır okunarak anlaşılır
+        products = list(field.queryset[:limit + 1])
+        self.searchable = len(products) > limit
+        if self.searchable:
+            selected = [pk for pk in value if str(pk).isdigit()]
+            products = list(field.queryset.filter(pk__in=selected)) if selected else []
+        empty = [('', field.empty_label)] if field.empty_label is not None else []
+        self.choices = empty + [iterator.choice(product) for product in products]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        if self.searchable:
+            context['widget']['attrs']['data-search-url'] = reverse('product_search_api')
+        return context
+
 
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
         fields = ['name', 'quantity_type', 'minimum_quantity']
+        field_classes = {'quantity_type': ReferenceChoiceField}
         labels = {
             'name': 'Ürün Adı',
             'quantity_type': 'Miktar Türü',
@@ -20,9 +66,9 @@ class ProductForm(forms.ModelForm):
 class EntryTransactionForm(forms.ModelForm):
     product_name = forms.CharField(max_length=200, label="Ürün Adı", required=False, 
                                    widget=forms.TextInput(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline', 'placeholder': 'Ürün Adını Girin veya Seçin'}))
-    product_select = forms.ModelChoiceField(queryset=Product.objects.all(), label="Mevcut Ürün Seç", required=False, 
-                                            widget=forms.Select(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}))
-    shelf = forms.ModelChoiceField(queryset=Shelf.objects.all(), label="Raf Numarası", required=True,
+    product_select = forms.ModelChoiceField(queryset=product_choices(), label="Mevcut Ürün Seç", required=False, 
+                                            widget=ProductPickerSelect(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}))
+    shelf = ReferenceChoiceField(queryset=Shelf.objects.all(), label="Raf Numarası", required=True,
                                    widget=forms.Select(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}))
     
     class Meta:
@@ -35,6 +81,10 @@ class EntryTransactionForm(forms.ModelForm):
             'quantity': forms.NumberInput(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}),
         }
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['product_select'].label_from_instance = product_choice_label
+
     def clean(self):
         cleaned_data = super().clean()
         product_name = cleaned_data.get('product_name')
@@ -49,30 +99,38 @@ class EntryTransactionForm(forms.ModelForm):
         return cleaned_data
 
 class ExitTransactionForm(forms.ModelForm):
+    # Boş bırakılırsa varsayılan depodan çıkılır (bkz. ledger.record_exit)
+    warehouse = ReferenceChoiceField(queryset=Warehouse.objects.all(), label="Depo", required=False, empty_label=None,
+                                     widget=forms.Select(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}))
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Ürün seçim listesini kalan stok miktarlarıyla birlikte göster
-        self.fields['product'].queryset = Product.objects.all()
-        self.fields['product'].label_from_instance = lambda obj: f"{obj.name} (Kalan: {calculate_product_stock(obj)} {obj.quantity_type})"
+        self.fields['product'].queryset = product_choices()
+        self.fields['product'].label_from_instance = product_choice_label
 
     class Meta:
         model = ExitTransaction
         fields = ['product', 'quantity', 'department']
+        field_classes = {'department': ReferenceChoiceField}
         labels = {
             'product': 'Ürün',
             'quantity': 'Çıkış Miktarı',
             'department': 'Çıkış Departmanı',
         }
         widgets = {
-            'product': forms.Select(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}),
+            'product': ProductPickerSelect(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}),
             'quantity': forms.NumberInput(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}),
             'department': forms.Select(attrs={'class': 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'}),
         }
 
     def clean_quantity(self):
         quantity = self.cleaned_data['quantity']
-        product = self.cleaned_data['product']
-        current_stock = calculate_product_stock(product)
+        product = self.cleaned_data.get('product')
+        if product is None:
+            return quantity
+        # Seçim sorgusu kalan stoğu zaten getirdi; kesin kontrol kilit altında record_exit'te yapılır
+        current_stock = max(0, product.current_stock)
         if quantity <= 0:
             raise forms.ValidationError("Çıkış miktarı pozitif bir değer olmalıdır.")
         if quantity > current_stock:
@@ -0,0 +1,125 @@
+"""Dashboard satırları ve raf blokları için sürüm anahtarlı parça önbelleği.
+
+Her ürünün dashboard satırı (product_row.html) ve her rafın ürün listesi ayrı ayrı önbellekte
+tutulur. Anahtara ilgili sürüm sayaçları katılır (bkz. versions.py), kayıtlar silinmez:
+
+- satır: ürünün stok sayacı (hareket ve ürün düzenlemesinde artar) + PARAMETERS,
+- raf bloğu: rafın içerik sayacı (raftaki bir ürünün hareketi, düzenlenmesi, rafa girip
+  çıkması ya da silinmesinde artar) + PARAMETERS.
+
+PARAMETERS raf ya da miktar türü eklenip düzenlendiğinde/silindiğinde artar; bu nadir olduğu için
+ilgili ürünler tek tek bulunmak yerine tüm parçalar geçersiz olur. Sayaçlar işlem onaylandıktan
+sonra artırılır (bkz. signals.py). Süreç içi önbellekte sayaç artışları diğer süreçlere ulaşmadığı
+için parçalar orada kısa süre tutulur (bkz. versions.cache_timeout).
+
+Satırlarda ürünler sayaçlardan önce okunduğu için, sorgu ile sayaç okuma arasında onaylanan bir
+hareket eski satırı yeni sürümle yazabilirdi; bu yüzden satır anahtarına stok toplamları da
+katılır. Raf bloklarında sayaçlar ürünlerden önce okunur.
+
+İsabet/ıska sayıları süreç başına tutulur ve /debug/query-stats/ yanıtında görünür.
+"""
+import threading
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Product
+from .versions import PARAMETERS, cache_timeout, get_versions, product_stock, shelf_contents
+
+KEY_PREFIX = 'depo:fragment:'
+TIMEOUT = 24 * 60 * 60
+
+_counts = {}
+_lock = threading.Lock()
+
+
+def _count(kind, hits, misses):
+    with _lock:
+        counts = _counts.setdefault(kind, [0, 0])
+        counts[0] += hits
+        counts[1] += misses
+
+
+def stats():
+    """Parça türü başına {'hits', 'misses', 'hit_ratio'}"""
+    with _lock:
+        counts = {kind: tuple(values) for kind, values in _counts.items()}
+    return {
+        kind: {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None}
+        for kind, (hits, misses) in sorted(counts.items())
+    }
+
+
+def reset():
+    with _lock:
+        _counts.clear()
+
+
+def _row_key(product, versions):
+    return (
+        f'{KEY_PREFIX}row:{product.pk}:{versions[product_stock(product.pk)]}:{versions[PARAMETERS]}'
+        f':{product.total_entry}:{product.total_exit}'
+    )
+
+
+def product_rows(products):
+    """Dashboard tablosunun satırları; değişmemiş ürünlerin satırları önbellekten gelir.
+
+    products with_stock() ile okunmuş, quantity_type ve shelf'i select_related edilmiş olmalı.
+    """
+    products = list(products)
+    if not products:
+        return ''
+    versions = get_versions([PARAMETERS, *(product_stock(product.pk) for product in products)])
+    keys = [_row_key(product, versions) for product in products]
+    cached = cache.get_many(keys)
+    rendered = {
+        key: render_to_string('depo/product_row.html', {'product': product})
+        for key, product in zip(keys, products)
+        if key not in cached
+    }
+    if rendered:
+        cache.set_many(rendered, cache_timeout(TIMEOUT))
+    _count('product_row', len(keys) - len(rendered), len(rendered))
+    return mark_safe(''.join(cached.get(key) or rendered[key] for key in keys))
+
+
+def _shelf_products(shelf_ids, all_shelves=False):
+    """{raf id: [ürün sözlüğü]}; stoğu olan ürünler ada göre sıralı"""
+    blocks = {shelf_id: [] for shelf_id in shelf_ids}
+    products = Product.objects.filter(shelf__isnull=False) if all_shelves else Product.objects.filter(shelf__in=shelf_ids)
+    # Bakiye satırı olmayan ürünün stoğu zaten sıfırdır; iç birleşim Coalesce'den belirgin şekilde hızlı
+    products = (
+        products.filter(stock_balance__on_hand__gt=0)
+        .order_by('name')
+        .values_list('pk', 'name', 'shelf_id', 'stock_balance__on_hand', 'quantity_type__name')
+    )
+    for product_id, name, shelf_id, current_stock, quantity_type in products:
+        blocks.setdefault(shelf_id, []).append({
+            'id': product_id,
+            'name': name,
+            'quantity': current_stock,
+            'quantity_type': quantity_type or '',
+        })
+    return blocks
+
+
+def shelf_blocks(shelf_ids):
+    """{raf id: ürün listesi}; sadece önbellekte olmayan rafların ürünleri sorgulanır"""
+    if not shelf_ids:
+        return {}
+    versions = get_versions([PARAMETERS, *(shelf_contents(shelf_id) for shelf_id in shelf_ids)])
+    keys = {
+        shelf_id: f'{KEY_PREFIX}shelf:{shelf_id}:{versions[shelf_contents(shelf_id)]}:{versions[PARAMETERS]}'
+        for shelf_id in shelf_ids
+    }
+    cached = cache.get_many(keys.values())
+    blocks = {shelf_id: cached[key] for shelf_id, key in keys.items() if key in cached}
+    missing = [shelf_id for shelf_id in shelf_ids if shelf_id not in blocks]
+    if missing:
+        fresh = _shelf_products(missing, all_shelves=len(missing) == len(shelf_ids))
+        cache.set_many({keys[shelf_id]: fresh[shelf_id] for shelf_id in missing}, cache_timeout(TIMEOUT))
+        blocks.update(fresh)
+    _count('shelf', len(blocks) - len(missing), len(missing))
+    return blocks
@@ -0,0 +1,114 @@
+"""Ürün hareket geçmişi.
+
+Giriş ve çıkışlar (arşivdekiler dahil) veritabanında tek bir UNION ALL sorgusuyla birleştirilir
+ve (tarih, id, tür) anahtarına göre imleçle sayfalanır. (ürün, tarih) indeksleri sayesinde SQLite
+tabloları indeks sırasıyla birleştirir; sayfa ne kadar derin olursa olsun sadece sayfa boyu kadar
+satır okunur.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .archive import movement_sources
+from .listing import InvalidCursor, decode_cursor, encode_cursor
+from .parsing import parse_day, parse_int
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+ENTRY = 'Giriş'
+EXIT = 'Çıkış'
+
+
+class InvalidHistoryFilter(ValueError):
+    pass
+
+
+def parse_history_filters(params):
+    """Tarih aralığı ve departman filtrelerini okur"""
+    filters = {'date_from': None, 'date_to': None, 'department': None}
+    for key in ('date_from', 'date_to'):
+        value = params.get(key)
+        if value:
+            day = parse_day(value)
+            if day is None:
+                raise InvalidHistoryFilter(f"{key}: {value}")
+            # Bitiş günü dahil
+            if key == 'date_to':
+                day += timedelta(days=1)
+            filters[key] = timezone.make_aware(datetime.combine(day, time.min))
+    if params.get('department'):
+        try:
+            filters['department'] = parse_int(params['department'])
+        except ValueError:
+            raise InvalidHistoryFilter(f"department: {params['department']}")
+    return filters
+
+
+def _after_cursor(queryset, date_field, kind, cursor):
+    """(tarih, id, tür) azalan sırasında imleçten sonra gelen satırları bırakır"""
+    date, pk, cursor_kind = cursor
+    # "tarih <= d" aralığı indeksten okunur, eşit tarihteki satırlar id/tür ile elenir
+    pk_lookup = 'gt' if kind < cursor_kind else 'gte'
+    return queryset.filter(**{f'{date_field}__lte': date}).exclude(**{date_field: date, f'pk__{pk_lookup}': pk})
+
+
+def _branch(queryset, date_field, kind, department_name, product_id, filters, cursor):
+    queryset = queryset.filter(product_id=product_id)
+    if filters['date_from'] is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': filters['date_from']})
+    if filters['date_to'] is not None:
+        queryset = queryset.filter(**{f'{date_field}__lt': filters['date_to']})
+    if cursor is not None:
+        queryset = _after_cursor(queryset, date_field, kind, cursor)
+    return queryset.annotate(
+        date=F(date_field),
+        transaction_type=Value(kind, output_field=CharField()),
+        department_name=department_name,
+    ).values('pk', 'quantity', 'date', 'transaction_type', 'department_name')
+
+
+def movement_history(product_id, filters=None, cursor=None, limit=PAGE_SIZE):
+    """Ürünün hareketlerinden bir sayfa döner: (satırlar, sonraki imleç)"""
+    filters = filters or parse_history_filters({})
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        try:
+            date, kind = value
+            date = parse_datetime(date)
+        except (TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if date is None:
+            raise InvalidCursor(cursor)
+        cursor = (date, pk, kind)
+
+    # Arşivlenen hareketler de aynı sırada listelenir; id'leri canlı tablodakiyle çakışmaz
+    exit_sources, exit_date = movement_sources('exit')
+    branches = [
+        _branch(
+            source, exit_date, EXIT, Coalesce('department__name', Value('Bilinmiyor')), product_id, filters, cursor,
+        )
+        for source in exit_sources
+    ]
+    if filters['department'] is not None:
+        # Girişlerin departmanı yok; departman seçiliyse sadece çıkışlar listelenir
+        branches = [branch.filter(department_id=filters['department']) for branch in branches]
+    else:
+        entry_sources, entry_date = movement_sources('entry')
+        branches += [
+            _branch(source, entry_date, ENTRY, Value('Depo', output_field=CharField()), product_id, filters, cursor)
+            for source in entry_sources
+        ]
+    queryset = branches[0].union(*branches[1:], all=True)
+
+    rows = list(queryset.order_by('-date', '-pk', '-transaction_type')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last['date'].isoformat(), last['transaction_type']], last['pk'])
+    return rows, next_cursor
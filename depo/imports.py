@@ -0,0 +1,236 @@
+"""Excel/CSV dosyasından toplu ürün girişi.
+
+Dosyadaki ürün, raf ve miktar türü adları tek seferde toplu sorgularla çözülür, eksik
+ürünler oluşturulur ve tüm giriş hareketleri tek bir veritabanı işleminde bulk_create ile
+yazılır. bulk_create sinyal göndermediği için stok bakiyeleri burada ürün (ve depo) başına
+toplanarak güncellenir. Her giriş, satırdaki rafın deposuna yazılır.
+"""
+import csv
+import io
+import zipfile
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Product, QuantityType, Shelf, EntryTransaction, StockBalance
+from .routers import current_database
+from .signals import stock_changed
+from .versions import DATASET, bump_version, shelf_contents
+from . import ledger, search
+
+# Başlık (küçük harf) -> alan adı
+COLUMN_ALIASES = {
+    'ürün adı': 'product',
+    'ürün': 'product',
+    'miktar': 'quantity',
+    'giriş miktarı': 'quantity',
+    'raf numarası': 'shelf',
+    'raf': 'shelf',
+    'miktar türü': 'quantity_type',
+}
+REQUIRED_COLUMNS = ('product', 'quantity', 'shelf')
+
+# UTF-8 olmayan CSV'ler Türkçe Excel'in varsayılan kodlamasıyla okunur
+CSV_FALLBACK_ENCODING = 'cp1254'
+
+# SQLite'ın sorgu parametresi sınırının altında kalmak için
+LOOKUP_BATCH_SIZE = 900
+INSERT_BATCH_SIZE = 1000
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+def _normalize_header(value):
+    return str(value or '').strip().replace('İ', 'i').lower()
+
+
+def _map_header(header):
+    columns = {}
+    for index, title in enumerate(header):
+        field = COLUMN_ALIASES.get(_normalize_header(title))
+        if field and field not in columns:
+            columns[field] = index
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise ImportFileError(f"Eksik sütun(lar): {', '.join(missing)}")
+    return columns
+
+
+def read_rows(file, filename):
+    """Yüklenen xlsx/csv dosyasını {alan: değer} sözlükleri olarak okur"""
+    if filename.lower().endswith('.xlsx'):
+        # openpyxl sadece xlsx okunurken yüklenir (bkz. exports.py)
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+
+        try:
+            workbook = load_workbook(file, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError) as exc:
+            raise ImportFileError("Excel dosyası okunamadı; dosya bozuk ya da .xlsx biçiminde değil.") from exc
+        raw_rows = workbook.active.iter_rows(values_only=True)
+    elif filename.lower().endswith('.csv'):
+        content = file.read()
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            try:
+                content = content.decode(CSV_FALLBACK_ENCODING)
+            except UnicodeDecodeError as exc:
+                raise ImportFileError("CSV dosyasının karakter kodlaması okunamadı; UTF-8 olarak kaydedin.") from exc
+        text = io.StringIO(content, newline='')
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        raw_rows = csv.reader(text, dialect)
+    else:
+        raise ImportFileError("Sadece .xlsx ve .csv dosyaları desteklenir.")
+
+    header = next(raw_rows, None)
+    if header is None:
+        raise ImportFileError("Dosya boş.")
+    columns = _map_header(header)
+
+    rows = []
+    for values in raw_rows:
+        if not any(value not in (None, '') for value in values):
+            continue
+        rows.append({
+            field: values[index] if index < len(values) else None
+            for field, index in columns.items()
+        })
+    return rows
+
+
+def _clean_text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _clean_quantity(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    try:
+        quantity = int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return quantity if quantity > 0 else None
+
+
+def _lookup_by_name(model, names):
+    found = {}
+    names = list(names)
+    for start in range(0, len(names), LOOKUP_BATCH_SIZE):
+        for obj in model.objects.filter(name__in=names[start:start + LOOKUP_BATCH_SIZE]):
+            found[obj.name] = obj
+    return found
+
+
+def import_entries(rows, partial=False, dry_run=False):
+    """Satırları doğrular ve giriş hareketlerini toplu olarak kaydeder.
+
+    Varsayılan olarak tek bir hatalı satır bile varsa hiçbir şey yazılmaz; partial=True ile
+    sadece geçerli satırlar içe aktarılır. Satır bazında rapor ve özet döner.
+    """
+    cleaned = [{
+        'product': _clean_text(row.get('product')),
+        'quantity': _clean_quantity(row.get('quantity')),
+        'shelf': _clean_text(row.get('shelf')),
+        'quantity_type': _clean_text(row.get('quantity_type')),
+    } for row in rows]
+
+    products = _lookup_by_name(Product, {row['product'] for row in cleaned if row['product']})
+    shelves = _lookup_by_name(Shelf, {row['shelf'] for row in cleaned if row['shelf']})
+    quantity_types = _lookup_by_name(QuantityType, {row['quantity_type'] for row in cleaned if row['quantity_type']})
+
+    report = []
+    valid = []
+    # Dosyanın ilk satırı başlık olduğu için veri satırları 2'den başlar
+    for line, row in enumerate(cleaned, start=2):
+        errors = []
+        if not row['product']:
+            errors.append("Ürün adı boş.")
+        if row['quantity'] is None:
+            errors.append("Miktar pozitif bir tam sayı olmalıdır.")
+        if not row['shelf']:
+            errors.append("Raf numarası boş.")
+        elif row['shelf'] not in shelves:
+            errors.append(f"Raf bulunamadı: {row['shelf']}")
+        if row['quantity_type'] and row['quantity_type'] not in quantity_types:
+            errors.append(f"Miktar türü bulunamadı: {row['quantity_type']}")
+
+        report.append({
+            'row': line,
+            'product': row['product'],
+            'quantity': row['quantity'],
+            'status': 'error' if errors else 'ok',
+            'errors': errors,
+            'new_product': bool(row['product']) and row['product'] not in products,
+        })
+        if not errors:
+            valid.append(row)
+
+    error_count = len(rows) - len(valid)
+    summary = {'rows': len(rows), 'valid': len(valid), 'errors': error_count, 'imported': 0, 'created_products': 0}
+    if dry_run or not valid or (error_count and not partial):
+        return {'summary': summary, 'rows': report}
+
+    default_quantity_type = QuantityType.objects.order_by('pk').first()
+    with transaction.atomic(using=current_database()):
+        new_products = {}
+        for row in valid:
+            if row['product'] not in products and row['product'] not in new_products:
+                new_products[row['product']] = Product(
+                    name=row['product'],
+                    quantity_type=quantity_types.get(row['quantity_type'], default_quantity_type),
+                    minimum_quantity=0,
+                )
+        if new_products:
+            Product.objects.bulk_create(new_products.values(), batch_size=INSERT_BATCH_SIZE)
+            StockBalance.objects.bulk_create(
+                [StockBalance(product=product) for product in new_products.values()],
+                batch_size=INSERT_BATCH_SIZE,
+            )
+            products.update(new_products)
+
+        entries = []
+        totals = defaultdict(int)
+        warehouse_totals = defaultdict(int)
+        moved_shelves = {}
+        for row in valid:
+            product = products[row['product']]
+            shelf = shelves[row['shelf']]
+            entries.append(EntryTransaction(product=product, quantity=row['quantity'], warehouse_id=shelf.warehouse_id))
+            totals[product.pk] += row['quantity']
+            warehouse_totals[product.pk, shelf.warehouse_id] += row['quantity']
+            # product_entry gibi ürün, son girişin yapıldığı rafa taşınır
+            moved_shelves[product.pk] = (product, shelf)
+        EntryTransaction.objects.bulk_create(entries, batch_size=INSERT_BATCH_SIZE)
+
+        moved_at = entries[-1].entry_date
+        for product_id, quantity in totals.items():
+            ledger.apply_movement(product_id, quantity_in=quantity, moved_at=moved_at)
+        ledger.apply_warehouse_movements({key: (quantity, 0) for key, quantity in warehouse_totals.items()})
+
+        changed = []
+        previous_shelves = set()
+        for product, shelf in moved_shelves.values():
+            if product.shelf_id != shelf.pk:
+                previous_shelves.add(product.shelf_id)
+                product.shelf = shelf
+                changed.append(product)
+        Product.objects.bulk_update(changed, ['shelf'], batch_size=INSERT_BATCH_SIZE)
+        # Yeni ve rafı değişen ürünler arama indeksine yazılır (bulk yazma sinyal göndermez)
+        search.index_products({product.pk for product in new_products.values()} | {product.pk for product in changed})
+        stock_changed.send(sender=EntryTransaction, product_ids=set(totals))
+
+        # Ürünlerin çıktığı rafların blokları (yeni raflarınki stock_changed ile artırılır)
+        shelf_names = [shelf_contents(shelf_id) for shelf_id in previous_shelves if shelf_id is not None]
+        transaction.on_commit(lambda: bump_version(DATASET, *shelf_names), using=current_database())
+
+    summary['imported'] = len(entries)
+    summary['created_products'] = len(new_products)
+    return {'summary': summary, 'rows': report}
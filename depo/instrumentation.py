@@ -0,0 +1,178 @@
+"""İstek başına sorgu sayısı ve süre ölçümü.
+
+QueryStatsMiddleware her istekte çalışan SQL sorgularını veritabanı bağlantısının execute_wrapper
+kancasıyla sayar ve süresini ölçer (DEBUG kapalıyken de çalışır). Ölçülen süre sorgunun
+çalıştırılmasıdır; iterator() ile parça parça okunan satırların okunması dahil değildir.
+Sonuçlar yanıta Server-Timing başlığı olarak eklenir ve URL adına göre bellekte son SAMPLE_SIZE
+isteği tutan bir tabloda toplanır; tablo /debug/query-stats/ adresinden okunabilir. Tablo süreç
+başınadır, her çalışan kendi isteklerini görür.
+
+Şablon çizim süresi TemplateResponse dönen görünümler (dashboard, ürün detayı) için ayrıca ölçülür;
+render() kullanan görünümlerde çizim görünüm süresine dahildir. Akış halindeki yanıtlarda (CSV
+dışa aktarma, canlı güncellemeler) tabloya akış bittiğinde yazılır; Server-Timing başlığı sadece
+akış başlayana kadarki kısmı gösterir.
+"""
+import heapq
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+SAMPLE_SIZE = 200
+SLOW_QUERY_COUNT = 5
+SQL_PREVIEW_LENGTH = 300
+
+_samples = {}
+_lock = threading.Lock()
+
+
+class RequestStats:
+    """Bir isteğin sorgu sayısı, toplam veritabanı süresi ve en yavaş sorguları"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = None
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            item = (duration, self.queries, sql[:SQL_PREVIEW_LENGTH])
+            if len(self.slowest) < SLOW_QUERY_COUNT:
+                heapq.heappush(self.slowest, item)
+            else:
+                heapq.heappushpop(self.slowest, item)
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield
+
+    def slowest_queries(self):
+        return [{'ms': round(duration * 1000, 2), 'sql': sql} for duration, _, sql in sorted(self.slowest, reverse=True)]
+
+
+def server_timing(stats, total):
+    parts = [f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} sorgu"']
+    if stats.render_time is not None:
+        parts.append(f'render;dur={stats.render_time * 1000:.1f}')
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+def record(name, stats, total):
+    sample = {
+        'queries': stats.queries,
+        'db_ms': stats.db_time * 1000,
+        'render_ms': stats.render_time * 1000 if stats.render_time is not None else None,
+        'total_ms': total * 1000,
+        'slowest': stats.slowest_queries(),
+    }
+    with _lock:
+        _samples.setdefault(name, deque(maxlen=SAMPLE_SIZE)).append(sample)
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def summary():
+    """URL adı başına son isteklerin özetini, toplam veritabanı süresine göre azalan sırada döner"""
+    with _lock:
+        samples = {name: list(items) for name, items in _samples.items()}
+    rows = []
+    for name, items in samples.items():
+        queries = [item['queries'] for item in items]
+        db = [item['db_ms'] for item in items]
+        total = [item['total_ms'] for item in items]
+        render = [item['render_ms'] for item in items if item['render_ms'] is not None]
+        slowest = heapq.nlargest(SLOW_QUERY_COUNT, (query for item in items for query in item['slowest']), key=lambda query: query['ms'])
+        rows.append({
+            'url_name': name,
+            'requests': len(items),
+            'queries_avg': round(sum(queries) / len(items), 1),
+            'queries_max': max(queries),
+            'db_ms_avg': round(sum(db) / len(items), 2),
+            'db_ms_p95': round(_percentile(db, 95), 2),
+            'render_ms_avg': round(sum(render) / len(render), 2) if render else None,
+            'total_ms_avg': round(sum(total) / len(items), 2),
+            'total_ms_p95': round(_percentile(total, 95), 2),
+            'slowest_queries': slowest,
+        })
+    rows.sort(key=lambda row: row['db_ms_avg'] * row['requests'], reverse=True)
+    return rows
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def _url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else None
+
+
+class QueryStatsMiddleware:
+    """Sorgu sayısı ve süreleri Server-Timing başlığına ve istatistik tablosuna yazar"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DEPO_QUERY_STATS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = request.query_stats = RequestStats()
+        start = time.perf_counter()
+        with stats.capture():
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        response['Server-Timing'] = server_timing(stats, total)
+
+        name = _url_name(request)
+        if name is None:
+            return response
+        if response.streaming:
+            stream = self._astream if response.is_async else self._stream
+            response.streaming_content = stream(response.streaming_content, name, stats, start)
+        else:
+            record(name, stats, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Bu kanca çizimden hemen önce çağrılır; süre çizimden sonraki geri çağrıda hesaplanır
+        started = time.perf_counter()
+
+        def finished(response):
+            request.query_stats.render_time = time.perf_counter() - started
+
+        response.add_post_render_callback(finished)
+        return response
+
+    def _stream(self, content, name, stats, start):
+        try:
+            with stats.capture():
+                yield from content
+        finally:
+            record(name, stats, time.perf_counter() - start)
+
+    async def _astream(self, content, name, stats, start):
+        # Async akışlar (canlı güncellemeler) veritabanına gitmez; sadece süre yazılır
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            record(name, stats, time.perf_counter() - start)
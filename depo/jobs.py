@@ -0,0 +1,164 @@
+"""Dışa aktarma işlerinin arka planda çalıştırılması.
+
+İşler veritabanında (ExportJob) kuyruklanır ve süreç içindeki bir iş parçacığı havuzunda
+çalıştırılır; harici bir aracıya gerek yoktur. Sunucu yeniden başlarsa sırada kalan işler
+`process_export_jobs` komutuyla tamamlanabilir.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .exports import EXPORTERS, parse_transaction_filters
+from .models import ExportJob
+from .routers import current_database
+from .versions import DATASET, get_version, process_local
+
+logger = logging.getLogger(__name__)
+
+# İş durumu ucunda gösterilen hata; istisna ayrıntısı sadece loga yazılır
+FAILED_MESSAGE = 'Dosya hazırlanırken bir hata oluştu.'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.DEPO_EXPORT_WORKERS, thread_name_prefix='depo-export')
+        return _executor
+
+
+def normalize_params(kind, params):
+    """İş parametrelerini JSON'a uygun ve karşılaştırılabilir biçime getirir"""
+    if kind != 'transactions':
+        return {}
+    normalized = {}
+    for key in ('date_from', 'date_to'):
+        if params.get(key):
+            normalized[key] = params.get(key)
+    products = params.getlist('product') if hasattr(params, 'getlist') else params.get('product')
+    if products:
+        if not isinstance(products, (list, tuple)):
+            products = [products]
+        normalized['product'] = sorted({str(pk) for pk in products})
+    # Geçersiz filtreler iş kuyruğa girmeden reddedilir
+    parse_transaction_filters(normalized)
+    return normalized
+
+
+def fingerprint(kind, params):
+    # Aynı istek + aynı veri sürümü = aynı dosya
+    payload = json.dumps({'kind': kind, 'params': params, 'version': get_version(DATASET)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def submit_export(kind, params=None):
+    """Dışa aktarma işini kuyruğa ekler; aynı veriyle hazırlanmış/hazırlanan bir iş varsa onu döner"""
+    if kind not in EXPORTERS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    params = normalize_params(kind, params or {})
+    job_fingerprint = fingerprint(kind, params)
+
+    # Süreç çökerse iş "hazırlanıyor" durumunda kalır; süresi geçen işler hatalı sayılır ki aynı
+    # istek sonsuza dek o işe bağlanmasın
+    stale_before = timezone.now() - timedelta(minutes=settings.DEPO_EXPORT_STALE_MINUTES)
+    ExportJob.objects.filter(
+        fingerprint=job_fingerprint, status=ExportJob.STATUS_RUNNING, started_at__lt=stale_before,
+    ).update(status=ExportJob.STATUS_FAILED, error='İş zamanında tamamlanmadı.', finished_at=timezone.now())
+
+    reusable = ExportJob.objects.filter(
+        fingerprint=job_fingerprint,
+        status__in=[ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING, ExportJob.STATUS_DONE],
+    )
+    if process_local():
+        # Başka süreçte yazılan değişiklik buradaki veri sürümünü artırmaz; hazır dosya en fazla
+        # DEPO_LOCAL_CACHE_SECONDS saniye yeniden kullanılır (bkz. versions.cache_timeout)
+        fresh_after = timezone.now() - timedelta(seconds=settings.DEPO_LOCAL_CACHE_SECONDS)
+        reusable = reusable.exclude(status=ExportJob.STATUS_DONE, finished_at__lt=fresh_after)
+    existing = reusable.order_by('-created_at').first()
+    if existing is not None and (existing.status != ExportJob.STATUS_DONE or os.path.exists(existing.file_path)):
+        return existing
+
+    job = ExportJob.objects.create(kind=kind, params=params, fingerprint=job_fingerprint)
+    transaction.on_commit(lambda: enqueue(job.pk), using=current_database())
+    return job
+
+
+def enqueue(job_id):
+    if settings.DEPO_EXPORT_WORKERS:
+        # İş parçacığı seçili depoyu (bkz. routers.py) isteğin bağlamından devralır
+        _get_executor().submit(contextvars.copy_context().run, _run_in_worker, job_id)
+    else:
+        run_job(job_id)
+
+
+def _run_in_worker(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        # İş parçacığının açtığı bağlantılar havuza geri dönmez, kapatılır
+        connections.close_all()
+
+
+def _output_path(job):
+    prefix = EXPORTERS[job.kind][0]
+    directory = Path(settings.DEPO_EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f'{prefix}_{timezone.localtime(job.created_at).strftime("%Y%m%d_%H%M%S")}_{job.pk.hex[:8]}.xlsx'
+
+
+def run_job(job_id):
+    """Sıradaki işi çalıştırır; başka bir worker işi önceden aldıysa hiçbir şey yapmaz"""
+    claimed = ExportJob.objects.filter(pk=job_id, status=ExportJob.STATUS_PENDING).update(
+        status=ExportJob.STATUS_RUNNING, started_at=timezone.now(),
+    )
+    if not claimed:
+        return
+    job = ExportJob.objects.get(pk=job_id)
+    path = _output_path(job)
+    last_percent = [0]
+
+    def progress(done, total):
+        percent = 100 if not total else min(99, done * 100 // total)
+        if percent != last_percent[0]:
+            last_percent[0] = percent
+            ExportJob.objects.filter(pk=job_id).update(progress=percent)
+
+    exporter = EXPORTERS[job.kind][1]
+    filters = parse_transaction_filters(job.params) if job.kind == 'transactions' else {}
+    try:
+        with open(path, 'wb') as output:
+            exporter(output, progress=progress, **filters)
+    except Exception:
+        # İş durumu ucunda sadece genel bir mesaj görünür; ayrıntı loga yazılır
+        logger.exception('Dışa aktarma işi %s başarısız oldu', job_id)
+        if path.exists():
+            path.unlink()
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.STATUS_FAILED, error=FAILED_MESSAGE, finished_at=timezone.now(),
+        )
+        return
+    ExportJob.objects.filter(pk=job_id).update(
+        status=ExportJob.STATUS_DONE, progress=100, file_path=str(path), finished_at=timezone.now(),
+    )
+
+
+def process_pending_jobs():
+    """Sırada bekleyen tüm işleri çalıştırır, çalıştırılan iş sayısını döner"""
+    count = 0
+    for job_id in ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('created_at').values_list('pk', flat=True):
+        run_job(job_id)
+        count += 1
+    return count
@@ -0,0 +1,257 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from .models import Product, EntryTransaction, ExitTransaction, StockBalance, WarehouseStock, default_warehouse
+from .routers import current_database
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product, requested, available):
+        self.product = product
+        self.requested = requested
+        self.available = available
+        super().__init__(f"{product}: istenen {requested}, mevcut {available}")
+
+
+def _apply_warehouse_movement(warehouse_id, product_id, quantity_in, quantity_out):
+    stocks = WarehouseStock.objects.filter(warehouse_id=warehouse_id, product_id=product_id)
+    updates = {
+        'total_in': F('total_in') + quantity_in,
+        'total_out': F('total_out') + quantity_out,
+        'on_hand': F('on_hand') + quantity_in - quantity_out,
+    }
+    if not stocks.update(**updates):
+        # Ürünün depodaki ilk hareketi; eşzamanlı bir işlem satırı önce oluşturduysa onunki kullanılır
+        WarehouseStock.objects.bulk_create([WarehouseStock(warehouse_id=warehouse_id, product_id=product_id)], ignore_conflicts=True)
+        stocks.update(**updates)
+
+
+def apply_movement(product_id, quantity_in=0, quantity_out=0, moved_at=None, warehouse_id=None):
+    """Ürünün stok bakiyesine (depo verilmişse depodaki bakiyesine de) giriş/çıkış farkını uygular"""
+    if warehouse_id is not None:
+        _apply_warehouse_movement(warehouse_id, product_id, quantity_in, quantity_out)
+    updates = {
+        'total_in': F('total_in') + quantity_in,
+        'total_out': F('total_out') + quantity_out,
+        'on_hand': F('on_hand') + quantity_in - quantity_out,
+    }
+    if moved_at is not None and (quantity_in > 0 or quantity_out > 0):
+        updates['last_movement_at'] = Coalesce(Greatest('last_movement_at', Value(moved_at)), Value(moved_at))
+    return StockBalance.objects.filter(product_id=product_id).update(**updates)
+
+
+def apply_warehouse_movements(deltas, batch_size=500):
+    """{(ürün, depo): (giriş, çıkış)} farklarını depo bakiyelerine toplu uygular (içe aktarma gibi
+    toplu yazmalar için). Açık bir transaction.atomic() bloğu içinde çağrılmalıdır.
+    """
+    keys = list(deltas)
+    for start in range(0, len(keys), batch_size):
+        chunk = keys[start:start + batch_size]
+        current = {
+            (product_id, warehouse_id): (total_in, total_out)
+            for product_id, warehouse_id, total_in, total_out in WarehouseStock.objects.select_for_update()
+            .filter(product_id__in={product_id for product_id, _ in chunk})
+            .values_list('product_id', 'warehouse_id', 'total_in', 'total_out')
+        }
+        stocks = []
+        for key in chunk:
+            total_in, total_out = current.get(key, (0, 0))
+            total_in += deltas[key][0]
+            total_out += deltas[key][1]
+            stocks.append(WarehouseStock(
+                product_id=key[0], warehouse_id=key[1], total_in=total_in, total_out=total_out, on_hand=total_in - total_out,
+            ))
+        WarehouseStock.objects.bulk_create(
+            stocks,
+            update_conflicts=True,
+            unique_fields=['warehouse', 'product'],
+            update_fields=['total_in', 'total_out', 'on_hand'],
+        )
+
+
+# SQLite'ta aynı süreçteki iş parçacıkları veritabanı kilidini meşgul-bekleme ile
+# yoklamak yerine bu kilitte sıraya girer; süreçler arası sıralamayı lock_balance sağlar
+_sqlite_write_locks = {}
+_sqlite_write_locks_guard = threading.Lock()
+# Yazma kilidi tutulurken ertelenen işler (bkz. after_serialized_writes)
+_serialized_state = threading.local()
+
+
+@contextmanager
+def _serialized_writes():
+    # Her depo veritabanının yazma kilidi ayrıdır; burada da ayrı sıraya girilmese bir depodaki
+    # çıkış diğerininkini bekletirdi
+    depth = getattr(_serialized_state, 'depth', 0)
+    if not depth:
+        _serialized_state.deferred = []
+    _serialized_state.depth = depth + 1
+    try:
+        if connections[current_database()].features.has_select_for_update:
+            yield
+        else:
+            with _sqlite_write_locks_guard:
+                lock = _sqlite_write_locks.setdefault(current_database(), threading.RLock())
+            with lock:
+                yield
+    finally:
+        _serialized_state.depth = depth
+    if not depth:
+        deferred, _serialized_state.deferred = _serialized_state.deferred, []
+        for func in deferred:
+            func()
+
+
+def after_serialized_writes(func):
+    """func'ı yazma kilidi bırakıldıktan sonra çalıştırır; kilit tutulmuyorsa hemen çalıştırır.
+
+    İşlemin on_commit geri çağrıları kilit içinde çalışır; onaydan sonraki yavaş işler (ör. canlı
+    güncellemeler) diğer yazıcıları bekletmesin diye buradan ertelenir.
+    """
+    if getattr(_serialized_state, 'depth', 0):
+        _serialized_state.deferred.append(func)
+    else:
+        func()
+
+
+def lock_balance(product_id):
+    """Ürünün bakiye satırını işlem bitene kadar kilitler ve güncel halini döner.
+
+    Açık bir transaction.atomic() bloğu içinde çağrılmalıdır.
+    """
+    balances = StockBalance.objects.filter(product_id=product_id)
+    if connections[balances.db].features.has_select_for_update:
+        return balances.select_for_update().first()
+    # SQLite satır kilidi desteklemez; işlemin ilk ifadesi olarak yapılan boş bir UPDATE
+    # veritabanı yazma kilidini alır ve diğer yazıcılar işlem bitene kadar bekler
+    balances.update(on_hand=F('on_hand'))
+    return balances.first()
+
+
+def record_exit(product, quantity, department=None, warehouse=None):
+    """Stok çıkışını kilit altında deponun bakiyesiyle yeniden doğrulayıp kaydeder, yetersizse
+    InsufficientStock fırlatır. Depo verilmezse varsayılan depodan çıkılır.
+    """
+    warehouse_id = warehouse.pk if warehouse is not None else default_warehouse()
+    with _serialized_writes(), transaction.atomic(using=current_database()):
+        # Ürünün bakiye satırı kilitlenir; depo bakiyeleri de aynı işlemlerde değiştiği için onları da korur
+        if lock_balance(product.pk) is None:
+            available = 0
+        else:
+            stock = WarehouseStock.objects.filter(warehouse_id=warehouse_id, product_id=product.pk).values_list('on_hand', flat=True).first()
+            available = max(0, stock or 0)
+        if quantity > available:
+            raise InsufficientStock(product, quantity, available)
+        return ExitTransaction.objects.create(product=product, quantity=quantity, department=department, warehouse_id=warehouse_id)
+
+
+def refresh_last_movement(product_id):
+    """Son hareket tarihini hareket tablolarından yeniden okur (silme sonrası)"""
+    last_entry = EntryTransaction.objects.filter(product_id=product_id).aggregate(last=Max('entry_date'))['last']
+    last_exit = ExitTransaction.objects.filter(product_id=product_id).aggregate(last=Max('exit_date'))['last']
+    dates = [d for d in (last_entry, last_exit) if d is not None]
+    StockBalance.objects.filter(product_id=product_id).update(last_movement_at=max(dates) if dates else None)
+
+
+def compute_ledger_totals(product_ids=None):
+    """Hareket tablolarından ürün bazında toplam giriş/çıkış ve son hareket tarihini hesaplar"""
+    entries = EntryTransaction.objects.all()
+    exits = ExitTransaction.objects.all()
+    if product_ids is not None:
+        entries = entries.filter(product_id__in=product_ids)
+        exits = exits.filter(product_id__in=product_ids)
+
+    totals = {}
+    for row in entries.values('product_id').annotate(total=Sum('quantity'), last=Max('entry_date')).order_by():
+        totals[row['product_id']] = {'total_in': row['total'], 'total_out': 0, 'last_movement_at': row['last']}
+    for row in exits.values('product_id').annotate(total=Sum('quantity'), last=Max('exit_date')).order_by():
+        item = totals.setdefault(row['product_id'], {'total_in': 0, 'total_out': 0, 'last_movement_at': None})
+        item['total_out'] = row['total']
+        if item['last_movement_at'] is None or row['last'] > item['last_movement_at']:
+            item['last_movement_at'] = row['last']
+    for item in totals.values():
+        item['on_hand'] = item['total_in'] - item['total_out']
+    return totals
+
+
+def compute_warehouse_totals(product_ids=None):
+    """Hareket tablolarından (ürün, depo) bazında toplam giriş/çıkış ve kalan stoğu hesaplar"""
+    totals = {}
+    for model, field in ((EntryTransaction, 'total_in'), (ExitTransaction, 'total_out')):
+        movements = model.objects.all()
+        if product_ids is not None:
+            movements = movements.filter(product_id__in=product_ids)
+        for row in movements.values('product_id', 'warehouse_id').annotate(total=Sum('quantity')).order_by():
+            item = totals.setdefault((row['product_id'], row['warehouse_id']), {'total_in': 0, 'total_out': 0})
+            item[field] = row['total']
+    for item in totals.values():
+        item['on_hand'] = item['total_in'] - item['total_out']
+    return totals
+
+
+def rebuild_balances(product_ids=None):
+    """Stok ve depo bakiyelerini hareket tablolarından yeniden oluşturur, güncellenen ürün sayısını döner"""
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    product_ids = list(products.values_list('pk', flat=True))
+    totals = compute_ledger_totals(product_ids)
+    empty = {'total_in': 0, 'total_out': 0, 'on_hand': 0, 'last_movement_at': None}
+
+    balances = [StockBalance(product_id=pk, **totals.get(pk, empty)) for pk in product_ids]
+    stocks = [
+        WarehouseStock(product_id=product_id, warehouse_id=warehouse_id, **item)
+        for (product_id, warehouse_id), item in compute_warehouse_totals(product_ids).items()
+    ]
+    with transaction.atomic(using=current_database()):
+        StockBalance.objects.bulk_create(
+            balances,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['total_in', 'total_out', 'on_hand', 'last_movement_at'],
+        )
+        WarehouseStock.objects.filter(product__in=products).delete()
+        WarehouseStock.objects.bulk_create(stocks, batch_size=500)
+    return len(balances)
+
+
+def verify_balances(product_ids=None):
+    """Kayıtlı bakiyeleri hareket tablolarıyla karşılaştırır, tutarsız ürünlerin listesini döner"""
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    stored = {
+        row['product_id']: row
+        for row in StockBalance.objects.filter(product__in=products).values('product_id', 'total_in', 'total_out', 'on_hand')
+    }
+
+    mismatches = []
+    names = {}
+    for row in products.with_ledger_stock().values('pk', 'name', 'total_entry', 'total_exit', 'current_stock'):
+        names[row['pk']] = row['name']
+        expected = {'total_in': row['total_entry'], 'total_out': row['total_exit'], 'on_hand': row['current_stock']}
+        actual = stored.get(row['pk'])
+        if actual is not None:
+            actual = {key: actual[key] for key in expected}
+        if actual != expected:
+            mismatches.append({'product_id': row['pk'], 'name': row['name'], 'expected': expected, 'actual': actual})
+
+    # Depo bakiyeleri; hareketi kalmamış depo satırının sıfır olması beklenir
+    expected_stocks = compute_warehouse_totals(product_ids)
+    stored_stocks = {
+        (row.pop('product_id'), row.pop('warehouse_id')): row
+        for row in WarehouseStock.objects.filter(product__in=products).values('product_id', 'warehouse_id', 'total_in', 'total_out', 'on_hand')
+    }
+    empty = {'total_in': 0, 'total_out': 0, 'on_hand': 0}
+    for product_id, warehouse_id in sorted(expected_stocks.keys() | stored_stocks.keys()):
+        expected = expected_stocks.get((product_id, warehouse_id), empty)
+        actual = stored_stocks.get((product_id, warehouse_id))
+        if actual != expected and not (actual is None and expected == empty):
+            mismatches.append({
+                'product_id': product_id, 'name': names[product_id], 'warehouse_id': warehouse_id,
+                'expected': expected, 'actual': actual,
+            })
+    return mismatches
@@ -0,0 +1,132 @@
+import base64
+import json
+
+from django.db.models import F, Q
+from .models import Product
+from .parsing import MAX_INT, MIN_INT, parse_int
+from . import search
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Dışarıya açık sıralama adı -> (sorgu alanı, eşitlik bozucu alan, azalan mı)
+SORT_FIELDS = {
+    'name': ('name', 'pk', False),
+    '-name': ('name', 'pk', True),
+    'stock': ('stock_balance__on_hand', 'stock_balance__product_id', False),
+    '-stock': ('stock_balance__on_hand', 'stock_balance__product_id', True),
+}
+
+
+# İmleçteki sıralama değerinin beklenen türü
+CURSOR_TYPES = {
+    'name': str,
+    'stock_balance__on_hand': int,
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    payload = json.dumps([value, pk], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field=None):
+    """İmleci (değer, id) çiftine çözer; alan verilmişse değer o sıralama alanının türünde olmalıdır"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        pk = parse_int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    # JSON'da true/false da int sayılır
+    if field is not None and (not isinstance(value, CURSOR_TYPES[field]) or isinstance(value, bool)):
+        raise InvalidCursor(cursor)
+    if isinstance(value, int) and not MIN_INT <= value <= MAX_INT:
+        raise InvalidCursor(cursor)
+    return value, pk
+
+
+def _int_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return parse_int(value)
+    except ValueError:
+        raise InvalidFilter(name)
+
+
+def filter_products(queryset, params):
+    """Arama ve filtre parametrelerini ürün sorgusuna uygular; sayısal filtre hatalıysa InvalidFilter fırlatır"""
+    quantity_type_id = _int_param(params, 'quantity_type')
+    shelf_id = _int_param(params, 'shelf')
+    query = (params.get('q') or '').strip()
+    if query:
+        # Ad, raf ve miktar türü arama indeksinden aranır (bkz. search.py)
+        queryset = search.filter_queryset(queryset, query)
+    if quantity_type_id is not None:
+        queryset = queryset.filter(quantity_type_id=quantity_type_id)
+    if shelf_id is not None:
+        queryset = queryset.filter(shelf_id=shelf_id)
+    if params.get('below_minimum') in ('1', 'true', 'on'):
+        queryset = queryset.filter(stock_balance__on_hand__lte=F('minimum_quantity'))
+    return queryset
+
+
+def paginate_products(queryset, sort='name', cursor=None, limit=PAGE_SIZE):
+    """Ürünleri (sıralama alanı, id) anahtarına göre imleçle sayfalar, (ürünler, sonraki imleç) döner"""
+    field, tiebreak, descending = SORT_FIELDS.get(sort, SORT_FIELDS['name'])
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        value, pk = decode_cursor(cursor, field)
+        lookup = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'{tiebreak}__{lookup}': pk})
+        )
+
+    if field != 'name':
+        # İç birleşim, SQLite'ın sıralamayı bakiye indeksinden okumasını sağlar
+        queryset = queryset.filter(stock_balance__isnull=False)
+    ordering = [f'-{field}', f'-{tiebreak}'] if descending else [field, tiebreak]
+    products = list(queryset.order_by(*ordering)[:limit + 1])
+
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        last = products[-1]
+        value = last.name if field == 'name' else last.current_stock
+        next_cursor = encode_cursor(value, last.pk)
+    return products, next_cursor
+
+
+def product_page(params, limit=PAGE_SIZE):
+    """Dashboard tablosunun bir sayfasını istek parametrelerine göre hazırlar"""
+    queryset = filter_products(
+        Product.objects.with_stock().select_related('quantity_type', 'shelf'),
+        params,
+    )
+    return paginate_products(queryset, params.get('sort') or 'name', params.get('cursor'), limit)
+
+
+def serialize_product(product):
+    return {
+        'id': product.pk,
+        'name': product.name,
+        'url': product.get_absolute_url(),
+        'total_entry': product.total_entry,
+        'total_exit': product.total_exit,
+        'current_stock': product.current_stock,
+        'minimum_quantity': product.minimum_quantity,
+        'is_below_minimum': product.is_below_minimum,
+        'quantity_type': product.quantity_type.name if product.quantity_type else '',
+        'shelf': product.shelf.name if product.shelf else '',
+    }
@@ -0,0 +1,193 @@
+"""Dashboard'a canlı stok güncellemeleri.
+
+Bir giriş/çıkış işlemi onaylandığında değişen ürünlerin güncel stoğu ve dashboard satırlarının
+HTML'i (bkz. fragments.product_rows) tek seferde hazırlanıp süreç içi bir yayın kuyruğuna yazılır. Dashboard
+bunları Server-Sent Events ile (ASGI altında) ya da uzun sorgulama ile alır ve sadece değişen
+satırları yerinde günceller.
+
+Son IDLE_SECONDS içinde bekleyen bir istemci yoksa satırlar hiç okunmaz; kuyruğa sorgusuz bir
+"yeniden yükle" olayı yazılır, sonradan bağlanan istemci tabloyu yeniden yükler.
+
+Kuyruk son BUFFER_SIZE olayı sıra numarasıyla tutar; bağlantısı kopan istemci son aldığı numarayı
+(Last-Event-ID) göndererek kaçırdıklarını alır. Kaçırılan olaylar kuyruktan düşmüşse ya da süreç
+yeniden başlamışsa istemciye tabloyu yeniden yüklemesi söylenir. Sıra numaraları zamana bağlı
+başlar, böylece yeniden başlayan süreç eski numaralarla karışmaz.
+
+Kuyruk süreç başınadır, dış bir aracı gerektirmez: olaylar sadece işlemin yapıldığı süreçteki
+bağlantılara ulaşır ve sıra numaraları başka bir sürecin kuyruğunda anlamsızdır. Bu yüzden SSE ve
+uzun sorgulama sadece ASGI altında sunulur (WSGI'da her bekleyen istek bir worker'ı tutardı) ve
+birden fazla worker süreciyle çalışılıyorsa DEPO_LIVE_UPDATES kapatılmalıdır. Depo veritabanları kullanılıyorsa (bkz. routers.py) her veritabanının
+kuyruğu ayrıdır; ürün id'leri veritabanları arasında çakışır.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from django.db import DEFAULT_DB_ALIAS
+
+from . import fragments
+from .routers import current_database
+
+BUFFER_SIZE = 500
+# Bundan fazla ürün değişirse (ör. toplu içe aktarma) satırlar yerine tablo yeniden yüklenir
+MAX_EVENT_PRODUCTS = 100
+# SSE bağlantısında bu kadar saniye olay yoksa yorum satırı gönderilir; vekil sunucular bağlantıyı kesmesin
+HEARTBEAT_SECONDS = 20
+# SSE bağlantısı bu süre sonunda kapanır, tarayıcı Last-Event-ID ile yeniden bağlanır
+STREAM_SECONDS = 15 * 60
+LONG_POLL_SECONDS = 25
+# Son bekleyen istemciden bu kadar saniye sonra kuyruk boşta sayılır; uzun sorgulamanın iki isteği
+# arasındaki boşluğu kapsamalıdır
+IDLE_SECONDS = 10
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class EventBroker:
+    """Sıra numaralı olayları tutan ve bekleyen istemcileri uyandıran süreç içi yayın kuyruğu.
+
+    Olaylar herhangi bir iş parçacığından yayınlanabilir; bekleyenler kendi olay döngülerinde
+    uyandırılır (WSGI altında her async görünüm ayrı bir döngüde çalışır).
+    """
+
+    def __init__(self, size=BUFFER_SIZE):
+        self._events = deque(maxlen=size)
+        self._last_id = time.time_ns() // 1000
+        self._lock = threading.Lock()
+        self._waiters = set()
+        self._last_seen = None
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, data):
+        with self._lock:
+            self._last_id += 1
+            self._events.append((self._last_id, data))
+            waiters, self._waiters = self._waiters, set()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # Döngüsü kapanmış bekleyen
+                pass
+        return self._last_id
+
+    def has_subscribers(self):
+        """Olay bekleyen ya da son IDLE_SECONDS içinde beklemiş bir istemci var mı"""
+        with self._lock:
+            if self._waiters:
+                return True
+            return self._last_seen is not None and time.monotonic() - self._last_seen < IDLE_SECONDS
+
+    def _since(self, last_id):
+        if last_id == self._last_id:
+            return [], False
+        # Aradaki olaylar kuyruktan düşmüş ya da numara bu sürece ait değil
+        if last_id > self._last_id or not self._events or last_id < self._events[0][0] - 1:
+            return [], True
+        return [(event_id, data) for event_id, data in self._events if event_id > last_id], False
+
+    def since(self, last_id):
+        """last_id'den sonraki olaylar ve tablonun yeniden yüklenmesi gerekip gerekmediği"""
+        with self._lock:
+            return self._since(last_id)
+
+    async def wait(self, last_id, timeout):
+        """last_id'den sonra olay gelene ya da timeout dolana kadar bekler; since() ile aynı sonucu döner"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            self._last_seen = time.monotonic()
+            events, reload = self._since(last_id)
+            if events or reload:
+                return events, reload
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._last_seen = time.monotonic()
+                self._waiters.discard(waiter)
+        return self.since(last_id)
+
+
+broker = EventBroker()
+
+# 'default' dışındaki depo veritabanlarının kuyrukları
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    """Seçili deponun veritabanına ait yayın kuyruğu"""
+    alias = current_database()
+    if alias == DEFAULT_DB_ALIAS:
+        return broker
+    with _brokers_lock:
+        return _brokers.setdefault(alias, EventBroker())
+
+
+def stock_event(product_ids):
+    """Değişen ürünlerin güncel stok bilgisi ve dashboard satırları"""
+    from .listing import serialize_product
+    from .models import Product
+
+    if len(product_ids) > MAX_EVENT_PRODUCTS:
+        return {'reload': True}
+    products = list(
+        Product.objects.with_stock().select_related('quantity_type', 'shelf').filter(pk__in=product_ids).order_by('name')
+    )
+    return {
+        'products': [serialize_product(product) for product in products],
+        'html': fragments.product_rows(products),
+    }
+
+
+def publish_stock(product_ids):
+    source = get_broker()
+    # Dinleyen yoksa satırlar boşuna okunup işlenmez; geri dönen istemci tabloyu yeniden yükler
+    source.publish(stock_event(product_ids) if source.has_subscribers() else {'reload': True})
+
+
+def parse_last_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_sse(event_id, data):
+    event = 'reload' if data.get('reload') else 'stock'
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_stream(last_id, timeout=STREAM_SECONDS, source=None):
+    """SSE akışı: kaçırılan olaylar, ardından yeni olaylar ve aralarda bağlantıyı canlı tutan yorumlar.
+
+    Akış görünüm döndükten sonra okunduğu için kuyruk (source) görünümde seçilip verilir.
+    """
+    source = source or broker
+    yield "retry: 3000\n\n"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        events, reload = await source.wait(last_id, min(HEARTBEAT_SECONDS, max(0, deadline - time.monotonic())))
+        if reload:
+            last_id = source.last_id
+            yield format_sse(last_id, {'reload': True})
+            continue
+        if not events:
+            yield ': ping\n\n'
+            continue
+        for event_id, data in events:
+            last_id = event_id
+            yield format_sse(event_id, data)
@@ -0,0 +1,25 @@
+from abc import ABCMeta, abstractmethod
+
+from django.core.management.base import BaseCommand, CommandError
+
+from depo.routers import use_warehouse, warehouse_databases
+
+
+class WarehouseCommand(BaseCommand, metaclass=ABCMeta):
+    """Depo veritabanları kullanılıyorsa (DEPO_WAREHOUSE_DATABASES) --warehouse ile seçilen deponun
+    veritabanında çalışan komut; alt sınıflar handle yerine _handle(options) yazar
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warehouse', help="Depo veritabanları kullanılıyorsa (DEPO_WAREHOUSE_DATABASES) işlenecek deponun kodu.")
+
+    def handle(self, *args, **options):
+        code = options['warehouse']
+        if code is not None and code not in warehouse_databases():
+            raise CommandError(f"Veritabanı tanımlı bir depo değil: {code}")
+        with use_warehouse(code):
+            self._handle(options)
+
+    @abstractmethod
+    def _handle(self, options):
+        """Komutun işi; seçili deponun veritabanında çalışır"""
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from depo import archive
+from depo.management.base import WarehouseCommand
+from depo.parsing import parse_day
+from depo.snapshots import end_of_day
+
+
+class Command(WarehouseCommand):
+    help = "Eski giriş/çıkış hareketlerini arşiv tablolarına taşır, ürün başına bir devir kaydı bırakır. Yarıda kalırsa yeniden çalıştırılabilir."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--before', help="Bu günden (dahil değil) önceki hareketler taşınır (YYYY-MM-DD).")
+        parser.add_argument('--days', type=int, help=f"Bu kadar günden eski hareketler taşınır (varsayılan: {settings.DEPO_ARCHIVE_AFTER_DAYS}).")
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE, help="Bir veritabanı işleminde taşınan hareket sayısı.")
+        parser.add_argument('--max-batches', type=int, help="Bu kadar partiden sonra durur; kalan bir sonraki çalıştırmada taşınır.")
+        parser.add_argument('--dry-run', action='store_true', help="Sadece taşınacak hareket sayısını gösterir.")
+
+    def _handle(self, options):
+        if options['before']:
+            day = parse_day(options['before'])
+            if day is None:
+                raise CommandError(f"Geçersiz tarih: {options['before']}")
+            horizon = end_of_day(day - timedelta(days=1))
+        else:
+            days = options['days'] if options['days'] is not None else settings.DEPO_ARCHIVE_AFTER_DAYS
+            try:
+                horizon = end_of_day(timezone.localdate() - timedelta(days=days + 1))
+            except OverflowError:
+                raise CommandError(f"Geçersiz gün sayısı: {days}")
+
+        pending = archive.pending_count(horizon)
+        self.stdout.write(f"{horizon:%d.%m.%Y} öncesinde arşivlenecek {pending} hareket var.")
+        if options['dry_run'] or not pending:
+            return
+
+        def progress(model, moved):
+            self.stdout.write(f"  {model._meta.verbose_name_plural}: {moved} hareket taşındı")
+
+        moved = archive.archive_movements(horizon, options['batch_size'], options['max_batches'], progress)
+        remaining = pending - moved
+        message = f"{moved} hareket arşivlendi."
+        if remaining > 0:
+            message += f" {remaining} hareket kaldı; komutu yeniden çalıştırın."
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from depo.query_audit import HOT_QUERIES, audit, failures
+
+
+class Command(BaseCommand):
+    help = "Sık çalışan sorguların EXPLAIN QUERY PLAN çıktısını inceler; tam tablo taraması varsa hata verir."
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Denetlenecek senaryolar (varsayılan: hepsi). Seçenekler: {', '.join(sorted(HOT_QUERIES))}")
+        parser.add_argument('--show-plans', action='store_true', help="Her sorgunun SQL'ini ve planını yazar.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Sorgu planı denetimi sadece SQLite için yazıldı.")
+        unknown = [name for name in options['names'] if name not in HOT_QUERIES]
+        if unknown:
+            raise CommandError(f"Bilinmeyen senaryo(lar): {', '.join(unknown)}")
+
+        report = audit(options['names'] or None)
+        for name, queries in report.items():
+            scanned = set().union(*(scans for _, _, scans in queries)) if queries else set()
+            status = self.style.ERROR(f"TARAMA: {', '.join(sorted(scanned))}") if scanned else self.style.SUCCESS("OK")
+            self.stdout.write(f"{name}: {len(queries)} sorgu, {status}")
+            if options['show_plans'] or scanned:
+                for sql, plan, scans in queries:
+                    if options['show_plans'] or scans:
+                        self.stdout.write(f"  {sql}")
+                        for line in plan:
+                            self.stdout.write(f"    {line}")
+
+        failed = failures(report)
+        if failed:
+            raise CommandError(f"Tam tablo taraması yapan senaryolar: {', '.join(sorted(failed))}")
@@ -0,0 +1,53 @@
+import inspect
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from depo.bench import BENCHMARKS, compare, scratch_database
+
+
+def _parse_option(value):
+    key, sep, raw = value.partition('=')
+    if not sep:
+        raise CommandError(f"Geçersiz seçenek: {value} (anahtar=değer bekleniyor)")
+    try:
+        return key, json.loads(raw)
+    except ValueError:
+        return key, raw
+
+
+class Command(BaseCommand):
+    help = "Performans ölçümlerini geçici bir veritabanında çalıştırır ve sonuçları JSON olarak yazar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Çalıştırılacak ölçümler (varsayılan: hepsi). Seçenekler: {', '.join(sorted(BENCHMARKS))}")
+        parser.add_argument('-o', '--option', action='append', default=[], help="Ölçüm parametresi, ör. -o threads=16")
+        parser.add_argument('--output', help="Sonuçların yazılacağı JSON dosyası.")
+        parser.add_argument('--compare', help="Karşılaştırılacak önceki sonuç dosyası (JSON).")
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Bilinmeyen ölçüm(ler): {', '.join(unknown)}")
+        params = dict(_parse_option(value) for value in options['option'])
+
+        results = {}
+        for name in names:
+            func = BENCHMARKS[name]
+            # Birden fazla ölçüm çalışırken her biri sadece tanıdığı parametreleri alır
+            accepted = inspect.signature(func).parameters
+            with scratch_database():
+                results[name] = func(**{key: value for key, value in params.items() if key in accepted})
+
+        output = json.dumps(results, indent=2, ensure_ascii=False, default=str)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)
+            for path, old, new in compare(previous, json.loads(output)):
+                change = f" ({(new - old) / old * 100:+.1f}%)" if old else ""
+                self.stdout.write(f"{path}: {old} -> {new}{change}")
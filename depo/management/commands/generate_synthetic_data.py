@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from depo.models import Product
+from depo.synthetic import generate_dataset
+
+
+class Command(BaseCommand):
+    help = "Performans ölçümleri için çarpık dağılımlı sentetik ürün, raf, departman ve hareket verisi üretir. Boş bir veritabanında çalıştırılmalıdır."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--movements', type=int, default=20000)
+        parser.add_argument('--shelves', type=int, help="Varsayılan: ürün sayısının onda biri.")
+        parser.add_argument('--departments', type=int)
+        parser.add_argument('--days', type=int, default=365, help="Hareketlerin yayılacağı gün sayısı.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if Product.objects.exists():
+            raise CommandError("Veritabanında ürün var; sentetik veri sadece boş bir veritabanına üretilir.")
+
+        def progress(done, total):
+            self.stdout.write(f"{done}/{total} hareket yazıldı")
+
+        started = time.perf_counter()
+        counts = generate_dataset(
+            products=options['products'],
+            movements=options['movements'],
+            shelves=options['shelves'],
+            departments=options['departments'],
+            days=options['days'],
+            seed=options['seed'],
+            progress=progress,
+        )
+        summary = ', '.join(f"{key}={value}" for key, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Sentetik veri üretildi ({time.perf_counter() - started:.1f} sn): {summary}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import CommandError
+from depo.imports import ImportFileError, import_entries, read_rows
+from depo.management.base import WarehouseCommand
+
+
+class Command(WarehouseCommand):
+    help = "Excel/CSV dosyasındaki ürün girişlerini toplu olarak içe aktarır."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('path', help="İçe aktarılacak .xlsx veya .csv dosyası.")
+        parser.add_argument('--partial', action='store_true', help="Hatalı satırları atlayıp geçerli satırları içe aktarır.")
+        parser.add_argument('--dry-run', action='store_true', help="Sadece doğrular, hiçbir şey kaydetmez.")
+
+    def _handle(self, options):
+        try:
+            with open(options['path'], 'rb') as file:
+                rows = read_rows(file, options['path'])
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+
+        result = import_entries(rows, partial=options['partial'], dry_run=options['dry_run'])
+        for row in result['rows']:
+            if row['status'] == 'error':
+                self.stdout.write(f"Satır {row['row']}: {' '.join(row['errors'])}")
+
+        summary = result['summary']
+        message = (
+            f"{summary['rows']} satır okundu, {summary['errors']} hatalı, "
+            f"{summary['imported']} giriş kaydedildi, {summary['created_products']} yeni ürün oluşturuldu."
+        )
+        if summary['errors'] and not summary['imported'] and not options['dry_run']:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
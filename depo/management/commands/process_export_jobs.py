@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from depo import jobs
+from depo.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Sırada bekleyen dışa aktarma işlerini çalıştırır (ör. sunucu yeniden başladıktan sonra)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requeue-running', action='store_true', help="Yarıda kalmış 'hazırlanıyor' durumundaki işleri yeniden sıraya alır.")
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            requeued = ExportJob.objects.filter(status=ExportJob.STATUS_RUNNING).update(status=ExportJob.STATUS_PENDING, progress=0)
+            self.stdout.write(f"{requeued} iş yeniden sıraya alındı.")
+        count = jobs.process_pending_jobs()
+        self.stdout.write(self.style.SUCCESS(f"{count} dışa aktarma işi çalıştırıldı."))
@@ -0,0 +1,10 @@
+from depo import search
+from depo.management.base import WarehouseCommand
+
+
+class Command(WarehouseCommand):
+    help = "Ürün arama indeksini tüm ürünlerden yeniden kurar (toplu veri yüklemelerinden sonra)."
+
+    def _handle(self, options):
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"{count} ürün arama indeksine yazıldı."))
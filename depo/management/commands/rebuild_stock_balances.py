@@ -0,0 +1,28 @@
+from django.core.management.base import CommandError
+from depo import ledger
+from depo.management.base import WarehouseCommand
+
+
+class Command(WarehouseCommand):
+    help = "Stok bakiyelerini giriş/çıkış hareketlerinden yeniden oluşturur veya doğrular."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--verify', action='store_true', help="Bakiyeleri değiştirmeden sadece hareketlerle karşılaştırır.")
+        parser.add_argument('--product', type=int, action='append', dest='product_ids', help="Sadece verilen ürün ID'lerini işler.")
+
+    def _handle(self, options):
+        product_ids = options['product_ids']
+
+        if options['verify']:
+            mismatches = ledger.verify_balances(product_ids)
+            for item in mismatches:
+                warehouse = f" depo #{item['warehouse_id']}" if 'warehouse_id' in item else ''
+                self.stdout.write(f"{item['name']} (#{item['product_id']}){warehouse}: kayıtlı={item['actual']} beklenen={item['expected']}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} ürünün stok bakiyesi hareketlerle uyuşmuyor.")
+            self.stdout.write(self.style.SUCCESS("Tüm stok bakiyeleri hareketlerle uyumlu."))
+            return
+
+        count = ledger.rebuild_balances(product_ids)
+        self.stdout.write(self.style.SUCCESS(f"{count} ürünün stok bakiyesi yeniden oluşturuldu."))
@@ -0,0 +1,13 @@
+from django.db import transaction
+from depo import alerts
+from depo.management.base import WarehouseCommand
+from depo.routers import current_database
+
+
+class Command(WarehouseCommand):
+    help = "Kritik stok uyarılarını tüm ürünlerin güncel stoğuyla karşılaştırarak eşitler."
+
+    def _handle(self, options):
+        with transaction.atomic(using=current_database()):
+            opened, resolved = alerts.reconcile()
+        self.stdout.write(self.style.SUCCESS(f"{opened} uyarı açıldı, {resolved} uyarı kapatıldı."))
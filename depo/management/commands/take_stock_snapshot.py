@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from depo.management.base import WarehouseCommand
+from depo.models import StockSnapshot
+from depo.parsing import parse_day
+from depo.snapshots import end_of_day, take_snapshot
+
+
+class Command(WarehouseCommand):
+    help = "Stok anlık görüntüsü alır (günlük: günün sonu, aylık: ayın sonu). Zamanlanmış görev olarak çalıştırılmalıdır."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--period', choices=[StockSnapshot.PERIOD_DAILY, StockSnapshot.PERIOD_MONTHLY], default=StockSnapshot.PERIOD_DAILY)
+        parser.add_argument('--date', help="Görüntüsü alınacak gün/ay (YYYY-MM-DD). Varsayılan: dün / geçen ay.")
+        parser.add_argument('--keep-daily', type=int, help="Bu kadar günden eski günlük görüntüleri siler (aylıklar korunur).")
+
+    def _handle(self, options):
+        today = timezone.localdate()
+        if options['date']:
+            day = parse_day(options['date'])
+            if day is None:
+                raise CommandError(f"Geçersiz tarih: {options['date']}")
+        else:
+            day = today - timedelta(days=1)
+
+        if options['period'] == StockSnapshot.PERIOD_MONTHLY:
+            if not options['date']:
+                day = today.replace(day=1) - timedelta(days=1)
+            # Ayın son günü
+            try:
+                day = (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+            except OverflowError:
+                raise CommandError(f"Geçersiz tarih: {options['date']}")
+
+        taken_at = end_of_day(day)
+        if taken_at > timezone.now():
+            raise CommandError(f"{day} henüz bitmedi, görüntüsü alınamaz.")
+
+        count = take_snapshot(taken_at, options['period'])
+        self.stdout.write(self.style.SUCCESS(f"{day} için {count} ürünün stok görüntüsü kaydedildi."))
+
+        if options['keep_daily'] is not None:
+            threshold = end_of_day(today - timedelta(days=options['keep_daily']))
+            deleted, _ = StockSnapshot.objects.filter(period=StockSnapshot.PERIOD_DAILY, taken_at__lt=threshold).delete()
+            self.stdout.write(f"{deleted} eski günlük görüntü satırı silindi.")
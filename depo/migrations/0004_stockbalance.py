@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Sum
+
+
+def populate_stock_balances(apps, schema_editor):
+    Product = apps.get_model('depo', 'Product')
+    EntryTransaction = apps.get_model('depo', 'EntryTransaction')
+    ExitTransaction = apps.get_model('depo', 'ExitTransaction')
+    StockBalance = apps.get_model('depo', 'StockBalance')
+
+    totals = {}
+    for row in EntryTransaction.objects.values('product_id').annotate(total=Sum('quantity'), last=Max('entry_date')).order_by():
+        totals[row['product_id']] = [row['total'], 0, row['last']]
+    for row in ExitTransaction.objects.values('product_id').annotate(total=Sum('quantity'), last=Max('exit_date')).order_by():
+        item = totals.setdefault(row['product_id'], [0, 0, None])
+        item[1] = row['total']
+        if item[2] is None or row['last'] > item[2]:
+            item[2] = row['last']
+
+    balances = []
+    for product_id in Product.objects.values_list('pk', flat=True):
+        total_in, total_out, last = totals.get(product_id, [0, 0, None])
+        balances.append(StockBalance(
+            product_id=product_id,
+            total_in=total_in,
+            total_out=total_out,
+            on_hand=total_in - total_out,
+            last_movement_at=last,
+        ))
+    StockBalance.objects.bulk_create(balances, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0003_alter_entrytransaction_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_in', models.IntegerField(default=0, verbose_name='Toplam Giriş')),
+                ('total_out', models.IntegerField(default=0, verbose_name='Toplam Çıkış')),
+                ('on_hand', models.IntegerField(default=0, verbose_name='Kalan Stok')),
+                ('last_movement_at', models.DateTimeField(blank=True, null=True, verbose_name='Son Hareket Tarihi')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_balance', to='depo.product', verbose_name='Ürün')),
+            ],
+            options={
+                'verbose_name': 'Stok Bakiyesi',
+                'verbose_name_plural': 'Stok Bakiyeleri',
+            },
+        ),
+        migrations.RunPython(populate_stock_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0004_stockbalance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockbalance',
+            index=models.Index(fields=['on_hand', 'product'], name='depo_balance_on_hand_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:17
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0005_stockbalance_on_hand_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('products', 'Ürünler'), ('transactions', 'Hareketler'), ('parameters', 'Parametreler')], max_length=20, verbose_name='Dışa Aktarma Türü')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parametreler')),
+                ('fingerprint', models.CharField(db_index=True, max_length=64, verbose_name='Parmak İzi')),
+                ('status', models.CharField(choices=[('pending', 'Sırada'), ('running', 'Hazırlanıyor'), ('done', 'Tamamlandı'), ('failed', 'Hata')], default='pending', max_length=10, verbose_name='Durum')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='İlerleme (%)')),
+                ('file_path', models.CharField(blank=True, max_length=500, verbose_name='Dosya')),
+                ('error', models.TextField(blank=True, verbose_name='Hata')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Başlama Tarihi')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Bitiş Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Dışa Aktarma İşi',
+                'verbose_name_plural': 'Dışa Aktarma İşleri',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
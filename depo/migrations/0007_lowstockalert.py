@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0006_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_hand', models.IntegerField(verbose_name='Açılıştaki Stok')),
+                ('minimum_quantity', models.IntegerField(verbose_name='Minimum Miktar')),
+                ('opened_at', models.DateTimeField(auto_now_add=True, verbose_name='Açılış Tarihi')),
+                ('resolved_at', models.DateTimeField(blank=True, null=True, verbose_name='Kapanış Tarihi')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_alerts', to='depo.product', verbose_name='Ürün')),
+            ],
+            options={
+                'verbose_name': 'Kritik Stok Uyarısı',
+                'verbose_name_plural': 'Kritik Stok Uyarıları',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='lowstockalert',
+            constraint=models.UniqueConstraint(condition=models.Q(('resolved_at__isnull', True)), fields=('product',), name='depo_one_open_alert_per_product'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0007_lowstockalert'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entrytransaction',
+            index=models.Index(fields=['product', 'entry_date'], name='depo_entry_product_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exittransaction',
+            index=models.Index(fields=['product', 'exit_date'], name='depo_exit_product_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0008_movement_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(db_index=True, verbose_name='Kesim Zamanı')),
+                ('period', models.CharField(choices=[('daily', 'Günlük'), ('monthly', 'Aylık')], default='daily', max_length=10, verbose_name='Dönem')),
+                ('total_in', models.IntegerField(default=0, verbose_name='Toplam Giriş')),
+                ('total_out', models.IntegerField(default=0, verbose_name='Toplam Çıkış')),
+                ('on_hand', models.IntegerField(default=0, verbose_name='Kalan Stok')),
+            ],
+            options={
+                'verbose_name': 'Stok Anlık Görüntüsü',
+                'verbose_name_plural': 'Stok Anlık Görüntüleri',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='entrytransaction',
+            index=models.Index(fields=['entry_date'], name='depo_entry_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exittransaction',
+            index=models.Index(fields=['exit_date'], name='depo_exit_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='depo.product', verbose_name='Ürün'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('product', 'taken_at'), name='depo_snapshot_product_taken_at_uniq'),
+        ),
+    ]
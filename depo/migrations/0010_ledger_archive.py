@@ -0,0 +1,89 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0009_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEntryTransaction',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entry_date', models.DateTimeField(verbose_name='Giriş Tarihi')),
+                ('quantity', models.IntegerField(verbose_name='Giriş Miktarı')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Arşivlenme Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Arşivlenmiş Giriş Hareketi',
+                'verbose_name_plural': 'Arşivlenmiş Giriş Hareketleri',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedExitTransaction',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('exit_date', models.DateTimeField(verbose_name='Çıkış Tarihi')),
+                ('quantity', models.IntegerField(verbose_name='Çıkış Miktarı')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Arşivlenme Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Arşivlenmiş Çıkış Hareketi',
+                'verbose_name_plural': 'Arşivlenmiş Çıkış Hareketleri',
+            },
+        ),
+        migrations.AddField(
+            model_name='entrytransaction',
+            name='is_opening_balance',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Devir Kaydı'),
+        ),
+        migrations.AddField(
+            model_name='exittransaction',
+            name='is_opening_balance',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Devir Kaydı'),
+        ),
+        migrations.AddConstraint(
+            model_name='entrytransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_opening_balance', True)), fields=('product',), name='depo_one_opening_entry_per_product'),
+        ),
+        migrations.AddConstraint(
+            model_name='exittransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_opening_balance', True)), fields=('product',), name='depo_one_opening_exit_per_product'),
+        ),
+        migrations.AddField(
+            model_name='archivedentrytransaction',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='depo.product', verbose_name='Ürün'),
+        ),
+        migrations.AddField(
+            model_name='archivedexittransaction',
+            name='department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='depo.department', verbose_name='Çıkış Departmanı'),
+        ),
+        migrations.AddField(
+            model_name='archivedexittransaction',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='depo.product', verbose_name='Ürün'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedentrytransaction',
+            index=models.Index(fields=['product', 'entry_date'], name='depo_arch_entry_prod_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedentrytransaction',
+            index=models.Index(fields=['entry_date'], name='depo_arch_entry_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedexittransaction',
+            index=models.Index(fields=['product', 'exit_date'], name='depo_arch_exit_prod_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedexittransaction',
+            index=models.Index(fields=['exit_date'], name='depo_arch_exit_date_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0010_ledger_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exittransaction',
+            index=models.Index(fields=['department', 'exit_date'], name='depo_exit_dept_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['status', 'created_at'], name='depo_exportjob_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['shelf', 'name'], name='depo_product_shelf_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['quantity_type', 'name'], name='depo_product_qtype_name_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Migration geçmişi değişmesin diye tablo adları, normalleştirme ve yazma SQL'i depo.search'ten
+# kopyalanmıştır; orada yapılan değişiklikler bu migration'a yansımaz
+TABLE = 'depo_product_search'
+WORD_TABLE = 'depo_product_search_word'
+WORD_INDEX = 'depo_product_search_word_fts'
+MIN_TOKEN_LENGTH = 3
+
+_FOLD = str.maketrans('ığüşöçâîû', 'igusocaiu')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    text = text.replace('İ', 'i').replace('I', 'ı').lower().translate(_FOLD)
+    text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def write_rows(cursor, rows):
+    cursor.executemany(f'INSERT OR REPLACE INTO {TABLE} (rowid, name, shelf, quantity_type) VALUES (%s, %s, %s, %s)', rows)
+    words = {word for row in rows for text in row[1:] for word in text.split() if len(word) >= MIN_TOKEN_LENGTH and not word.isdigit()}
+    cursor.executemany(f'INSERT OR IGNORE INTO {WORD_TABLE} (word) VALUES (%s)', [(word,) for word in words])
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Product = apps.get_model('depo', 'Product')
+    schema_editor.execute(f"CREATE VIRTUAL TABLE {TABLE} USING fts5(name, shelf, quantity_type, tokenize='trigram')")
+    # Yazım düzeltmesi için kelime sözlüğü; trigram indeksi tetikleyiciyle güncel tutulur
+    schema_editor.execute(f'CREATE TABLE {WORD_TABLE} (id integer PRIMARY KEY, word text NOT NULL UNIQUE)')
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {WORD_INDEX} USING fts5(word, content='{WORD_TABLE}', content_rowid='id', tokenize='trigram')"
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER {WORD_TABLE}_insert AFTER INSERT ON {WORD_TABLE} BEGIN '
+        f'INSERT INTO {WORD_INDEX} (rowid, word) VALUES (new.id, new.word); END'
+    )
+    rows = [
+        (pk, normalize(name), normalize(shelf), normalize(quantity_type))
+        for pk, name, shelf, quantity_type in Product.objects.values_list('pk', 'name', 'shelf__name', 'quantity_type__name')
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        write_rows(cursor, rows)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for table in (WORD_INDEX, WORD_TABLE, TABLE):
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0011_query_audit_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,144 @@
+import depo.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+MOVEMENT_MODELS = ('archivedentrytransaction', 'archivedexittransaction', 'entrytransaction', 'exittransaction', 'shelf')
+
+
+def create_default_warehouse(apps, schema_editor):
+    # Yeni tablonun ilk satırı; mevcut raf ve hareketler aşağıda pk=1 ile bu depoya bağlanır. Depo
+    # veritabanında (DEPO_WAREHOUSE_DATABASES) bu, ona yönlendirilen ilk deponun kaydıdır; her
+    # veritabanında ayrı bir "merkez" oluşmaz
+    db = schema_editor.connection.alias
+    codes = [code for code, alias in getattr(settings, 'DEPO_WAREHOUSE_DATABASES', {}).items() if alias == db]
+    code = codes[0] if codes else 'merkez'
+    Warehouse = apps.get_model('depo', 'Warehouse')
+    Warehouse.objects.using(db).create(name='Merkez Depo' if code == 'merkez' else code, code=code)
+
+
+def copy_balances(apps, schema_editor):
+    # Tüm hareketler varsayılan depoda olduğundan depo bakiyesi ürünün bakiyesiyle aynıdır
+    db = schema_editor.connection.alias
+    StockBalance = apps.get_model('depo', 'StockBalance')
+    WarehouseStock = apps.get_model('depo', 'WarehouseStock')
+    warehouse_id = apps.get_model('depo', 'Warehouse').objects.using(db).order_by('pk').values_list('pk', flat=True).first()
+    WarehouseStock.objects.using(db).bulk_create(
+        [
+            WarehouseStock(warehouse_id=warehouse_id, product_id=product_id, total_in=total_in, total_out=total_out, on_hand=on_hand)
+            for product_id, total_in, total_out, on_hand in StockBalance.objects.using(db).values_list(
+                'product_id', 'total_in', 'total_out', 'on_hand',
+            ).iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depo', '0012_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Warehouse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Depo Adı')),
+                ('code', models.SlugField(max_length=30, unique=True, verbose_name='Depo Kodu')),
+            ],
+            options={
+                'verbose_name': 'Depo',
+                'verbose_name_plural': 'Depolar',
+            },
+        ),
+        migrations.RunPython(create_default_warehouse, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='WarehouseStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_in', models.IntegerField(default=0, verbose_name='Toplam Giriş')),
+                ('total_out', models.IntegerField(default=0, verbose_name='Toplam Çıkış')),
+                ('on_hand', models.IntegerField(default=0, verbose_name='Kalan Stok')),
+            ],
+            options={
+                'verbose_name': 'Depo Stok Bakiyesi',
+                'verbose_name_plural': 'Depo Stok Bakiyeleri',
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='entrytransaction',
+            name='depo_one_opening_entry_per_product',
+        ),
+        migrations.RemoveConstraint(
+            model_name='exittransaction',
+            name='depo_one_opening_exit_per_product',
+        ),
+        migrations.AddField(
+            model_name='archivedentrytransaction',
+            name='warehouse',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='depo.warehouse', verbose_name='Depo'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='archivedexittransaction',
+            name='warehouse',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='depo.warehouse', verbose_name='Depo'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='entrytransaction',
+            name='warehouse',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='depo.warehouse', verbose_name='Depo'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='exittransaction',
+            name='warehouse',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='depo.warehouse', verbose_name='Depo'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shelf',
+            name='warehouse',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.PROTECT, related_name='shelves', to='depo.warehouse', verbose_name='Depo'),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='entrytransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_opening_balance', True)), fields=('product', 'warehouse'), name='depo_one_opening_entry_per_product'),
+        ),
+        migrations.AddConstraint(
+            model_name='exittransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_opening_balance', True)), fields=('product', 'warehouse'), name='depo_one_opening_exit_per_product'),
+        ),
+        migrations.AddField(
+            model_name='warehousestock',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='warehouse_stocks', to='depo.product', verbose_name='Ürün'),
+        ),
+        migrations.AddField(
+            model_name='warehousestock',
+            name='warehouse',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocks', to='depo.warehouse', verbose_name='Depo'),
+        ),
+        migrations.AddIndex(
+            model_name='warehousestock',
+            index=models.Index(fields=['product', 'warehouse'], name='depo_wh_stock_product_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='warehousestock',
+            constraint=models.UniqueConstraint(fields=('warehouse', 'product'), name='depo_warehouse_stock_uniq'),
+        ),
+        migrations.RunPython(copy_balances, migrations.RunPython.noop),
+    ] + [
+        # Yeni kayıtların varsayılanı, tablonun ilk satırı yerine çalışma anındaki ilk depo
+        migrations.AlterField(
+            model_name=model_name,
+            name='warehouse',
+            field=models.ForeignKey(default=depo.models.default_warehouse, on_delete=django.db.models.deletion.PROTECT, related_name='shelves' if model_name == 'shelf' else '+', to='depo.warehouse', verbose_name='Depo'),
+        )
+        for model_name in MOVEMENT_MODELS
+    ]
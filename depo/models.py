@@ -1,10 +1,21 @@
-from django.db import models
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models, router, transaction
 from django.urls import reverse
 from django.db.models.functions import Coalesce
-from django.db.models import Sum, Value
+from django.db.models import BooleanField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+
+from .routers import current_database, database_warehouses
 
 # Create your models here.
 
+def _quantity_type(product):
+    # Miktar türü ayrı bir sorgu yerine süreç içi önbellekten okunur
+    from .reference import related
+    return related(product, 'quantity_type')
+
 class QuantityType(models.Model):
     name = models.CharField(max_length=50, unique=True, verbose_name="Miktar Türü")
 
@@ -15,8 +26,40 @@ class QuantityType(models.Model):
     def __str__(self):
         return self.name
 
+class Warehouse(models.Model):
+    name = models.CharField(max_length=100, unique=True, verbose_name="Depo Adı")
+    # Depo veritabanı eşlemesinde (DEPO_WAREHOUSE_DATABASES) ve ?warehouse= parametresinde kullanılır
+    code = models.SlugField(max_length=30, unique=True, verbose_name="Depo Kodu")
+
+    class Meta:
+        verbose_name = "Depo"
+        verbose_name_plural = "Depolar"
+
+    def __str__(self):
+        return self.name
+
+DEFAULT_WAREHOUSE_CODE = 'merkez'
+
+def default_warehouse_code(alias):
+    """Veritabanının varsayılan deposunun kodu: eşlemede ona yönlendirilen ilk depo, yoksa 'merkez'"""
+    codes = database_warehouses(alias)
+    return codes[0] if codes else DEFAULT_WAREHOUSE_CODE
+
+def default_warehouse():
+    """Depo belirtilmeden oluşturulan raf ve hareketlerin deposu: seçili veritabanının ilk deposu,
+    yoksa veritabanının varsayılan deposu oluşturulur
+    """
+    from .reference import objects
+    warehouses = objects(Warehouse)
+    if warehouses:
+        return warehouses[0].pk
+    code = default_warehouse_code(current_database())
+    name = "Merkez Depo" if code == DEFAULT_WAREHOUSE_CODE else code
+    return Warehouse.objects.get_or_create(code=code, defaults={'name': name})[0].pk
+
 class Shelf(models.Model):
     name = models.CharField(max_length=50, unique=True, verbose_name="Raf Numarası")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, default=default_warehouse, related_name='shelves', verbose_name="Depo")
 
     class Meta:
         verbose_name = "Raf"
@@ -35,17 +78,48 @@ class Department(models.Model):
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def with_stock(self):
+        """Giriş/çıkış toplamlarını, kalan stoğu ve minimum altı bayrağını tek sorguda ekler"""
+        return self.annotate(
+            total_entry=Coalesce(F('stock_balance__total_in'), Value(0)),
+            total_exit=Coalesce(F('stock_balance__total_out'), Value(0)),
+            current_stock=Coalesce(F('stock_balance__on_hand'), Value(0)),
+        )._with_below_minimum()
+
+    def with_ledger_stock(self):
+        """Aynı alanları hareket tablolarından ilişkili alt sorgularla hesaplar (doğrulama için)"""
+        def ledger_total(model):
+            totals = model.objects.filter(product=OuterRef('pk')).order_by().values('product').annotate(total=Sum('quantity')).values('total')
+            return Coalesce(Subquery(totals), Value(0))
+
+        return self.annotate(
+            total_entry=ledger_total(EntryTransaction),
+            total_exit=ledger_total(ExitTransaction),
+            current_stock=F('total_entry') - F('total_exit'),
+        )._with_below_minimum()
+
+    def _with_below_minimum(self):
+        return self.annotate(
+            is_below_minimum=ExpressionWrapper(Q(current_stock__lte=F('minimum_quantity')), output_field=BooleanField()),
+        )
+
 class Product(models.Model):
     name = models.CharField(max_length=200, unique=True, verbose_name="Ürün Adı")
     quantity_type = models.ForeignKey(QuantityType, on_delete=models.SET_NULL, null=True, verbose_name="Miktar Türü")
     minimum_quantity = models.IntegerField(default=0, verbose_name="Minimum Miktar")
     shelf = models.ForeignKey(Shelf, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Raf Numarası")
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Ürün"
         verbose_name_plural = "Ürünler"
-
-        
+        indexes = [
+            # Dashboard'da raf / miktar türü filtresi ada göre sıralı okunur (bkz. listing.py)
+            models.Index(fields=['shelf', 'name'], name='depo_product_shelf_name_idx'),
+            models.Index(fields=['quantity_type', 'name'], name='depo_product_qtype_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -55,35 +129,258 @@ class Product(models.Model):
     
     @property
     def calculated_stock(self):
-        total_entry = self.entrytransaction_set.aggregate(
-            total=Coalesce(Sum('quantity'), Value(0))
-        )['total']
-        total_exit = self.exittransaction_set.aggregate(
-            total=Coalesce(Sum('quantity'), Value(0))
-        )['total']
-        return total_entry - total_exit
+        # Stok artık hareket tablolarından toplanmıyor, StockBalance satırından okunuyor
+        try:
+            return self.stock_balance.on_hand
+        except StockBalance.DoesNotExist:
+            return 0
+
+_explicit_movement_dates = ContextVar('depo_explicit_movement_dates', default=False)
+
+
+@contextmanager
+def explicit_movement_dates():
+    """Blok içinde kaydedilen hareketlerin verilen tarihi auto_now_add ile ezilmez; geçmiş tarihli
+    veri üretmek için. Alanın kendisi değişmez, aynı anda kayıt yazan diğer istekler etkilenmez.
+    """
+    token = _explicit_movement_dates.set(True)
+    try:
+        yield
+    finally:
+        _explicit_movement_dates.reset(token)
+
+
+class MovementDateField(models.DateTimeField):
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if value is not None and _explicit_movement_dates.get():
+            return value
+        return super().pre_save(model_instance, add)
+
+    def deconstruct(self):
+        # Migration'larda düz DateTimeField olarak görünür; veritabanı açısından fark yoktur
+        name, _, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.DateTimeField', args, kwargs
+
 
 class EntryTransaction(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Ürün")
-    entry_date = models.DateTimeField(auto_now_add=True, verbose_name="Giriş Tarihi")
+    entry_date = MovementDateField(auto_now_add=True, verbose_name="Giriş Tarihi")
     quantity = models.IntegerField(verbose_name="Giriş Miktarı")
+    # Girişin yapıldığı rafın deposu (bkz. views.product_entry)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, default=default_warehouse, related_name='+', verbose_name="Depo")
+    # Arşive taşınan girişlerin toplamı (bkz. archive.py); ürün ve depo başına en fazla bir tane
+    is_opening_balance = models.BooleanField(default=False, editable=False, verbose_name="Devir Kaydı")
 
     class Meta:
         verbose_name = "Ürün Giriş Hareketi"
         verbose_name_plural = "Ürün Giriş Hareketleri"
+        indexes = [
+            # Ürün hareket geçmişi bu indeks sırasıyla okunur (bkz. history.py)
+            models.Index(fields=['product', 'entry_date'], name='depo_entry_product_date_idx'),
+            # Tarih aralığındaki hareketler (stok anlık görüntüleri, dışa aktarma) bu indeksle okunur
+            models.Index(fields=['entry_date'], name='depo_entry_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'warehouse'], condition=Q(is_opening_balance=True), name='depo_one_opening_entry_per_product'),
+        ]
 
     def __str__(self):
-        return f"{self.product.name} - {self.quantity} {self.product.quantity_type} ({self.entry_date.strftime('%Y-%m-%d %H:%M')})"
+        return f"{self.product.name} - {self.quantity} {_quantity_type(self.product)} ({self.entry_date.strftime('%Y-%m-%d %H:%M')})"
+
+    def save(self, *args, **kwargs):
+        # Hareket ve stok bakiyesi aynı veritabanı işleminde yazılır (bkz. signals.py)
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
 
 class ExitTransaction(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Ürün")
-    exit_date = models.DateTimeField(auto_now_add=True, verbose_name="Çıkış Tarihi")
+    exit_date = MovementDateField(auto_now_add=True, verbose_name="Çıkış Tarihi")
     quantity = models.IntegerField(verbose_name="Çıkış Miktarı")
     department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Çıkış Departmanı")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, default=default_warehouse, related_name='+', verbose_name="Depo")
+    is_opening_balance = models.BooleanField(default=False, editable=False, verbose_name="Devir Kaydı")
 
     class Meta:
         verbose_name = "Ürün Çıkış Hareketi"
         verbose_name_plural = "Ürün Çıkış Hareketleri"
+        indexes = [
+            models.Index(fields=['product', 'exit_date'], name='depo_exit_product_date_idx'),
+            models.Index(fields=['exit_date'], name='depo_exit_date_idx'),
+            # Yönetim panelinde departman filtresi tarihe göre sıralı okunur
+            models.Index(fields=['department', 'exit_date'], name='depo_exit_dept_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'warehouse'], condition=Q(is_opening_balance=True), name='depo_one_opening_exit_per_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.quantity} {_quantity_type(self.product)} ({self.exit_date.strftime('%Y-%m-%d %H:%M')})"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
+
+class ArchivedEntryTransaction(models.Model):
+    # Canlı tablodaki id taşınırken aynen verilir; SQLite'ta rowid olduğundan (ürün, tarih) indeksi id sırasını da taşır
+    id = models.BigAutoField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name="Ürün")
+    entry_date = models.DateTimeField(verbose_name="Giriş Tarihi")
+    quantity = models.IntegerField(verbose_name="Giriş Miktarı")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, default=default_warehouse, related_name='+', verbose_name="Depo")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Arşivlenme Tarihi")
+
+    class Meta:
+        verbose_name = "Arşivlenmiş Giriş Hareketi"
+        verbose_name_plural = "Arşivlenmiş Giriş Hareketleri"
+        indexes = [
+            models.Index(fields=['product', 'entry_date'], name='depo_arch_entry_prod_date_idx'),
+            models.Index(fields=['entry_date'], name='depo_arch_entry_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.quantity} ({self.entry_date.strftime('%Y-%m-%d %H:%M')})"
+
+class ArchivedExitTransaction(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name="Ürün")
+    exit_date = models.DateTimeField(verbose_name="Çıkış Tarihi")
+    quantity = models.IntegerField(verbose_name="Çıkış Miktarı")
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Çıkış Departmanı")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, default=default_warehouse, related_name='+', verbose_name="Depo")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Arşivlenme Tarihi")
+
+    class Meta:
+        verbose_name = "Arşivlenmiş Çıkış Hareketi"
+        verbose_name_plural = "Arşivlenmiş Çıkış Hareketleri"
+        indexes = [
+            models.Index(fields=['product', 'exit_date'], name='depo_arch_exit_prod_date_idx'),
+            models.Index(fields=['exit_date'], name='depo_arch_exit_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.quantity} ({self.exit_date.strftime('%Y-%m-%d %H:%M')})"
+
+class StockBalance(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='stock_balance', verbose_name="Ürün")
+    total_in = models.IntegerField(default=0, verbose_name="Toplam Giriş")
+    total_out = models.IntegerField(default=0, verbose_name="Toplam Çıkış")
+    on_hand = models.IntegerField(default=0, verbose_name="Kalan Stok")
+    last_movement_at = models.DateTimeField(null=True, blank=True, verbose_name="Son Hareket Tarihi")
+
+    class Meta:
+        verbose_name = "Stok Bakiyesi"
+        verbose_name_plural = "Stok Bakiyeleri"
+        indexes = [
+            # Dashboard'da stoğa göre sıralama ve imleçli sayfalama için
+            models.Index(fields=['on_hand', 'product'], name='depo_balance_on_hand_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name}: {self.on_hand}"
+
+class WarehouseStock(models.Model):
+    """Ürünün bir depodaki bakiyesi; StockBalance ile aynı hareketlerle güncellenir (bkz. ledger.py)"""
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='stocks', verbose_name="Depo")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='warehouse_stocks', verbose_name="Ürün")
+    total_in = models.IntegerField(default=0, verbose_name="Toplam Giriş")
+    total_out = models.IntegerField(default=0, verbose_name="Toplam Çıkış")
+    on_hand = models.IntegerField(default=0, verbose_name="Kalan Stok")
+
+    class Meta:
+        verbose_name = "Depo Stok Bakiyesi"
+        verbose_name_plural = "Depo Stok Bakiyeleri"
+        constraints = [
+            models.UniqueConstraint(fields=['warehouse', 'product'], name='depo_warehouse_stock_uniq'),
+        ]
+        indexes = [
+            # Ürün detayında ürünün depolardaki bakiyeleri okunur
+            models.Index(fields=['product', 'warehouse'], name='depo_wh_stock_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} @ {self.warehouse.name}: {self.on_hand}"
+
+class StockSnapshot(models.Model):
+    PERIOD_DAILY = 'daily'
+    PERIOD_MONTHLY = 'monthly'
+    PERIOD_CHOICES = [
+        (PERIOD_DAILY, 'Günlük'),
+        (PERIOD_MONTHLY, 'Aylık'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots', verbose_name="Ürün")
+    # Bu andan önceki hareketlerin toplamı (an dahil değil)
+    taken_at = models.DateTimeField(db_index=True, verbose_name="Kesim Zamanı")
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES, default=PERIOD_DAILY, verbose_name="Dönem")
+    total_in = models.IntegerField(default=0, verbose_name="Toplam Giriş")
+    total_out = models.IntegerField(default=0, verbose_name="Toplam Çıkış")
+    on_hand = models.IntegerField(default=0, verbose_name="Kalan Stok")
+
+    class Meta:
+        verbose_name = "Stok Anlık Görüntüsü"
+        verbose_name_plural = "Stok Anlık Görüntüleri"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'taken_at'], name='depo_snapshot_product_taken_at_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.on_hand}"
+
+class LowStockAlert(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='low_stock_alerts', verbose_name="Ürün")
+    on_hand = models.IntegerField(verbose_name="Açılıştaki Stok")
+    minimum_quantity = models.IntegerField(verbose_name="Minimum Miktar")
+    opened_at = models.DateTimeField(auto_now_add=True, verbose_name="Açılış Tarihi")
+    resolved_at = models.DateTimeField(null=True, blank=True, verbose_name="Kapanış Tarihi")
+
+    class Meta:
+        verbose_name = "Kritik Stok Uyarısı"
+        verbose_name_plural = "Kritik Stok Uyarıları"
+        constraints = [
+            models.UniqueConstraint(fields=['product'], condition=Q(resolved_at__isnull=True), name='depo_one_open_alert_per_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name}: {self.on_hand} / {self.minimum_quantity}"
+
+class ExportJob(models.Model):
+    KIND_CHOICES = [
+        ('products', 'Ürünler'),
+        ('transactions', 'Hareketler'),
+        ('parameters', 'Parametreler'),
+    ]
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Sırada'),
+        (STATUS_RUNNING, 'Hazırlanıyor'),
+        (STATUS_DONE, 'Tamamlandı'),
+        (STATUS_FAILED, 'Hata'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Dışa Aktarma Türü")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parametreler")
+    fingerprint = models.CharField(max_length=64, db_index=True, verbose_name="Parmak İzi")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Durum")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="İlerleme (%)")
+    file_path = models.CharField(max_length=500, blank=True, verbose_name="Dosya")
+    error = models.TextField(blank=True, verbose_name="Hata")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Oluşturulma Tarihi")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Başlama Tarihi")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Bitiş Tarihi")
+
+    class Meta:
+        verbose_name = "Dışa Aktarma İşi"
+        verbose_name_plural = "Dışa Aktarma İşleri"
+        ordering = ('-created_at',)
+        indexes = [
+            # Bekleyen işler oluşturulma sırasıyla alınır (bkz. jobs.py)
+            models.Index(fields=['status', 'created_at'], name='depo_exportjob_status_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.product.name} - {self.quantity} {self.product.quantity_type} ({self.exit_date.strftime('%Y-%m-%d %H:%M')})"
+        return f"{self.get_kind_display()} ({self.get_status_display()})"
@@ -0,0 +1,40 @@
+"""İstek ve komut parametrelerinin okunması.
+
+Görünümler ve yönetim komutları kullanıcıdan gelen gün ve tam sayıları buradan okur; hatalı değer
+için None döner ya da ValueError fırlatır, her çağıran kendi hatasını (400, CommandError,
+InvalidExportFilter...) üretir.
+"""
+from datetime import date, timedelta
+
+from django.utils.dateparse import parse_date
+
+# Gün başı/sonu hesabı (bir gün ekleme, saat dilimine çevirme) bu aralıkta taşmaz
+MIN_DAY = date.min + timedelta(days=1)
+MAX_DAY = date.max - timedelta(days=1)
+
+# SQLite tam sayıları 64 bittir; daha büyük bir değer sorguya bağlanırken OverflowError verir
+MIN_INT = -2 ** 63
+MAX_INT = 2 ** 63 - 1
+
+
+def parse_day(value):
+    """YYYY-MM-DD değerini date olarak döner.
+
+    Biçimi bozuk, takvimde olmayan (ör. 2020-02-30) ya da gün sınırları hesaplanamayacak kadar uç
+    (0001-01-01, 9999-12-31) tarihlerde None döner.
+    """
+    try:
+        day = parse_date(value)
+    except ValueError:
+        return None
+    if day is None or not MIN_DAY <= day <= MAX_DAY:
+        return None
+    return day
+
+
+def parse_int(value):
+    """Değeri tam sayıya çevirir; sayı değilse ya da 64 bite sığmıyorsa ValueError fırlatır"""
+    number = int(value)
+    if not MIN_INT <= number <= MAX_INT:
+        raise ValueError(f"Tam sayı aralık dışında: {value}")
+    return number
@@ -0,0 +1,187 @@
+"""Sık çalışan sorguların sorgu planı denetimi.
+
+Her senaryo uygulamanın gerçek kodunu (listeleme, ürün geçmişi, dışa aktarma...) çalıştırır;
+çalışan SQL'ler yakalanıp EXPLAIN QUERY PLAN ile incelenir. İndeks kullanmayan tam tablo taraması
+("SCAN tablo") hata sayılır. Birkaç satırlık parametre tabloları gibi taranması normal olan
+tablolar senaryoda allow_scan ile belirtilir.
+
+`python manage.py audit_query_plans` ile çalıştırılır; testlerde de aynı kontrol yapılır.
+Sadece SQLite planları okunur.
+
+Bilinçli olarak dışarıda bırakılan: minimum altı filtresi (iki sütunun karşılaştırılması); tüm
+ürünleri okumak zorundadır. Ürün araması FTS5 indeksinden yapılır (bkz. search.py); 3 karakterden
+kısa arama parçaları indeksi kullanamaz ve senaryoda yoktur.
+"""
+import re
+from datetime import timedelta
+from itertools import islice
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+HOT_QUERIES = {}
+
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+# Birkaç satırdan oluşan parametre tabloları
+PARAMETER_TABLES = {'depo_shelf', 'depo_department', 'depo_quantitytype'}
+
+
+def hot_query(name, allow_scan=()):
+    def decorator(func):
+        HOT_QUERIES[name] = (func, set(allow_scan))
+        return func
+    return decorator
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[3] for row in cursor.fetchall()]
+
+
+def audit(names=None):
+    """Senaryoları çalıştırır; her biri için [(sql, plan, taranan tablolar)] döner. Sadece SQLite'ta çalışır"""
+    sample = _sample_ids()
+    report = {}
+    # Senaryolar veri yazabilir (ör. uyarı değerlendirmesi); hepsi geri alınır
+    with transaction.atomic():
+        for name in names or HOT_QUERIES:
+            func, allow_scan = HOT_QUERIES[name]
+            with CaptureQueriesContext(connection) as queries:
+                func(sample)
+            report[name] = []
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                plan = explain(sql)
+                scans = {
+                    match.group(1) for match in map(_FULL_SCAN.match, plan)
+                    if match and match.group(1) not in allow_scan
+                }
+                report[name].append((sql, plan, scans))
+        transaction.set_rollback(True)
+    return report
+
+
+def failures(report):
+    """Tam tablo taraması yapan senaryo adı -> taranan tablolar"""
+    result = {}
+    for name, queries in report.items():
+        scanned = set().union(*(scans for _, _, scans in queries)) if queries else set()
+        if scanned:
+            result[name] = scanned
+    return result
+
+
+def _sample_ids():
+    """Senaryolarda kullanılacak örnek kayıt id'leri; denetlenen sorgulara karışmasın diye önceden okunur"""
+    from .models import Department, Product
+    return {
+        'product': Product.objects.values_list('pk', flat=True).first() or 0,
+        'department': Department.objects.values_list('pk', flat=True).first() or 0,
+    }
+
+
+@hot_query('dashboard_page')
+def dashboard_page(sample):
+    from .listing import product_page
+    _, cursor = product_page({}, 2)
+    product_page({'cursor': cursor or ''}, 2)
+
+
+@hot_query('dashboard_stock_sort')
+def dashboard_stock_sort(sample):
+    from .listing import product_page
+    product_page({'sort': '-stock'})
+
+
+@hot_query('dashboard_shelf_and_type_filter')
+def dashboard_shelf_and_type_filter(sample):
+    from .listing import product_page
+    product_page({'shelf': '1', 'quantity_type': '1'})
+    product_page({'quantity_type': '1'})
+
+
+@hot_query('product_search')
+def product_search(sample):
+    from . import search
+    from .listing import product_page
+    search.search('vida')
+    search.search('vidaa')
+    product_page({'q': 'vida'})
+
+
+@hot_query('product_stock_lookup')
+def product_stock_lookup(sample):
+    from .caching import get_stock_payloads
+    get_stock_payloads({sample['product']: 0, -1: 0})
+
+
+@hot_query('product_history')
+def product_history(sample):
+    from .history import movement_history, parse_history_filters
+    product_id = sample['product']
+    _, cursor = movement_history(product_id, limit=2)
+    movement_history(product_id, cursor=cursor, limit=2)
+    today = timezone.localdate()
+    movement_history(product_id, parse_history_filters({
+        'date_from': (today - timedelta(days=30)).isoformat(), 'date_to': today.isoformat(), 'department': str(sample['department']),
+    }))
+
+
+@hot_query('transaction_export_date_range')
+def transaction_export_date_range(sample):
+    from .exports import transaction_rows
+    list(islice(transaction_rows(timezone.now() - timedelta(days=7), timezone.now()), 10))
+    list(islice(transaction_rows(None, None, [sample['product']]), 10))
+
+
+@hot_query('admin_movement_changelists')
+def admin_movement_changelists(sample):
+    from .models import EntryTransaction, ExitTransaction
+    list(EntryTransaction.objects.order_by('-entry_date')[:100])
+    list(EntryTransaction.objects.filter(product_id=sample['product']).order_by('-entry_date')[:100])
+    list(ExitTransaction.objects.filter(department_id=sample['department']).order_by('-exit_date')[:100])
+
+
+@hot_query('consumption_window')
+def consumption_window(sample):
+    from .analytics import read_exits, window_start
+    read_exits(window_start())
+    read_exits(window_start(), after_pk=sample['product'])
+
+
+@hot_query('stock_as_of', allow_scan=PARAMETER_TABLES)
+def stock_as_of_query(sample):
+    from .snapshots import stock_as_of
+    stock_as_of(timezone.now() - timedelta(days=1))
+
+
+@hot_query('shelf_view', allow_scan={'depo_shelf'})
+def shelf_view(sample):
+    from .utils import get_shelf_data
+    get_shelf_data()
+
+
+@hot_query('low_stock_alerts')
+def low_stock_alerts(sample):
+    from . import alerts
+    alerts.evaluate([sample['product']])
+    list(alerts.open_alerts())
+
+
+@hot_query('export_jobs')
+def export_jobs(sample):
+    from .models import ExportJob
+    list(ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('created_at').values_list('pk', flat=True))
+    ExportJob.objects.filter(
+        fingerprint='0' * 64, status__in=[ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING, ExportJob.STATUS_DONE],
+    ).first()
+
+
+@hot_query('archive_batch')
+def archive_batch(sample):
+    from .archive import pending_count
+    pending_count(timezone.now() - timedelta(days=365))
@@ -0,0 +1,123 @@
+"""Miktar türü, raf, departman ve depo tabloları için süreç içi önbellek.
+
+Bu tablolar küçüktür ve nadiren değişir, ama neredeyse her sayfada (dashboard filtreleri, form
+seçim kutuları, parametreler sayfası, hareketlerin __str__'i) okunur. Her tablo ilk kullanıldığında
+tek sorguyla belleğe alınır ve REFERENCE sürüm sayacı değişene kadar oradan verilir. Sayaç Django
+önbelleğinde durduğu için paylaşımlı bir önbellek arka ucuyla bir süreçteki değişiklik diğer
+süreçlerin kopyasını da geçersiz kılar (bkz. versions.py, signals.py). Önbellek süreç içiyse
+(LocMemCache) artış diğer süreçlere ulaşmaz; tablolar orada en fazla DEPO_LOCAL_CACHE_SECONDS
+saniye tutulur ve formlar tabloda bulamadıkları kaydı veritabanından okur.
+
+Depo veritabanları kullanılıyorsa (bkz. routers.py) tablolar veritabanı başına ayrı tutulur.
+
+Verilen nesneler süreçteki tüm isteklerce paylaşılır; salt okunur kullanılmalıdır. Düzenleme
+ekranları kaydı veritabanından ayrıca okur.
+"""
+import time
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+
+from .models import Department, QuantityType, Shelf, Warehouse
+from .parsing import parse_int
+from .routers import current_database
+from .versions import REFERENCE, cache_timeout, get_version
+
+MODELS = (QuantityType, Shelf, Department, Warehouse)
+
+# Paylaşımlı önbellekte tablolar sadece sürüm değişince yeniden okunur
+MAX_AGE = 24 * 60 * 60
+
+# (veritabanı, model) -> (sürüm, okunma zamanı, pk sırasıyla nesneler, {pk: nesne})
+_tables = {}
+
+
+def _table(model):
+    if model not in MODELS:
+        raise ValueError(f"{model.__name__} bir referans tablosu değil")
+    key = (current_database(), model)
+    version = get_version(REFERENCE)
+    table = _tables.get(key)
+    if table is None or table[0] != version or time.monotonic() - table[1] > cache_timeout(MAX_AGE):
+        rows = list(model.objects.order_by('pk'))
+        # Sözlüğe tek atama; eşzamanlı istekler en kötü ihtimalle tabloyu iki kez okur
+        table = _tables[key] = (version, time.monotonic(), rows, {row.pk: row for row in rows})
+    return table
+
+
+def objects(model):
+    """Tablonun tüm kayıtları, pk sırasıyla"""
+    return _table(model)[2]
+
+
+def get(model, pk):
+    """pk'si verilen kayıt; yoksa (ya da pk None ise) None"""
+    if pk is None:
+        return None
+    return _table(model)[3].get(pk)
+
+
+def related(instance, field):
+    """instance.<field> ilişkisini sorgu çalıştırmadan çözer; select_related edilmişse onu kullanır"""
+    cached = instance._state.fields_cache.get(field)
+    if cached is not None:
+        return cached
+    model = instance._meta.get_field(field).related_model
+    return get(model, getattr(instance, f'{field}_id'))
+
+
+def clear():
+    _tables.clear()
+
+
+def is_whole_table(queryset):
+    """Sorgu tablonun tüm kayıtlarını mı seçiyor (süzme ya da dilimleme yok)"""
+    query = queryset.query
+    return not query.has_filters() and not query.is_sliced
+
+
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if not is_whole_table(self.queryset):
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in objects(self.queryset.model):
+            yield self.choice(obj)
+
+    def __len__(self):
+        if not is_whole_table(self.queryset):
+            return super().__len__()
+        return len(objects(self.queryset.model)) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        if not is_whole_table(self.queryset):
+            return super().__bool__()
+        return self.field.empty_label is not None or bool(objects(self.queryset.model))
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """Seçenekleri ve gönderilen değeri veritabanı yerine süreç içi önbellekten çözen ModelChoiceField.
+
+    Önbellekte tablonun tamamı durur; süzülmüş bir queryset verilirse alan sıradan bir
+    ModelChoiceField gibi veritabanından okur.
+    """
+    iterator = ReferenceChoiceIterator
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            # SQLite'ın 64 bit tam sayılarına sığmayan değer sorguya bağlanamaz
+            pk = parse_int(value)
+        except (TypeError, ValueError):
+            pk = None
+        instance = get(self.queryset.model, pk) if is_whole_table(self.queryset) else None
+        if instance is None and pk is not None:
+            # Başka bir süreçte yeni eklenmiş ve buradaki tabloya henüz girmemiş olabilir
+            instance = self.queryset.filter(pk=pk).first()
+        if instance is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+        return instance
@@ -0,0 +1,104 @@
+"""Depoları ayrı veritabanlarına yerleştiren isteğe bağlı yönlendirme.
+
+DEPO_WAREHOUSE_DATABASES {depo kodu: veritabanı takma adı} eşlemesi boş değilse, seçili deponun
+isteği boyunca depo uygulamasının tüm tabloları (ürünler, hareket defteri, bakiyeler, raflar...)
+o deponun veritabanından okunur ve oraya yazılır. Her depo veritabanı kendi başına eksiksiz bir
+depo veritabanıdır; böylece bir depodaki yazmalar diğerlerinin SQLite yazma kilidini beklemez ve
+birleşik sorgular aynı veritabanında kalır. Kullanıcılar ve oturumlar 'default'ta kalır.
+
+Depo, istekte ?warehouse=<kod> ile seçilir ve oturumda saklanır (bkz. WarehouseMiddleware). İstek
+dışındaki kodlar (yönetim komutları, testler) use_warehouse() ile depo seçebilir. Depo
+veritabanları `manage.py migrate --database <takma ad>` ile kurulur.
+
+Eşleme boşsa yönlendirici hiçbir karar vermez; tüm depolar 'default'ta birlikte tutulur.
+
+Önbellek anahtarlarına (make_cache_key) ve süreç içi önbelleklere (reference.py, live.py) seçili
+veritabanı katılır; aynı ürün id'si farklı depo veritabanlarında farklı ürünlerdir.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+SESSION_KEY = 'depo_warehouse'
+
+_current = ContextVar('depo_warehouse_database', default=None)
+
+
+def warehouse_databases():
+    """{depo kodu: veritabanı takma adı}"""
+    return getattr(settings, 'DEPO_WAREHOUSE_DATABASES', {})
+
+
+def database_aliases():
+    """Depo verisi tutan veritabanları: önce 'default', sonra eşlemedeki diğerleri"""
+    aliases = [DEFAULT_DB_ALIAS]
+    for alias in warehouse_databases().values():
+        if alias not in aliases:
+            aliases.append(alias)
+    return aliases
+
+
+def database_warehouses(alias):
+    """Veritabanına yönlendirilen depo kodları, eşlemedeki sırasıyla"""
+    return [code for code, database in warehouse_databases().items() if database == alias]
+
+
+def current_database():
+    """Seçili deponun veritabanı; depo seçili değilse ya da eşleme yoksa 'default'"""
+    return _current.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_warehouse(code):
+    """Blok boyunca depo tablolarını kodu verilen deponun veritabanına yönlendirir"""
+    token = _current.set(warehouse_databases().get(code))
+    try:
+        yield current_database()
+    finally:
+        _current.reset(token)
+
+
+def make_cache_key(key, key_prefix, version):
+    # Django'nun varsayılan anahtarı; depo veritabanı seçiliyse onun adı da katılır
+    alias = _current.get()
+    if alias is not None and alias != DEFAULT_DB_ALIAS:
+        key = f'{alias}:{key}'
+    return f'{key_prefix}:{version}:{key}'
+
+
+class WarehouseRouter:
+    def _route(self, model, **hints):
+        if model._meta.app_label != 'depo':
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db is not None:
+            return instance._state.db
+        return _current.get()
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Depo veritabanlarında sadece depo uygulamasının tabloları bulunur
+        if db != DEFAULT_DB_ALIAS and db in warehouse_databases().values():
+            return app_label == 'depo'
+        return None
+
+
+class WarehouseMiddleware:
+    """İsteği oturumda seçili deponun veritabanında çalıştırır; eşleme boşsa devreden çıkar"""
+
+    def __init__(self, get_response):
+        if not warehouse_databases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        code = request.GET.get('warehouse')
+        if code in warehouse_databases():
+            request.session[SESSION_KEY] = code
+        with use_warehouse(request.session.get(SESSION_KEY)):
+            return self.get_response(request)
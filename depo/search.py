@@ -0,0 +1,247 @@
+"""Ürün arama indeksi.
+
+Ürün adı, raf ve miktar türü SQLite FTS5 trigram tablosunda (depo_product_search, ürün id'si
+rowid olarak) Türkçe'ye göre normalleştirilmiş halde tutulur: büyük harfler İ/I kurallarıyla
+küçültülür ve Türkçe harfler ASCII karşılıklarına indirilir; "ŞİŞE", "şişe" ve "sise" aynı sonucu
+verir. Trigram indeksi kelimenin herhangi bir yerinde geçen parçayı (ön ek dahil) bulur.
+
+Sıralama: eşleşme sayısı az ise hepsi bm25 ile puanlanır (adı ilk kelimeyle başlayanlar önce).
+Çok sayıda ürüne uyan genel sorgularda (ör. "vida") tüm eşleşmeleri puanlamak yerine önce adı ilk
+kelimeyle başlayan, sonra diğer ürünler LIMIT ile alınır; sorgu süresi eşleşme sayısından
+bağımsız kalır.
+
+Yazım hataları için indekslenen kelimeler ayrı bir sözlük tablosunda (depo_product_search_word)
+tutulur. Hiç sonuç çıkmazsa, sözlükte bulunmayan kelimeler trigram benzerliği en yüksek sözlük
+kelimesiyle değiştirilip arama tekrarlanır ("eldivn" -> "eldiven"). Sözlükten kelime silinmez;
+artık kullanılmayan bir kelimeye düzeltilen sorgu sadece boş sonuç verir, rebuild_index sözlüğü de
+temizler.
+
+İndeks ürün, raf ve miktar türü sinyalleriyle güncellenir (bkz. signals.py). Sinyal göndermeyen
+toplu yazmalardan (içe aktarma, sentetik veri) sonra index_products / rebuild_index çağrılır;
+`manage.py rebuild_search_index` ile de yeniden kurulabilir.
+
+İndeks sadece SQLite'ta vardır; diğer veritabanlarında arama ad/raf üzerinde icontains'e döner.
+"""
+import re
+import unicodedata
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .routers import current_database
+
+TABLE = 'depo_product_search'
+WORD_TABLE = 'depo_product_search_word'
+WORD_INDEX = 'depo_product_search_word_fts'
+BATCH_SIZE = 2000
+# Trigram indeksi 3 karakterden kısa parçaları MATCH ile arayamaz
+MIN_TOKEN_LENGTH = 3
+# Bu kadar eşleşmeye kadar tüm sonuçlar bm25 ile puanlanır
+RANK_LIMIT = 500
+CORRECTION_CANDIDATES = 30
+MIN_SIMILARITY = 0.3
+# bm25 sütun ağırlıkları: ad, raf, miktar türü
+RANK = f'bm25({TABLE}, 10.0, 2.0, 1.0)'
+
+_FOLD = str.maketrans('ığüşöçâîû', 'igusocaiu')
+
+
+def normalize(text):
+    """Türkçe büyük/küçük harf katlama ve aksan temizliği; kelimeleri tek boşlukla ayırır"""
+    if not text:
+        return ''
+    text = text.replace('İ', 'i').replace('I', 'ı').lower().translate(_FOLD)
+    text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def _connection():
+    # İndeks tabloları ürünlerle aynı veritabanındadır (bkz. routers.py)
+    return connections[current_database()]
+
+
+def available():
+    return _connection().vendor == 'sqlite'
+
+
+def _rows(queryset):
+    for pk, name, shelf, quantity_type in queryset.values_list('pk', 'name', 'shelf__name', 'quantity_type__name'):
+        yield pk, normalize(name), normalize(shelf), normalize(quantity_type)
+
+
+def _chunks(items, size=BATCH_SIZE):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_rows(cursor, rows):
+    cursor.executemany(f'INSERT OR REPLACE INTO {TABLE} (rowid, name, shelf, quantity_type) VALUES (%s, %s, %s, %s)', rows)
+    # Sayılar (ürün kodları) yazım düzeltmesine aday olmaz
+    words = {word for row in rows for text in row[1:] for word in text.split() if len(word) >= MIN_TOKEN_LENGTH and not word.isdigit()}
+    cursor.executemany(f'INSERT OR IGNORE INTO {WORD_TABLE} (word) VALUES (%s)', [(word,) for word in words])
+
+
+def index_products(product_ids):
+    """Verilen ürünlerin indeks satırlarını yeniden yazar (silinmiş ürünler indeksten çıkar)"""
+    from .models import Product
+
+    if not available():
+        return
+    # Otomatik onay kipinde her satır ayrı bir işlem olurdu
+    connection = _connection()
+    with transaction.atomic(using=connection.alias, savepoint=False), connection.cursor() as cursor:
+        for chunk in _chunks(product_ids):
+            rows = list(_rows(Product.objects.filter(pk__in=chunk)))
+            write_rows(cursor, rows)
+            missing = set(chunk) - {row[0] for row in rows}
+            if missing:
+                cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk,) for pk in missing])
+
+
+def remove_products(product_ids):
+    if not available():
+        return
+    connection = _connection()
+    with transaction.atomic(using=connection.alias, savepoint=False), connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk,) for pk in product_ids])
+
+
+def rebuild_index():
+    """İndeksi ve kelime sözlüğünü tüm ürünlerden yeniden kurar, indekslenen ürün sayısını döner"""
+    from .models import Product
+
+    if not available():
+        return 0
+    count = 0
+    connection = _connection()
+    with transaction.atomic(using=connection.alias, savepoint=False), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(f'DELETE FROM {WORD_TABLE}')
+        cursor.execute(f"INSERT INTO {WORD_INDEX} ({WORD_INDEX}) VALUES ('delete-all')")
+        for chunk in _chunks(_rows(Product.objects.order_by('pk'))):
+            write_rows(cursor, chunk)
+            count += len(chunk)
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return count
+
+
+def _conditions(tokens):
+    """Her kelimenin adda, rafta ya da miktar türünde geçmesi şartı: (WHERE parçaları, parametreler)"""
+    long_tokens = [token for token in tokens if len(token) >= MIN_TOKEN_LENGTH]
+    where, params = [], []
+    if long_tokens:
+        where.append(f'{TABLE} MATCH %s')
+        params.append(' AND '.join(f'"{token}"' for token in long_tokens))
+    for token in tokens:
+        if len(token) < MIN_TOKEN_LENGTH:
+            where.append('(name LIKE %s OR shelf LIKE %s)')
+            params += [f'%{token}%'] * 2
+    return ' AND '.join(where), params
+
+
+def _fetch_ids(sql, params):
+    with _connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _ranked_ids(tokens, limit):
+    where, params = _conditions(tokens)
+    if all(len(token) < MIN_TOKEN_LENGTH for token in tokens):
+        # Kısa parçalar indeksten aranamaz; ilk `limit` eşleşmede taramayı bitirir
+        return _fetch_ids(f'SELECT rowid FROM {TABLE} WHERE {where} LIMIT %s', [*params, limit])
+
+    # Sayım RANK_LIMIT'i aşınca durur; genel sorgularda tüm eşleşmeleri okumaz
+    matches = _fetch_ids(f'SELECT count(*) FROM (SELECT 1 FROM {TABLE} WHERE {where} LIMIT %s)', [*params, RANK_LIMIT + 1])[0]
+    if not matches:
+        return []
+    prefix = f'{tokens[0]}%'
+    if matches <= RANK_LIMIT:
+        return _fetch_ids(
+            f'SELECT rowid FROM {TABLE} WHERE {where} ORDER BY CASE WHEN name LIKE %s THEN 0 ELSE 1 END, {RANK} LIMIT %s',
+            [*params, prefix, limit],
+        )
+    ids = _fetch_ids(f'SELECT rowid FROM {TABLE} WHERE {where} AND name LIKE %s LIMIT %s', [*params, prefix, limit])
+    if len(ids) < limit:
+        excluded = f" AND rowid NOT IN ({', '.join(['%s'] * len(ids))})" if ids else ''
+        ids += _fetch_ids(f'SELECT rowid FROM {TABLE} WHERE {where}{excluded} LIMIT %s', [*params, *ids, limit - len(ids)])
+    return ids
+
+
+def _trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(token, word):
+    token, word = _trigrams(token), _trigrams(word)
+    return len(token & word) / len(token | word)
+
+
+def _corrected(tokens):
+    """Sözlükte geçmeyen kelimeleri en benzer sözlük kelimesiyle değiştirir"""
+    corrected = []
+    with _connection().cursor() as cursor:
+        for token in tokens:
+            if len(token) < MIN_TOKEN_LENGTH:
+                corrected.append(token)
+                continue
+            cursor.execute(f'SELECT 1 FROM {WORD_INDEX} WHERE {WORD_INDEX} MATCH %s LIMIT 1', [f'"{token}"'])
+            if cursor.fetchone():
+                corrected.append(token)
+                continue
+            grams = sorted({token[i:i + 3] for i in range(len(token) - 2)})
+            cursor.execute(
+                f'SELECT word FROM {WORD_TABLE} WHERE id IN ('
+                f'SELECT rowid FROM {WORD_INDEX} WHERE {WORD_INDEX} MATCH %s ORDER BY bm25({WORD_INDEX}) LIMIT %s)',
+                [' OR '.join(f'"{gram}"' for gram in grams), CORRECTION_CANDIDATES],
+            )
+            scored = [(_similarity(token, word), word) for word, in cursor.fetchall()]
+            best = max(scored, default=(0, token))
+            corrected.append(best[1] if best[0] >= MIN_SIMILARITY else token)
+    return corrected
+
+
+def search(query, limit=20):
+    """Sorguya uyan ürün id'lerini alaka sırasıyla döner"""
+    from .models import Product
+
+    tokens = normalize(query).split()
+    if not tokens:
+        return []
+    if not available():
+        return list(_fallback(Product.objects.order_by('name'), query).values_list('pk', flat=True)[:limit])
+    ids = _ranked_ids(tokens, limit)
+    if not ids:
+        corrected = _corrected(tokens)
+        if corrected != tokens:
+            ids = _ranked_ids(corrected, limit)
+    return ids
+
+
+def _fallback(queryset, query):
+    return queryset.filter(Q(name__icontains=query) | Q(shelf__name__icontains=query))
+
+
+def filter_queryset(queryset, query):
+    """Ürün sorgusunu arama sonucuna göre süzer (sıralamayı değiştirmez); liste ve yönetim paneli için"""
+    tokens = normalize(query).split()
+    if not tokens:
+        return queryset
+    if not available():
+        return _fallback(queryset, query)
+    where, params = _conditions(tokens)
+    if not _fetch_ids(f'SELECT 1 FROM {TABLE} WHERE {where} LIMIT 1', params):
+        # Birebir eşleşme yoksa yazım hatası düzeltilmiş kelimelerle
+        corrected = _corrected(tokens)
+        if corrected == tokens:
+            return queryset.none()
+        where, params = _conditions(corrected)
+    return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {TABLE} WHERE {where}', params))
@@ -0,0 +1,234 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from .models import Product, EntryTransaction, ExitTransaction, StockBalance, ExportJob, QuantityType, Shelf, Department, Warehouse
+from .routers import current_database
+from .versions import CONSUMPTION, DATASET, PARAMETERS, REFERENCE, bump_version, product_stock, shelf_contents
+from . import alerts, ledger, live, search, snapshots
+
+# Ürünlerin stok bakiyesi değiştiğinde, bakiyeyi yazan veritabanı işlemi içinde gönderilir.
+# Argüman: product_ids. bulk_create gibi model sinyali göndermeyen yollar da bunu gönderir.
+stock_changed = Signal()
+
+
+def _on_commit(func):
+    # Hareketi yazan işlem seçili deponun veritabanında açıktır (bkz. routers.py)
+    transaction.on_commit(func, using=current_database())
+
+
+def _movement_delta(instance, quantity):
+    """Hareket türüne göre (giriş, çıkış) miktar çiftini döner"""
+    if isinstance(instance, EntryTransaction):
+        return quantity, 0
+    return 0, quantity
+
+
+def _movement_date(instance):
+    if isinstance(instance, EntryTransaction):
+        return instance.entry_date
+    return instance.exit_date
+
+
+def _forget_cached_balance(instance):
+    # Aynı istekte product.calculated_stock eski bakiyeyi döndürmesin
+    product = instance._state.fields_cache.get('product')
+    if product is not None:
+        product._state.fields_cache.pop('stock_balance', None)
+
+
+@receiver(post_save, sender=Product)
+def create_stock_balance(sender, instance, created, raw=False, **kwargs):
+    if created:
+        StockBalance.objects.get_or_create(product=instance)
+    if not raw:
+        # Minimum miktar değişmiş olabilir
+        alerts.evaluate([instance.pk])
+
+
+@receiver(pre_save, sender=EntryTransaction)
+@receiver(pre_save, sender=ExitTransaction)
+def remember_previous_movement(sender, instance, raw=False, **kwargs):
+    # Güncellemede eski ürün/miktar geri alınabilsin diye saklanır
+    instance._ledger_previous = None
+    if instance.pk is not None and not raw:
+        instance._ledger_previous = sender.objects.filter(pk=instance.pk).values_list('product_id', 'quantity', 'warehouse_id').first()
+
+
+@receiver(post_save, sender=EntryTransaction)
+@receiver(post_save, sender=ExitTransaction)
+def apply_saved_movement(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous is not None:
+        old_product_id, old_quantity, old_warehouse_id = previous
+        old_in, old_out = _movement_delta(instance, old_quantity)
+        ledger.apply_movement(old_product_id, -old_in, -old_out, warehouse_id=old_warehouse_id)
+        snapshots.adjust_snapshots(old_product_id, _movement_date(instance), -old_in, -old_out)
+
+    quantity_in, quantity_out = _movement_delta(instance, instance.quantity)
+    if not ledger.apply_movement(instance.product_id, quantity_in, quantity_out, _movement_date(instance), instance.warehouse_id):
+        # Bakiye satırı yoksa (ör. eski veri) ürünün bakiyesi baştan hesaplanır
+        ledger.rebuild_balances([instance.product_id])
+    snapshots.adjust_snapshots(instance.product_id, _movement_date(instance), quantity_in, quantity_out)
+    changed = {instance.product_id}
+    if previous is not None and previous[0] != instance.product_id:
+        ledger.refresh_last_movement(previous[0])
+        changed.add(previous[0])
+    _forget_cached_balance(instance)
+    stock_changed.send(sender=sender, product_ids=changed)
+
+
+@receiver(post_delete, sender=EntryTransaction)
+@receiver(post_delete, sender=ExitTransaction)
+def apply_deleted_movement(sender, instance, origin=None, **kwargs):
+    # Ürün silinirken bakiyesi de silinir, tek tek geri almaya gerek yok
+    if isinstance(origin, Product) or getattr(origin, 'model', None) is Product:
+        return
+    quantity_in, quantity_out = _movement_delta(instance, instance.quantity)
+    if ledger.apply_movement(instance.product_id, -quantity_in, -quantity_out, warehouse_id=instance.warehouse_id):
+        ledger.refresh_last_movement(instance.product_id)
+    snapshots.adjust_snapshots(instance.product_id, _movement_date(instance), -quantity_in, -quantity_out)
+    _forget_cached_balance(instance)
+    stock_changed.send(sender=sender, product_ids={instance.product_id})
+
+
+@receiver(stock_changed)
+def evaluate_low_stock_alerts(sender, product_ids, **kwargs):
+    alerts.evaluate(product_ids)
+
+
+def _bump_stock_versions(product_ids):
+    # İşlem tamamlanmadan artırılırsa eşzamanlı bir okuma eski stoğu yeni sürümle önbelleğe yazabilir
+    names = [product_stock(product_id) for product_id in product_ids]
+    _on_commit(lambda: bump_version(*names))
+
+
+@receiver(stock_changed)
+def invalidate_cached_stock(sender, product_ids, **kwargs):
+    _bump_stock_versions(product_ids)
+
+
+def _bump_shelf_versions(shelf_ids):
+    names = [shelf_contents(shelf_id) for shelf_id in shelf_ids if shelf_id is not None]
+    if names:
+        _on_commit(lambda: bump_version(*names))
+
+
+def _bump_product_shelves(product_ids):
+    shelf_ids = Product.objects.filter(pk__in=product_ids, shelf__isnull=False).values_list('shelf_id', flat=True)
+    bump_version(*{shelf_contents(shelf_id) for shelf_id in shelf_ids})
+
+
+@receiver(stock_changed)
+def invalidate_shelf_blocks(sender, product_ids, **kwargs):
+    # Raf sayfasındaki bloklar (bkz. fragments.py) raftaki ürünlerin stoğunu gösterir. Raflar işlem
+    # onaylandıktan sonra okunur; yazma kilidi tutulurken fazladan sorgu çalışmaz
+    product_ids = list(product_ids)
+    _on_commit(lambda: _bump_product_shelves(product_ids))
+
+
+@receiver(stock_changed)
+def publish_live_stock(sender, product_ids, **kwargs):
+    if not settings.DEPO_LIVE_UPDATES:
+        return
+    # Satırlar işlem onaylandıktan ve yazma kilidi bırakıldıktan sonra okunur; geri alınan işlemler yayınlanmaz
+    product_ids = set(product_ids)
+    _on_commit(lambda: ledger.after_serialized_writes(lambda: live.publish_stock(product_ids)))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_cached_product(sender, instance, **kwargs):
+    # Miktar türü de önbellekteki yanıtın parçası
+    _bump_stock_versions([instance.pk])
+    # Ürün başka rafa taşındıysa eski rafın bloğu da değişir
+    _bump_shelf_versions({instance.shelf_id, getattr(instance, '_previous_shelf_id', None)})
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_shelf(sender, instance, raw=False, **kwargs):
+    instance._previous_shelf_id = None
+    if instance.pk is not None and not raw:
+        instance._previous_shelf_id = sender.objects.filter(pk=instance.pk).values_list('shelf_id', flat=True).first()
+
+
+@receiver(post_save, sender=Shelf)
+@receiver(post_delete, sender=Shelf)
+@receiver(post_save, sender=QuantityType)
+@receiver(post_delete, sender=QuantityType)
+def invalidate_parameter_fragments(sender, **kwargs):
+    # Raf / miktar türü adları tüm satır ve raf bloklarında görünür; nadir değiştiği için hepsi geçersiz olur
+    _on_commit(lambda: bump_version(PARAMETERS))
+
+
+@receiver(post_save, sender=QuantityType)
+@receiver(post_delete, sender=QuantityType)
+@receiver(post_save, sender=Shelf)
+@receiver(post_delete, sender=Shelf)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Warehouse)
+@receiver(post_delete, sender=Warehouse)
+def invalidate_reference_tables(sender, **kwargs):
+    # Hemen artırılır ki aynı istekte (ör. kaydedip yönlendirmeden önce) yeni kayıt görülsün; onaydan
+    # sonra tekrar artırılır ki işlem sürerken eski tabloyu okuyan başka bir süreç onu saklı tutmasın
+    bump_version(REFERENCE)
+    _on_commit(lambda: bump_version(REFERENCE))
+
+
+@receiver(post_save, sender=ExitTransaction)
+@receiver(post_delete, sender=ExitTransaction)
+@receiver(post_delete, sender=Department)
+def invalidate_consumption(sender, instance, created=False, **kwargs):
+    # Tüketim toplamlarına yeni çıkışlar sonradan eklenir; değişen ya da silinen çıkışlar (ve
+    # departmanı sinyalsiz boşaltılan çıkışlar) için toplamlar baştan hesaplanmalı
+    if not created:
+        _on_commit(lambda: bump_version(CONSUMPTION))
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+def _related_product_ids(instance):
+    field = 'shelf' if isinstance(instance, Shelf) else 'quantity_type'
+    return list(Product.objects.filter(**{field: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Shelf)
+@receiver(post_save, sender=QuantityType)
+def reindex_renamed_parameter(sender, instance, created, raw=False, **kwargs):
+    # Raf / miktar türü adı ürünün indeks satırında da tutulur
+    if not created and not raw:
+        search.index_products(_related_product_ids(instance))
+
+
+@receiver(pre_delete, sender=Shelf)
+@receiver(pre_delete, sender=QuantityType)
+def remember_parameter_products(sender, instance, **kwargs):
+    # Silmede ürünlerin alanı sinyalsiz bir UPDATE ile boşaltılır; etkilenen ürünler önceden alınır
+    instance._search_product_ids = _related_product_ids(instance)
+
+
+@receiver(post_delete, sender=Shelf)
+@receiver(post_delete, sender=QuantityType)
+def reindex_parameter_products(sender, instance, **kwargs):
+    search.index_products(getattr(instance, '_search_product_ids', []))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_dataset_version(sender, **kwargs):
+    # Dışa aktarma dosyaları bu sürüme göre yeniden kullanılır. Onaydan önce artırılırsa arada
+    # hazırlanan bir dosya eski veriyle yeni sürüme kaydedilir
+    if sender._meta.app_label == 'depo' and sender is not ExportJob:
+        _on_commit(lambda: bump_version(DATASET))
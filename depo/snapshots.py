@@ -0,0 +1,125 @@
+"""Stok anlık görüntüleri ve geçmiş tarihli stok sorguları.
+
+Anlık görüntü, bir kesim anından önceki tüm hareketlerin ürün bazında toplamıdır. Yeni görüntü
+bir öncekinin üzerine aradaki hareketler eklenerek hesaplanır; "şu tarihteki stok" sorusu da
+aynı şekilde en yakın önceki görüntü + aradaki hareketler olarak cevaplanır. Böylece iki işlem de
+defterin tamamını değil sadece aradaki hareketleri okur.
+
+Toplamı sıfır olan ürünler için satır yazılmaz; görüntüde satırı olmayan ürünün stoğu sıfırdır.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from .archive import movement_sources
+from .models import StockSnapshot
+from .routers import current_database
+
+
+def end_of_day(day):
+    """Günün sonunu (ertesi günün başlangıcını) döner; o günün hareketleri dahil edilir"""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def latest_cutoff(moment):
+    """Verilen andan önceki ya da ona eşit en son görüntü zamanı"""
+    return StockSnapshot.objects.filter(taken_at__lte=moment).aggregate(latest=Max('taken_at'))['latest']
+
+
+def _movement_totals(totals, start, end, product_ids):
+    # Devir kayıtları değil, arşivdekiler dahil gerçek hareketler sayılır
+    for kind, index in (('entry', 0), ('exit', 1)):
+        sources, date_field = movement_sources(kind)
+        for movements in sources:
+            movements = movements.filter(**{f'{date_field}__lt': end})
+            if start is not None:
+                movements = movements.filter(**{f'{date_field}__gte': start})
+            if product_ids is not None:
+                movements = movements.filter(product_id__in=product_ids)
+            for product_id, quantity in movements.values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total'):
+                totals[product_id][index] += quantity
+
+
+def totals_as_of(moment, product_ids=None, use_snapshots=True):
+    """{ürün id: [toplam giriş, toplam çıkış]} döner; moment'ten önceki hareketler sayılır"""
+    totals = defaultdict(lambda: [0, 0])
+    cutoff = latest_cutoff(moment) if use_snapshots else None
+    if cutoff is not None:
+        snapshots = StockSnapshot.objects.filter(taken_at=cutoff)
+        if product_ids is not None:
+            snapshots = snapshots.filter(product_id__in=product_ids)
+        for product_id, total_in, total_out in snapshots.values_list('product_id', 'total_in', 'total_out'):
+            totals[product_id] = [total_in, total_out]
+    _movement_totals(totals, cutoff, moment, product_ids)
+    return totals, cutoff
+
+
+def stock_as_of(moment, product_ids=None, use_snapshots=True):
+    """{ürün id: kalan stok} döner; listede olmayan ürünlerin stoğu sıfırdır"""
+    totals, _ = totals_as_of(moment, product_ids, use_snapshots)
+    return {
+        product_id: total_in - total_out
+        for product_id, (total_in, total_out) in totals.items()
+        if total_in or total_out
+    }
+
+
+def take_snapshot(taken_at, period=StockSnapshot.PERIOD_DAILY):
+    """taken_at anına ait görüntüyü önceki görüntü + aradaki hareketlerden oluşturur.
+
+    Aynı ana ait görüntü zaten varsa yeniden hesaplanmaz (aylık istenmişse dönemi güncellenir).
+    Oluşturulan satır sayısını döner.
+    """
+    with transaction.atomic(using=current_database()):
+        existing = StockSnapshot.objects.filter(taken_at=taken_at)
+        if existing.exists():
+            if period == StockSnapshot.PERIOD_MONTHLY:
+                existing.update(period=period)
+            return 0
+
+        # taken_at'te görüntü olmadığından en yakın görüntü bir öncekidir
+        totals, _ = totals_as_of(taken_at)
+        snapshots = [
+            StockSnapshot(
+                product_id=product_id, taken_at=taken_at, period=period,
+                total_in=total_in, total_out=total_out, on_hand=total_in - total_out,
+            )
+            for product_id, (total_in, total_out) in totals.items()
+            if total_in or total_out
+        ]
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=2000)
+    return len(snapshots)
+
+
+def adjust_snapshots(product_id, moved_at, quantity_in=0, quantity_out=0):
+    """Geçmiş tarihli bir hareket eklenince/silinince sonraki görüntüleri düzeltir"""
+    if moved_at is None or not (quantity_in or quantity_out):
+        return
+    # Yeni hareketler her görüntüden sonra geldiği için çoğunlukla boş bir indeks aralığıdır
+    cutoffs = dict(
+        StockSnapshot.objects.filter(taken_at__gt=moved_at).values_list('taken_at', 'period').distinct()
+    )
+    if not cutoffs:
+        return
+    updated = StockSnapshot.objects.filter(product_id=product_id, taken_at__gt=moved_at).update(
+        total_in=F('total_in') + quantity_in,
+        total_out=F('total_out') + quantity_out,
+        on_hand=F('on_hand') + quantity_in - quantity_out,
+    )
+    if updated == len(cutoffs):
+        return
+    # Kesim anında toplamı sıfır olduğu için satırı yazılmamış ürün
+    present = set(
+        StockSnapshot.objects.filter(product_id=product_id, taken_at__gt=moved_at).values_list('taken_at', flat=True)
+    )
+    StockSnapshot.objects.bulk_create([
+        StockSnapshot(
+            product_id=product_id, taken_at=taken_at, period=period,
+            total_in=quantity_in, total_out=quantity_out, on_hand=quantity_in - quantity_out,
+        )
+        for taken_at, period in cutoffs.items()
+        if taken_at not in present
+    ])
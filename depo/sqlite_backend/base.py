@@ -0,0 +1,67 @@
+"""Performans ayarlı SQLite veritabanı arka ucu.
+
+Django'nun sqlite3 arka ucunu iki noktada genişletir:
+
+* Her yeni bağlantıda OPTIONS['pragmas'] içindeki PRAGMA'lar çalıştırılır (WAL, synchronous,
+  busy_timeout, mmap_size, cache_size...). Verilmeyenler için DEFAULT_PRAGMAS kullanılır.
+* İşlemler OPTIONS['transaction_mode'] ile başlatılır (varsayılan IMMEDIATE). DEFERRED işlemde
+  okumayla başlayıp sonra yazan iki istek kilidi yükseltmeye çalışırken biri beklemeden
+  "database is locked" hatası alır; IMMEDIATE işlem yazma kilidini baştan alır ve diğerleri
+  busy_timeout süresince sırada bekler.
+
+Django 5.1'deki transaction_mode seçeneğiyle aynı adı kullanır; seçilen kip, 5.1'deki gibi
+bağlantı açılırken DatabaseWrapper.transaction_mode özniteliğine yazılır.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 128 * 1024 * 1024,
+    # Negatif değer KiB cinsindendir: 64 MB
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+DEFAULT_TRANSACTION_MODE = 'IMMEDIATE'
+
+_PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+_PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pragmas(self):
+        pragmas = {**DEFAULT_PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+        for name, value in pragmas.items():
+            if not _PRAGMA_NAME.match(name) or not _PRAGMA_VALUE.match(str(value)):
+                raise ImproperlyConfigured(f"Geçersiz SQLite PRAGMA ayarı: {name}={value}")
+        # None verilen PRAGMA hiç çalıştırılmaz (SQLite varsayılanı kalır)
+        return {name: value for name, value in pragmas.items() if value is not None}
+
+    transaction_mode = DEFAULT_TRANSACTION_MODE
+
+    def get_connection_params(self):
+        mode = str(self.settings_dict['OPTIONS'].get('transaction_mode', DEFAULT_TRANSACTION_MODE)).upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode şunlardan biri olmalı: {', '.join(TRANSACTION_MODES)}")
+        # Django 5.1+ seçeneği burada kendisi okur ve verilmemişse özniteliği None yapar; varsayılan üstüne yazılır
+        params = super().get_connection_params()
+        self.transaction_mode = mode
+        # sqlite3.connect() bu anahtarları tanımaz
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,123 @@
+"""Performans ölçümleri için gerçekçi sentetik depo verisi.
+
+Dağılımlar gerçek bir depoya benzer şekilde çarpıktır: az sayıda ürün ve departman hareketlerin
+büyük kısmını alır (Zipf), hareketler son aylarda yoğunlaşır ve mesai saatlerine düşer, çıkış
+miktarları girişlerden küçüktür. Hareketler tarih sırasıyla üretilir ve hiçbir ürünün stoğu
+eksiye düşmez; stoğu yetmeyen çıkış girişe çevrilir.
+
+Veri bulk_create ile yazıldığı için model sinyalleri çalışmaz; stok bakiyeleri, arama indeksi ve
+düşük stok uyarıları üretimin sonunda topluca yeniden oluşturulur. Aynı seed aynı veriyi üretir.
+"""
+import random
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import alerts, ledger, search
+from .models import Department, EntryTransaction, ExitTransaction, Product, QuantityType, Shelf, explicit_movement_dates
+
+BATCH_SIZE = 5000
+EXIT_RATIO = 0.55
+
+QUANTITY_TYPES = ['Adet', 'Kutu', 'Paket', 'Kg', 'Metre', 'Litre']
+DEPARTMENTS = [
+    'Bakım', 'Üretim', 'Kalite', 'Lojistik', 'Bilgi İşlem', 'İdari İşler', 'Temizlik', 'Güvenlik',
+    'Satın Alma', 'Ar-Ge', 'Mutfak', 'Sevkiyat',
+]
+PRODUCT_NAMES = [
+    'Vida', 'Somun', 'Pul', 'Cıvata', 'Dübel', 'Eldiven', 'Maske', 'Gözlük', 'Kablo', 'Sigorta',
+    'Ampul', 'Priz', 'Boya', 'Fırça', 'Silikon', 'Bant', 'Rulman', 'Kayış', 'Filtre', 'Yağ',
+    'Kağıt Havlu', 'Deterjan', 'Toner', 'Kalem', 'Klasör', 'Koli', 'Streç Film', 'Palet', 'Conta', 'Hortum',
+]
+VARIANTS = ['M6', 'M8', 'M10', 'Küçük', 'Orta', 'Büyük', 'Beyaz', 'Siyah', '5 L', '20 L', 'Çelik', 'Plastik']
+
+
+def _zipf_weights(count, exponent=1.1):
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def _pick(rng, items, cumulative):
+    return items[bisect(cumulative, rng.random() * cumulative[-1])]
+
+
+def _moment(rng, now, days):
+    # Rastgele sayının karesi alınarak yakın tarihlere ağırlık verilir
+    day = int(days * rng.random() ** 2)
+    moment = now - timedelta(days=day)
+    return moment.replace(hour=rng.randint(8, 17), minute=rng.randint(0, 59), second=rng.randint(0, 59), microsecond=0)
+
+
+def generate_dataset(products=1000, movements=20000, shelves=None, departments=None, days=365, seed=0, progress=None):
+    """Sentetik ürün, raf, departman ve hareket üretir; üretilen kayıt sayılarını döner.
+
+    Ürün adları benzersiz olduğundan boş bir veritabanında çalıştırılmalıdır.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    shelves = shelves if shelves is not None else max(1, products // 10)
+    departments = departments if departments is not None else len(DEPARTMENTS)
+
+    with transaction.atomic():
+        quantity_types = QuantityType.objects.bulk_create([QuantityType(name=name) for name in QUANTITY_TYPES])
+        shelf_objects = Shelf.objects.bulk_create([Shelf(name=f'{chr(65 + i % 26)}-{i // 26 + 1:03d}') for i in range(shelves)])
+        department_objects = Department.objects.bulk_create([
+            Department(name=DEPARTMENTS[i] if i < len(DEPARTMENTS) else f'Departman {i + 1}') for i in range(departments)
+        ])
+        product_objects = Product.objects.bulk_create([
+            Product(
+                name=f'{rng.choice(PRODUCT_NAMES)} {rng.choice(VARIANTS)} {i + 1:05d}',
+                quantity_type=rng.choice(quantity_types),
+                minimum_quantity=rng.choice([0, 0, 5, 10, 20, 50]),
+                # Ürünlerin bir kısmı rafa yerleştirilmemiştir
+                shelf=rng.choice(shelf_objects) if rng.random() < 0.9 else None,
+            )
+            for i in range(products)
+        ], batch_size=BATCH_SIZE)
+
+    product_ids = [product.pk for product in product_objects]
+    rng.shuffle(product_ids)
+    department_ids = [department.pk for department in department_objects]
+    product_weights = _zipf_weights(len(product_ids))
+    department_weights = _zipf_weights(len(department_ids))
+
+    moments = sorted(_moment(rng, now, days) for _ in range(movements))
+    stock = dict.fromkeys(product_ids, 0)
+    counts = {'entries': 0, 'exits': 0}
+    with explicit_movement_dates():
+        for start in range(0, movements, BATCH_SIZE):
+            entries, exits = [], []
+            for moment in moments[start:start + BATCH_SIZE]:
+                product_id = _pick(rng, product_ids, product_weights)
+                quantity = max(1, int(rng.lognormvariate(1.5, 0.8)))
+                if rng.random() < EXIT_RATIO and stock[product_id] >= quantity:
+                    stock[product_id] -= quantity
+                    exits.append(ExitTransaction(
+                        product_id=product_id, quantity=quantity, exit_date=moment,
+                        department_id=_pick(rng, department_ids, department_weights),
+                    ))
+                else:
+                    # Girişler toplu gelir
+                    quantity *= rng.choice([2, 5, 10])
+                    stock[product_id] += quantity
+                    entries.append(EntryTransaction(product_id=product_id, quantity=quantity, entry_date=moment))
+            with transaction.atomic():
+                EntryTransaction.objects.bulk_create(entries)
+                ExitTransaction.objects.bulk_create(exits)
+            counts['entries'] += len(entries)
+            counts['exits'] += len(exits)
+            if progress:
+                progress(start + len(entries) + len(exits), movements)
+
+    ledger.rebuild_balances()
+    search.rebuild_index()
+    opened, _ = alerts.reconcile()
+    return {
+        'products': products,
+        'shelves': shelves,
+        'departments': departments,
+        **counts,
+        'open_alerts': opened,
+    }
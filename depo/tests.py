@@ -1,3 +1,1862 @@
-from django.test import TestCase
+import asyncio
+import csv
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from openpyxl import load_workbook
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router
+from django.http import QueryDict, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from .models import (
+    Product, QuantityType, Shelf, Department, EntryTransaction, ExitTransaction, StockBalance, ExportJob, LowStockAlert, StockSnapshot,
+    ArchivedEntryTransaction, ArchivedExitTransaction, Warehouse, WarehouseStock, explicit_movement_dates,
+)
+from .routers import WarehouseRouter, database_aliases, make_cache_key, use_warehouse
+from .utils import calculate_product_stock, get_product_stock_details
+from .history import InvalidHistoryFilter, movement_history, parse_history_filters
+from .forms import EntryTransactionForm, ExitTransactionForm
+from .imports import import_entries
+from .snapshots import end_of_day, stock_as_of, take_snapshot
+from .versions import REFERENCE, bump_version
+from . import (
+    alerts, analytics, archive, bench, caching, exports, fragments, instrumentation, jobs, ledger, listing, live, query_audit, reference, search, synthetic,
+    versions, warehouses,
+)
+
+
+class StockBalanceTests(TestCase):
+    def setUp(self):
+        self.quantity_type = QuantityType.objects.create(name='Adet')
+        self.product = Product.objects.create(name='Vida', quantity_type=self.quantity_type)
+
+    def balance(self, product=None):
+        return StockBalance.objects.get(product=product or self.product)
+
+    def test_balance_created_with_product(self):
+        balance = self.balance()
+        self.assertEqual((balance.total_in, balance.total_out, balance.on_hand), (0, 0, 0))
+        self.assertIsNone(balance.last_movement_at)
+
+    def test_entry_and_exit_update_balance(self):
+        entry = EntryTransaction.objects.create(product=self.product, quantity=10)
+        exit = ExitTransaction.objects.create(product=self.product, quantity=4)
+
+        balance = self.balance()
+        self.assertEqual((balance.total_in, balance.total_out, balance.on_hand), (10, 4, 6))
+        self.assertEqual(balance.last_movement_at, max(entry.entry_date, exit.exit_date))
+        self.assertEqual(self.product.calculated_stock, 6)
+        self.assertEqual(ledger.verify_balances(), [])
+        self.assertEqual(calculate_product_stock(self.product), 6)
+        self.assertEqual(get_product_stock_details(self.product), {'total_entry': 10, 'total_exit': 4, 'current_stock': 6})
+
+    def test_edit_and_delete_revert_previous_quantity(self):
+        other = Product.objects.create(name='Somun')
+        entry = EntryTransaction.objects.create(product=self.product, quantity=10)
+        exit = ExitTransaction.objects.create(product=self.product, quantity=3)
+
+        entry.quantity = 7
+        entry.save()
+        self.assertEqual(self.balance().on_hand, 4)
+
+        exit.product = other
+        exit.save()
+        self.assertEqual(self.balance().on_hand, 7)
+        self.assertEqual(self.balance(other).on_hand, -3)
+
+        exit.delete()
+        self.assertEqual(self.balance(other).on_hand, 0)
+        self.assertIsNone(self.balance(other).last_movement_at)
+
+    def test_cached_stock_refreshed_after_movement(self):
+        EntryTransaction.objects.create(product=self.product, quantity=5)
+        self.assertEqual(self.product.calculated_stock, 5)
+        ExitTransaction.objects.create(product=self.product, quantity=5)
+        self.assertEqual(self.product.calculated_stock, 0)
+
+    def test_product_delete_cascades(self):
+        EntryTransaction.objects.create(product=self.product, quantity=5)
+        ExitTransaction.objects.create(product=self.product, quantity=2)
+        self.product.delete()
+        self.assertFalse(StockBalance.objects.exists())
+
+    def test_rebuild_and_verify_command(self):
+        EntryTransaction.objects.create(product=self.product, quantity=8)
+        ExitTransaction.objects.create(product=self.product, quantity=3)
+        StockBalance.objects.filter(product=self.product).update(on_hand=100)
+
+        self.assertEqual(len(ledger.verify_balances()), 1)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_stock_balances', '--verify', stdout=StringIO())
+
+        call_command('rebuild_stock_balances', stdout=StringIO())
+        self.assertEqual(self.balance().on_hand, 5)
+        self.assertEqual(ledger.verify_balances(), [])
+
+
+class ProductStockQuerySetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('depocu', password='parola')
+        self.quantity_type = QuantityType.objects.create(name='Adet')
+        self.shelf = Shelf.objects.create(name='A1')
+        cache.clear()
+
+    def create_products(self, count, start=0):
+        # Parça önbelleğinin sürümleri işlem onaylanınca artırılır
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(start, start + count):
+                product = Product.objects.create(name=f'Ürün {i}', quantity_type=self.quantity_type, shelf=self.shelf, minimum_quantity=2)
+                EntryTransaction.objects.create(product=product, quantity=5)
+                ExitTransaction.objects.create(product=product, quantity=i % 5)
+
+    def test_with_stock_does_not_double_count(self):
+        product = Product.objects.create(name='Civata', minimum_quantity=3)
+        for quantity in (10, 5):
+            EntryTransaction.objects.create(product=product, quantity=quantity)
+        for quantity in (2, 2, 1):
+            ExitTransaction.objects.create(product=product, quantity=quantity)
+
+        for queryset in (Product.objects.with_stock(), Product.objects.with_ledger_stock()):
+            annotated = queryset.get(pk=product.pk)
+            self.assertEqual((annotated.total_entry, annotated.total_exit, annotated.current_stock), (15, 5, 10))
+            self.assertFalse(annotated.is_below_minimum)
+
+    def test_below_minimum_flag(self):
+        product = Product.objects.create(name='Pul', minimum_quantity=3)
+        EntryTransaction.objects.create(product=product, quantity=3)
+        self.assertTrue(Product.objects.with_stock().get(pk=product.pk).is_below_minimum)
+
+    def assertConstantQueries(self, url):
+        self.create_products(3)
+        # Referans tabloları (bkz. reference.py) her iki ölçümde de soğuk okunur
+        reference.clear()
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.create_products(12, start=3)
+        reference.clear()
+        with self.assertNumQueries(len(small)):
+            self.client.get(url)
+
+    def test_dashboard_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        self.assertConstantQueries(reverse('dashboard'))
+
+    def test_shelf_visualization_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('shelf_visualization'))
+
+    def test_product_export_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('export_products_to_excel'))
+
+
+class ProductListApiTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        self.adet = QuantityType.objects.create(name='Adet')
+        self.kutu = QuantityType.objects.create(name='Kutu')
+        self.shelf_a = Shelf.objects.create(name='A1')
+        self.shelf_b = Shelf.objects.create(name='B2')
+        for i in range(7):
+            product = Product.objects.create(
+                name=f'Ürün {i}',
+                quantity_type=self.adet if i % 2 else self.kutu,
+                shelf=self.shelf_a if i < 4 else self.shelf_b,
+                minimum_quantity=3,
+            )
+            EntryTransaction.objects.create(product=product, quantity=i)
+
+    def fetch(self, **params):
+        response = self.client.get(reverse('product_list_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def collect(self, **params):
+        names, cursor = [], None
+        while True:
+            data = self.fetch(limit=3, cursor=cursor or '', **params)
+            names += [item['name'] for item in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return names
+
+    def test_cursor_pagination_visits_every_product_once(self):
+        self.assertEqual(self.collect(), [f'Ürün {i}' for i in range(7)])
+        self.assertEqual(self.collect(sort='-name'), [f'Ürün {i}' for i in reversed(range(7))])
+
+    def test_sort_by_stock(self):
+        EntryTransaction.objects.create(product=Product.objects.get(name='Ürün 0'), quantity=100)
+        names = self.collect(sort='-stock')
+        self.assertEqual(names[0], 'Ürün 0')
+        self.assertEqual(names[1:], [f'Ürün {i}' for i in range(6, 0, -1)])
+
+    def test_filters_and_search(self):
+        self.assertEqual(len(self.fetch(q='b2')['results']), 3)
+        self.assertEqual(len(self.fetch(quantity_type=self.adet.pk)['results']), 3)
+        self.assertEqual(len(self.fetch(shelf=self.shelf_a.pk)['results']), 4)
+        self.assertEqual([p['name'] for p in self.fetch(below_minimum='1')['results']], ['Ürün 0', 'Ürün 1', 'Ürün 2', 'Ürün 3'])
+
+    def test_response_includes_row_html(self):
+        data = self.fetch(limit=2)
+        self.assertIn('data-product-id', data['html'])
+        self.assertIsNotNone(data['next_cursor'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('product_list_api'), {'cursor': 'bozuk'})
+        self.assertEqual(response.status_code, 400)
+        # Sıralama alanıyla uyuşmayan imleç değeri sorguya ulaşmaz
+        for sort, value, pk in (('stock', 'abc', 1), ('stock', True, 1), ('name', 3, 1), ('stock', 10 ** 30, 1), ('name', 'a', 10 ** 30)):
+            cursor = listing.encode_cursor(value, pk)
+            response = self.client.get(reverse('product_list_api'), {'sort': sort, 'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+    def test_invalid_filters(self):
+        for params in ({'shelf': 'abc'}, {'quantity_type': 'x'}, {'shelf': str(10 ** 30)}, {'quantity_type': str(-10 ** 30)}):
+            self.assertEqual(self.client.get(reverse('product_list_api'), params).status_code, 400)
+
+    def test_dashboard_ignores_invalid_parameters(self):
+        for params in ({'cursor': 'bozuk'}, {'shelf': 'abc'}, {'quantity_type': 'x'}):
+            response = self.client.get(reverse('dashboard'), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['products']), 7)
+
+
+class MovementHistoryTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Vida')
+        self.department = Department.objects.create(name='Bakım')
+        self.start = timezone.make_aware(timezone.datetime(2024, 1, 1))
+        # Her gün bir giriş ve bir çıkış; çıkışların yarısı aynı saniyeye düşer
+        for day in range(10):
+            entry = EntryTransaction.objects.create(product=self.product, quantity=10)
+            exit = ExitTransaction.objects.create(product=self.product, quantity=1, department=self.department if day % 2 else None)
+            EntryTransaction.objects.filter(pk=entry.pk).update(entry_date=self.start + timedelta(days=day))
+            ExitTransaction.objects.filter(pk=exit.pk).update(exit_date=self.start + timedelta(days=day, hours=day % 2))
+
+    def all_pages(self, filters=None, limit=3):
+        rows, cursor = movement_history(self.product.pk, filters, limit=limit)
+        while cursor:
+            page, cursor = movement_history(self.product.pk, filters, cursor, limit=limit)
+            rows += page
+        return rows
+
+    def test_pages_match_full_ordering(self):
+        rows = self.all_pages()
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(len({(row['transaction_type'], row['pk']) for row in rows}), 20)
+        keys = [(row['date'], row['pk'], row['transaction_type']) for row in rows]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertEqual([row['department_name'] for row in rows[-2:]], ['Bilinmiyor', 'Depo'])
+        self.assertEqual(rows[0]['department_name'], 'Bakım')
+
+    def test_date_and_department_filters(self):
+        filters = parse_history_filters({'date_from': '2024-01-03', 'date_to': '2024-01-04'})
+        rows = self.all_pages(filters)
+        self.assertEqual([row['transaction_type'] for row in rows], ['Çıkış', 'Giriş', 'Çıkış', 'Giriş'])
+
+        rows = self.all_pages(parse_history_filters({'department': str(self.department.pk)}))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual({row['department_name'] for row in rows}, {'Bakım'})
+
+    def test_invalid_dates_fall_back_to_full_history(self):
+        for params in ({'date_from': '2020-02-30'}, {'date_from': '0001-01-01'}, {'date_to': '9999-12-31'}, {'department': str(10 ** 30)}):
+            with self.assertRaises(InvalidHistoryFilter):
+                parse_history_filters(params)
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        response = self.client.get(reverse('product_detail', args=[self.product.pk]), {'date_from': '2020-02-30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['transactions']), 20)
+
+    def test_detail_page_queries_do_not_grow_with_history(self):
+        url = reverse('product_detail', args=[self.product.pk])
+        reference.clear()
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['transactions']), 20)
+        for _ in range(60):
+            EntryTransaction.objects.create(product=self.product, quantity=1)
+        reference.clear()
+        with self.assertNumQueries(len(small)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['transactions']), 50)
+
+        next_url = response.context['next_url']
+        response = self.client.get(url + next_url)
+        self.assertEqual(len(response.context['transactions']), 30)
+        self.assertIsNone(response.context['next_url'])
+
+
+class StockSnapshotTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        self.vida = Product.objects.create(name='Vida')
+        self.pul = Product.objects.create(name='Pul')
+        self.today = timezone.localdate()
+        self.days = [self.today - timedelta(days=n) for n in (5, 4, 3, 2, 1)]
+        self.exits = []
+        for n, day in enumerate(self.days):
+            self.move(EntryTransaction, self.vida, 10, day)
+            self.exits.append(self.move(ExitTransaction, self.vida, n, day))
+        self.pul_entry = self.move(EntryTransaction, self.pul, 7, self.days[3])
+
+    def move(self, model, product, quantity, day):
+        movement = model.objects.create(product=product, quantity=quantity)
+        date_field = 'entry_date' if model is EntryTransaction else 'exit_date'
+        model.objects.filter(pk=movement.pk).update(**{date_field: end_of_day(day) - timedelta(hours=1)})
+        return model.objects.get(pk=movement.pk)
+
+    def test_snapshot_plus_delta_matches_full_scan(self):
+        call_command('take_stock_snapshot', '--date', self.days[1].isoformat(), stdout=StringIO())
+        call_command('take_stock_snapshot', '--date', self.days[3].isoformat(), stdout=StringIO())
+        # İkinci görüntü birincinin üzerine hesaplanır; Pul ilk görüntüde yok
+        self.assertEqual(
+            set(StockSnapshot.objects.values_list('taken_at', 'product__name', 'on_hand')),
+            {(end_of_day(self.days[1]), 'Vida', 19), (end_of_day(self.days[3]), 'Vida', 34), (end_of_day(self.days[3]), 'Pul', 7)},
+        )
+        for day in self.days:
+            moment = end_of_day(day)
+            self.assertEqual(stock_as_of(moment), stock_as_of(moment, use_snapshots=False))
+        self.assertEqual(take_snapshot(end_of_day(self.days[3])), 0)
+
+    def test_command_rejects_invalid_dates(self):
+        for value in ('x', '2020-02-30', '9999-12-31'):
+            with self.assertRaisesMessage(CommandError, f'Geçersiz tarih: {value}'):
+                call_command('take_stock_snapshot', '--date', value, stdout=StringIO())
+        # Ayın son günü takvimin sonuna taşar
+        with self.assertRaisesMessage(CommandError, 'Geçersiz tarih: 9999-12-15'):
+            call_command('take_stock_snapshot', '--date', '9999-12-15', '--period', 'monthly', stdout=StringIO())
+
+    def test_editing_old_movements_adjusts_later_snapshots(self):
+        take_snapshot(end_of_day(self.days[3]))
+        self.pul_entry.quantity = 12
+        self.pul_entry.save()
+        # Görüntüde satırı olmayan ürüne taşınan hareket yeni satır açar
+        old_exit = self.exits[2]
+        old_exit.product = Product.objects.create(name='Somun')
+        old_exit.save()
+        self.assertEqual(
+            dict(StockSnapshot.objects.values_list('product__name', 'on_hand')),
+            {'Vida': 36, 'Pul': 12, 'Somun': -2},
+        )
+        self.pul_entry.delete()
+        self.assertEqual(StockSnapshot.objects.get(product=self.pul).on_hand, 0)
+        moment = end_of_day(self.days[4])
+        self.assertEqual(stock_as_of(moment), stock_as_of(moment, use_snapshots=False))
+
+    def test_report_and_api(self):
+        take_snapshot(end_of_day(self.days[1]))
+        response = self.client.get(reverse('stock_report'), {'date': self.days[2].isoformat()})
+        self.assertEqual(response.context['snapshot_at'], end_of_day(self.days[1]))
+        self.assertEqual([(row['product'].name, row['on_hand']) for row in response.context['rows']], [('Pul', 0), ('Vida', 27)])
+
+        data = self.client.get(reverse('stock_as_of_api'), {'date': self.days[3].isoformat()}).json()
+        self.assertEqual(data['results'], {str(self.vida.pk): 34, str(self.pul.pk): 7})
+        self.assertEqual(self.client.get(reverse('stock_as_of_api'), {'date': 'dün'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('stock_as_of_api'), {'date': '2020-13-01'}).status_code, 400)
+        for value in ('2020-02-30', '9999-12-31'):
+            response = self.client.get(reverse('stock_report'), {'date': value})
+            self.assertEqual(response.context['day'], timezone.localdate())
+        self.assertEqual(self.client.get(reverse('stock_as_of_api'), {'date': '9999-12-31'}).status_code, 400)
+
+
+class LedgerArchiveTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Bakım')
+        self.vida = Product.objects.create(name='Vida')
+        self.pul = Product.objects.create(name='Pul')
+        self.today = timezone.localdate()
+        for days_ago in (40, 30, 20, 10, 0):
+            day = self.today - timedelta(days=days_ago)
+            self.move(EntryTransaction, self.vida, 10, day)
+            self.move(ExitTransaction, self.vida, 3, day, department=self.department)
+            self.move(EntryTransaction, self.pul, 2, day)
+        self.horizon = end_of_day(self.today - timedelta(days=15))
+
+    def move(self, model, product, quantity, day, **fields):
+        movement = model.objects.create(product=product, quantity=quantity, **fields)
+        date_field = 'entry_date' if model is EntryTransaction else 'exit_date'
+        model.objects.filter(pk=movement.pk).update(**{date_field: end_of_day(day) - timedelta(hours=1)})
+
+    def observable_state(self):
+        moments = [end_of_day(self.today - timedelta(days=n)) for n in (35, 25, 15, 5, 0)]
+        return {
+            'balances': list(StockBalance.objects.order_by('product').values_list('total_in', 'total_out', 'on_hand')),
+            'history': [movement_history(product.pk, limit=200)[0] for product in (self.vida, self.pul)],
+            'export': sorted(exports.transaction_rows()),
+            'as_of': [stock_as_of(moment) for moment in moments],
+        }
+
+    def test_archive_is_batched_resumable_and_transparent(self):
+        # Sadece arşivlenecek hareketi olan ürün
+        somun = Product.objects.create(name='Somun')
+        self.move(EntryTransaction, somun, 4, self.today - timedelta(days=30))
+        for product in Product.objects.all():
+            ledger.refresh_last_movement(product.pk)
+        take_snapshot(end_of_day(self.today - timedelta(days=25)))
+        before = self.observable_state()
+        last_movements = list(StockBalance.objects.order_by('product').values_list('last_movement_at', flat=True))
+
+        # Yarıda kesilen çalıştırma
+        self.assertEqual(archive.archive_movements(self.horizon, batch_size=2, max_batches=2), 4)
+        self.assertEqual(self.observable_state(), before)
+        self.assertEqual(ledger.verify_balances(), [])
+
+        out = StringIO()
+        call_command('archive_ledger', '--before', (self.today - timedelta(days=14)).isoformat(), '--batch-size', '2', stdout=out)
+        self.assertIn('6 hareket arşivlendi', out.getvalue())
+        self.assertEqual(archive.pending_count(self.horizon), 0)
+        self.assertEqual((ArchivedEntryTransaction.objects.count(), ArchivedExitTransaction.objects.count()), (7, 3))
+
+        # Ürün başına tek devir kaydı, toplamlar korunur
+        openings = EntryTransaction.objects.filter(is_opening_balance=True)
+        self.assertEqual(dict(openings.values_list('product__name', 'quantity')), {'Vida': 30, 'Pul': 6, 'Somun': 4})
+        self.assertEqual(ExitTransaction.objects.get(is_opening_balance=True).quantity, 9)
+        self.assertEqual(self.observable_state(), before)
+        self.assertEqual(ledger.verify_balances(), [])
+
+        # Devir kaydının tarihi son arşivlenen hareketin tarihi olduğundan son hareket tarihi değişmez
+        for product in Product.objects.all():
+            ledger.refresh_last_movement(product.pk)
+        self.assertEqual(list(StockBalance.objects.order_by('product').values_list('last_movement_at', flat=True)), last_movements)
+
+    def test_command_rejects_invalid_dates(self):
+        for value in ('x', '2020-02-30', '0001-01-01'):
+            with self.assertRaisesMessage(CommandError, f'Geçersiz tarih: {value}'):
+                call_command('archive_ledger', '--before', value, stdout=StringIO())
+        for days in (10 ** 6, 10 ** 10):
+            with self.assertRaisesMessage(CommandError, f'Geçersiz gün sayısı: {days}'):
+                call_command('archive_ledger', '--days', str(days), stdout=StringIO())
+
+    def test_detail_page_shows_archived_history(self):
+        archive.archive_movements(self.horizon)
+        response = self.client.get(reverse('product_detail', args=[self.vida.pk]))
+        self.assertEqual(response.context['current_stock'], 35)
+        self.assertEqual(len(response.context['transactions']), 10)
+
+
+class ProductStockApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # ETag'e katılan zaman dilimi testin ortasında değişmesin
+        clock = mock.patch.object(caching, '_time_slice', return_value=1)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+        adet = QuantityType.objects.create(name='Adet')
+        self.products = [Product.objects.create(name=f'Ürün {i}', quantity_type=adet) for i in range(3)]
+        for i, product in enumerate(self.products):
+            EntryTransaction.objects.create(product=product, quantity=i + 1)
+
+    def test_single_product_keeps_response_shape(self):
+        response = self.client.get(reverse('get_product_stock'), {'product_id': self.products[1].pk})
+        self.assertEqual(response.json(), {'current_stock': 2, 'quantity_type': 'Adet'})
+        self.assertEqual(self.client.get(reverse('get_product_stock'), {'product_id': 0}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('get_product_stock'), {'product_id': 'x'}).status_code, 400)
+        # SQLite'ın 64 bit tam sayılarına sığmayan id sorguya ulaşmaz
+        self.assertEqual(self.client.get(reverse('get_product_stock'), {'product_id': str(10 ** 30)}).status_code, 400)
+        response = self.client.post(reverse('get_product_stock'), {'product_ids': [10 ** 30]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_lookup_uses_one_query(self):
+        ids = ','.join(str(product.pk) for product in self.products)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('get_product_stock'), {'product_id': ids})
+        self.assertEqual(
+            {key: value['current_stock'] for key, value in response.json()['results'].items()},
+            {str(product.pk): i + 1 for i, product in enumerate(self.products)},
+        )
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse('get_product_stock'), {'product_id': ids})
+        self.assertEqual(cached.json(), response.json())
+
+        response = self.client.post(
+            reverse('get_product_stock'), {'product_ids': [self.products[0].pk, 0]}, content_type='application/json'
+        )
+        self.assertEqual(list(response.json()['results']), [str(self.products[0].pk)])
+
+    def test_etag_revalidation_and_invalidation(self):
+        url = reverse('get_product_stock')
+        params = {'product_id': f'{self.products[0].pk},{self.products[1].pk}'}
+        etag = self.client.get(url, params)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Başka bir ürünün hareketi bu yanıtı etkilemez
+        with self.captureOnCommitCallbacks(execute=True):
+            EntryTransaction.objects.create(product=self.products[2], quantity=5)
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExitTransaction.objects.create(product=self.products[1], quantity=2)
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][str(self.products[1].pk)]['current_stock'], 0)
+
+    def test_etag_expires_with_process_local_cache(self):
+        # Başka süreçteki hareketler buradaki sayacı artırmaz; ETag bir dilim sonra yenilenir
+        url = reverse('get_product_stock')
+        params = {'product_id': self.products[0].pk}
+        etag = self.client.get(url, params)['ETag']
+        self.clock.return_value += 1
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_quantity_type_rename_invalidates_cache_and_etag(self):
+        url = reverse('get_product_stock')
+        params = {'product_id': self.products[0].pk}
+        etag = self.client.get(url, params)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            quantity_type = QuantityType.objects.get(name='Adet')
+            quantity_type.name = 'Kutu'
+            quantity_type.save()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['quantity_type'], 'Kutu')
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Bakım')
+        self.vida = Product.objects.create(name='Vida')
+        self.somun = Product.objects.create(name='Somun')
+        EntryTransaction.objects.create(product=self.vida, quantity=10)
+        EntryTransaction.objects.create(product=self.somun, quantity=4)
+        ExitTransaction.objects.create(product=self.vida, quantity=3, department=self.department)
+        ExitTransaction.objects.create(product=self.somun, quantity=1)
+
+    def read_xlsx(self, response):
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        return [tuple(row) for row in workbook.active.iter_rows(values_only=True)]
+
+    def test_xlsx_export_rows(self):
+        response = self.client.get(reverse('export_transactions_to_excel'))
+        self.assertEqual(response.status_code, 200)
+        rows = self.read_xlsx(response)
+        self.assertEqual(rows[0], tuple(exports.TRANSACTION_HEADERS))
+        self.assertEqual([row[:4] for row in rows[1:]], [
+            ('Vida', 'Giriş', 10, 'Depo'),
+            ('Somun', 'Giriş', 4, 'Depo'),
+            ('Vida', 'Çıkış', 3, 'Bakım'),
+            ('Somun', 'Çıkış', 1, None),
+        ])
+
+    def test_csv_export_filters_by_product(self):
+        response = self.client.get(reverse('export_transactions_to_csv'), {'product': self.vida.pk})
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0], exports.TRANSACTION_HEADERS)
+        self.assertEqual([row[:4] for row in rows[1:]], [['Vida', 'Giriş', '10', 'Depo'], ['Vida', 'Çıkış', '3', 'Bakım']])
+
+    def test_date_range_filter(self):
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        self.assertEqual(list(exports.transaction_rows(**exports.parse_transaction_filters(QueryDict(f'date_from={tomorrow}')))), [])
+        response = self.client.get(reverse('export_transactions_to_csv'), {'date_to': 'dün'})
+        self.assertEqual(response.status_code, 400)
+        # Biçimi doğru ama takvimde olmayan tarihler
+        response = self.client.get(reverse('export_transactions_to_csv'), {'date_from': '2020-13-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('export_transactions_to_excel'), {'date_to': '2020-02-30'})
+        self.assertEqual(response.status_code, 400)
+        # Gün sınırı hesaplanamayan uç tarihler
+        response = self.client.get(reverse('export_transactions_to_csv'), {'date_to': '9999-12-31'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('export_transactions_to_excel'), {'date_from': '0001-01-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('export_transactions_to_csv'), {'product': str(10 ** 30)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_query_count_is_constant(self):
+        # Giriş ve çıkış için canlı + arşiv tablosu
+        with self.assertNumQueries(4):
+            rows = list(exports.transaction_rows())
+        self.assertEqual(len(rows), 4)
+
+    def read_sheets(self, content):
+        workbook = load_workbook(BytesIO(content))
+        return {sheet.title: [tuple(row) for row in sheet.iter_rows(values_only=True)] for sheet in workbook.worksheets}
+
+    def test_product_and_parameter_exports_match_pandas(self):
+        import pandas as pd
+
+        adet = QuantityType.objects.create(name='Adet')
+        Shelf.objects.create(name='A1')
+        Product.objects.filter(pk=self.vida.pk).update(quantity_type=adet)
+        expected = BytesIO()
+        pd.DataFrame([
+            {'Ürün Adı': 'Vida', 'Miktar Türü': 'Adet', 'Raf Numarası': '', 'Minimum Miktar': 0, 'Mevcut Stok': 7},
+            {'Ürün Adı': 'Somun', 'Miktar Türü': '', 'Raf Numarası': '', 'Minimum Miktar': 0, 'Mevcut Stok': 3},
+        ]).to_excel(expected, index=False)
+        response = self.client.get(reverse('export_products_to_excel'))
+        self.assertEqual(self.read_sheets(response.content), self.read_sheets(expected.getvalue()))
+        # Başlıklar pandas 2.x'in to_excel biçiminde (kalın, çerçeveli)
+        header = load_workbook(BytesIO(response.content)).active[1]
+        self.assertTrue(all(cell.font.b and cell.border.top.style == 'thin' for cell in header))
+
+        expected = BytesIO()
+        with pd.ExcelWriter(expected, engine='openpyxl') as writer:
+            pd.DataFrame({'Miktar Türü': ['Adet']}).to_excel(writer, sheet_name='Miktar Türleri', index=False)
+            pd.DataFrame({'Raf Numarası': ['A1']}).to_excel(writer, sheet_name='Raflar', index=False)
+            pd.DataFrame({'Departman Adı': ['Bakım']}).to_excel(writer, sheet_name='Departmanlar', index=False)
+        response = self.client.get(reverse('export_parameters_to_excel'))
+        self.assertEqual(self.read_sheets(response.content), self.read_sheets(expected.getvalue()))
+
+    def test_heavy_libraries_not_loaded_at_startup(self):
+        # Worker süreci sadece uygulamayı ve URL'leri yükler; pandas/openpyxl dışa aktarmada yüklenir
+        code = (
+            "import sys; from django.core.wsgi import get_wsgi_application; get_wsgi_application(); "
+            "from django.urls import get_resolver; get_resolver().url_patterns; "
+            "print(','.join(name for name in ('pandas', 'numpy', 'openpyxl') if name in sys.modules))"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'Depostok_Project.settings'}
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, cwd=settings.BASE_DIR, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.export_dir.cleanup)
+        settings_override = override_settings(DEPO_EXPORT_WORKERS=0, DEPO_EXPORT_DIR=self.export_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.product = Product.objects.create(name='Vida')
+        EntryTransaction.objects.create(product=self.product, quantity=10)
+
+    def submit(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('export_job_create'), data)
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_job_runs_and_file_downloads(self):
+        job = self.submit(kind='transactions', product=self.product.pk)
+        status = self.client.get(job['status_url']).json()
+        self.assertEqual((status['status'], status['progress']), ('done', 100))
+
+        response = self.client.get(status['download_url'])
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(list(workbook.active.iter_rows(values_only=True))[1][:3], ('Vida', 'Giriş', 10))
+
+    def test_identical_request_reuses_file_until_data_changes(self):
+        first = self.submit(kind='products')
+        self.assertEqual(self.submit(kind='products')['id'], first['id'])
+        self.assertNotEqual(self.submit(kind='parameters')['id'], first['id'])
+
+        # Veri sürümü işlem onaylanınca artar
+        with self.captureOnCommitCallbacks(execute=True):
+            EntryTransaction.objects.create(product=self.product, quantity=1)
+            self.assertEqual(self.submit(kind='products')['id'], first['id'])
+        self.assertNotEqual(self.submit(kind='products')['id'], first['id'])
+
+    def test_done_job_expires_with_process_local_cache(self):
+        # Başka süreçteki değişiklikler buradaki veri sürümünü artırmaz; hazır dosya kısa süre kullanılır
+        first = self.submit(kind='products')
+        finished_at = timezone.now() - timedelta(seconds=settings.DEPO_LOCAL_CACHE_SECONDS - 5)
+        ExportJob.objects.filter(pk=first['id']).update(finished_at=finished_at)
+        self.assertEqual(self.submit(kind='products')['id'], first['id'])
+
+        ExportJob.objects.filter(pk=first['id']).update(finished_at=finished_at - timedelta(seconds=10))
+        second = self.submit(kind='products')
+        self.assertNotEqual(second['id'], first['id'])
+        self.assertEqual(self.submit(kind='products')['id'], second['id'])
+
+        # Paylaşımlı önbellekte sayaç tüm süreçlerde geçerlidir, dosya veri değişene kadar kullanılır
+        with mock.patch.object(jobs, 'process_local', return_value=False):
+            self.assertEqual(self.submit(kind='products')['id'], second['id'])
+            ExportJob.objects.filter(pk=second['id']).update(finished_at=timezone.now() - timedelta(days=1))
+            self.assertEqual(self.submit(kind='products')['id'], second['id'])
+
+    def test_stale_running_job_is_not_reused(self):
+        first = self.submit(kind='products')
+        ExportJob.objects.filter(pk=first['id']).update(status=ExportJob.STATUS_RUNNING, started_at=timezone.now())
+        self.assertEqual(self.submit(kind='products')['id'], first['id'])
+
+        ExportJob.objects.filter(pk=first['id']).update(started_at=timezone.now() - timedelta(hours=1))
+        second = self.submit(kind='products')
+        self.assertNotEqual(second['id'], first['id'])
+        self.assertEqual(self.client.get(second['status_url']).json()['status'], 'done')
+        self.assertEqual(ExportJob.objects.get(pk=first['id']).status, ExportJob.STATUS_FAILED)
+
+    def test_failure_hides_traceback(self):
+        with mock.patch.dict(exports.EXPORTERS, {'products': ('urunler', mock.Mock(side_effect=RuntimeError('disk dolu')))}), \
+                self.assertLogs('depo.jobs', 'ERROR') as logs:
+            job = self.submit(kind='products')
+        status = self.client.get(job['status_url']).json()
+        self.assertEqual((status['status'], status['error']), ('failed', jobs.FAILED_MESSAGE))
+        self.assertIn('disk dolu', logs.output[0])
+
+    def test_download_before_done_and_invalid_requests(self):
+        job = ExportJob.objects.create(kind='products', fingerprint='x')
+        self.assertEqual(self.client.get(reverse('export_job_download', args=[job.pk])).status_code, 409)
+        self.assertEqual(self.client.post(reverse('export_job_create'), {'kind': 'bilinmeyen'}).status_code, 400)
+        self.assertEqual(self.client.post(reverse('export_job_create'), {'kind': 'transactions', 'date_from': 'x'}).status_code, 400)
+
+    def test_pending_jobs_processed_by_command(self):
+        job = ExportJob.objects.create(kind='parameters', fingerprint='x')
+        call_command('process_export_jobs', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertTrue(job.file_path.startswith(self.export_dir.name))
+
+
+class EntryImportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        self.adet = QuantityType.objects.create(name='Adet')
+        self.kutu = QuantityType.objects.create(name='Kutu')
+        self.shelf = Shelf.objects.create(name='A1')
+        self.other_shelf = Shelf.objects.create(name='B2')
+        self.vida = Product.objects.create(name='Vida', quantity_type=self.adet, shelf=self.other_shelf)
+        EntryTransaction.objects.create(product=self.vida, quantity=5)
+
+    def upload(self, content, **data):
+        upload = SimpleUploadedFile('giris.csv', content.encode('utf-8'), content_type='text/csv')
+        return self.client.post(reverse('import_entries'), {'file': upload, **data})
+
+    def test_csv_import_creates_entries_and_products(self):
+        response = self.upload('Ürün Adı;Miktar;Raf Numarası;Miktar Türü\nVida;10;A1;\nPul;3;A1;Kutu\nPul;2;A1;Kutu\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary'], {'rows': 3, 'valid': 3, 'errors': 0, 'imported': 3, 'created_products': 1})
+
+        pul = Product.objects.get(name='Pul')
+        self.assertEqual((pul.quantity_type, pul.shelf), (self.kutu, self.shelf))
+        self.vida.refresh_from_db()
+        self.assertEqual(self.vida.shelf, self.shelf)
+        self.assertEqual(Product.objects.with_stock().get(pk=self.vida.pk).current_stock, 15)
+        self.assertEqual(Product.objects.with_stock().get(pk=pul.pk).current_stock, 5)
+        self.assertEqual(ledger.verify_balances(), [])
+        # Toplu oluşturulan ürün ve rafı değişen ürün arama indeksinde güncel
+        self.assertEqual(search.search('pul'), [pul.pk])
+        self.assertCountEqual(search.search('a1'), [self.vida.pk, pul.pk])
+
+    def test_invalid_rows_block_import_unless_partial(self):
+        content = 'Ürün,Miktar,Raf\nVida,abc,A1\nSomun,4,Z9\nPul,2,A1\n'
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 422)
+        report = response.json()
+        self.assertEqual(report['summary']['imported'], 0)
+        self.assertEqual([row['status'] for row in report['rows']], ['error', 'error', 'ok'])
+        self.assertFalse(Product.objects.filter(name='Pul').exists())
+
+        response = self.upload(content, partial='on')
+        self.assertEqual(response.json()['summary']['imported'], 1)
+        self.assertTrue(Product.objects.filter(name='Pul').exists())
+
+    def test_missing_columns_rejected(self):
+        response = self.upload('Ürün,Raf\nVida,A1\n')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cp1254_csv_is_decoded(self):
+        # Türkçe Excel CSV'yi varsayılan olarak Windows-1254 ile kaydeder
+        content = 'Ürün Adı;Miktar;Raf Numarası\nVida;2;A1\nÇivi;3;A1\n'.encode('cp1254')
+        response = self.client.post(reverse('import_entries'), {'file': SimpleUploadedFile('giris.csv', content)})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Product.objects.filter(name='Çivi').exists())
+
+    def test_corrupt_xlsx_rejected(self):
+        upload = SimpleUploadedFile('giris.xlsx', b'Urun;Miktar;Raf\n')
+        response = self.client.post(reverse('import_entries'), {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Excel', response.json()['error'])
+
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as file:
+            file.write(b'PK\x03\x04 bozuk')
+            file.flush()
+            with self.assertRaisesMessage(CommandError, 'Excel dosyası okunamadı'):
+                call_command('import_entries', file.name, stdout=StringIO())
+
+    def test_xlsx_import_command_uses_constant_queries(self):
+        rows = [('Ürün Adı', 'Miktar', 'Raf Numarası')] + [(f'Ürün {i}', i + 1, 'A1') for i in range(30)]
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as file:
+            exports.write_xlsx([('Sheet1', rows[0], rows[1:])], file)
+            file.flush()
+            with CaptureQueriesContext(connection) as queries:
+                call_command('import_entries', file.name, stdout=StringIO())
+        self.assertEqual(EntryTransaction.objects.count(), 31)
+        # Toplu sorgular (depo bakiyeleri dahil) + ürün başına tek bakiye güncellemesi
+        self.assertLess(len(queries), 30 + 17)
+
+
+class LowStockAlertTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        self.product = Product.objects.create(name='Vida', minimum_quantity=5)
+        EntryTransaction.objects.create(product=self.product, quantity=10)
+
+    def open_alerts(self):
+        return list(LowStockAlert.objects.filter(resolved_at__isnull=True).values_list('product__name', flat=True))
+
+    def test_alert_opens_and_resolves_on_crossing_minimum(self):
+        self.assertEqual(self.open_alerts(), [])
+        exit = ExitTransaction.objects.create(product=self.product, quantity=6)
+        alert = LowStockAlert.objects.get(product=self.product, resolved_at__isnull=True)
+        self.assertEqual((alert.on_hand, alert.minimum_quantity, alert.resolved_at), (4, 5, None))
+
+        # Minimumun altında kalan ikinci hareket yeni uyarı açmaz
+        ExitTransaction.objects.create(product=self.product, quantity=1)
+        self.assertEqual(self.open_alerts(), ['Vida'])
+
+        exit.delete()
+        alert.refresh_from_db()
+        self.assertIsNotNone(alert.resolved_at)
+        self.assertEqual(self.open_alerts(), [])
+
+    def test_minimum_change_and_import_are_evaluated(self):
+        self.product.minimum_quantity = 20
+        self.product.save()
+        self.assertEqual(self.open_alerts(), ['Vida'])
+
+        Shelf.objects.create(name='A1')
+        import_entries([{'product': 'Vida', 'quantity': 15, 'shelf': 'A1'}])
+        self.assertEqual(self.open_alerts(), [])
+
+    def test_movement_evaluates_only_touched_product(self):
+        for i in range(10):
+            Product.objects.create(name=f'Ürün {i}')
+        with CaptureQueriesContext(connection) as queries:
+            ExitTransaction.objects.create(product=self.product, quantity=6)
+        alert_queries = [q['sql'] for q in queries if 'depo_lowstockalert' in q['sql']]
+        self.assertEqual(len(alert_queries), 2)
+
+    def test_reconcile_and_api(self):
+        StockBalance.objects.filter(product=self.product).update(on_hand=0)
+        LowStockAlert.objects.all().delete()
+        out = StringIO()
+        call_command('reconcile_low_stock_alerts', stdout=out)
+        self.assertIn('1 uyarı açıldı', out.getvalue())
+        self.assertEqual(alerts.reconcile(), (0, 0))
+
+        results = self.client.get(reverse('low_stock_alerts_api')).json()['results']
+        self.assertEqual([(r['product_name'], r['current_stock'], r['minimum_quantity']) for r in results], [('Vida', 0, 5)])
+
+
+class SqliteBackendTests(TestCase):
+    def wrapper(self, **options):
+        from .sqlite_backend.base import DatabaseWrapper
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_dict = {**connection.settings_dict, 'NAME': os.path.join(directory, 'test.sqlite3'), 'OPTIONS': options}
+        wrapper = DatabaseWrapper(settings_dict, alias='tuning')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        wrapper = self.wrapper(pragmas={'cache_size': -1000, 'mmap_size': None})
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 20000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -1000)
+        self.assertEqual(self.pragma(wrapper, 'mmap_size'), 0)
+
+    def test_transactions_begin_immediate(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        with CaptureQueriesContext(wrapper) as queries:
+            wrapper._start_transaction_under_autocommit()
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+        wrapper.connection.rollback()
+
+    def test_transaction_mode_is_assignable(self):
+        # Django 5.1+ bağlanırken transaction_mode özniteliğine yazar
+        wrapper = self.wrapper(transaction_mode='deferred')
+        wrapper.ensure_connection()
+        self.assertEqual(wrapper.transaction_mode, 'DEFERRED')
+        wrapper.transaction_mode = None
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertEqual(wrapper.transaction_mode, 'DEFERRED')
+
+    def test_invalid_options_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(pragmas={'journal_mode': 'WAL; DROP TABLE x'}).ensure_connection()
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(transaction_mode='LAZY').ensure_connection()
+
+
+class QueryPlanAuditTests(TestCase):
+    def setUp(self):
+        shelf = Shelf.objects.create(name='A1')
+        department = Department.objects.create(name='Bakım')
+        for i in range(3):
+            product = Product.objects.create(name=f'Ürün {i}', minimum_quantity=5, shelf=shelf)
+            EntryTransaction.objects.create(product=product, quantity=10)
+            ExitTransaction.objects.create(product=product, quantity=2, department=department)
+
+    def test_hot_queries_use_indexes(self):
+        report = query_audit.audit()
+        self.assertEqual(set(report), set(query_audit.HOT_QUERIES))
+        self.assertEqual(query_audit.failures(report), {})
+
+    def test_full_scan_is_reported(self):
+        def unindexed(sample):
+            list(Product.objects.filter(minimum_quantity=5))
+
+        with mock.patch.dict(query_audit.HOT_QUERIES, {'unindexed': (unindexed, set())}, clear=True):
+            self.assertEqual(query_audit.failures(query_audit.audit()), {'unindexed': {'depo_product'}})
+            with self.assertRaises(CommandError):
+                call_command('audit_query_plans', stdout=StringIO())
+
+    def test_command_requires_sqlite(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                self.assertRaisesMessage(CommandError, 'sadece SQLite'):
+            call_command('audit_query_plans', stdout=StringIO())
+
+    def test_audit_rolls_back_writes(self):
+        product = Product.objects.get(name='Ürün 0')
+        StockBalance.objects.filter(product=product).update(on_hand=0)
+        query_audit.audit(['low_stock_alerts'])
+        self.assertFalse(LowStockAlert.objects.filter(resolved_at__isnull=True, product=product).exists())
+
+
+class QueryStatsMiddlewareTests(TestCase):
+    def setUp(self):
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+        self.client.force_login(User.objects.create_user('depocu', password='parola', is_staff=True))
+        product = Product.objects.create(name='Vida')
+        EntryTransaction.objects.create(product=product, quantity=10)
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'desc="{len(queries)} sorgu"', timing)
+        # Dashboard TemplateResponse döndüğü için çizim süresi ayrıca ölçülür
+        self.assertIn('render;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_stats_table_per_url_name(self):
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('shelf_data_api'))
+        stats = {row['url_name']: row for row in self.client.get(reverse('query_stats')).json()['results']}
+        self.assertEqual(stats['dashboard']['requests'], 2)
+        self.assertEqual(stats['shelf_data_api']['requests'], 1)
+        self.assertLessEqual(len(stats['dashboard']['slowest_queries']), instrumentation.SLOW_QUERY_COUNT)
+        self.assertTrue(all('sql' in query for query in stats['dashboard']['slowest_queries']))
+
+        self.client.post(reverse('query_stats'))
+        stats = {row['url_name'] for row in self.client.get(reverse('query_stats')).json()['results']}
+        self.assertEqual(stats, {'query_stats'})
+
+    def test_streaming_response_recorded_after_stream(self):
+        response = self.client.get(reverse('export_transactions_to_csv'))
+        self.assertNotIn('export_transactions_to_csv', {row['url_name'] for row in instrumentation.summary()})
+        b''.join(response.streaming_content)
+        stats = {row['url_name']: row for row in instrumentation.summary()}
+        self.assertGreater(stats['export_transactions_to_csv']['queries_max'], 0)
+
+    def test_async_streaming_response_recorded_after_stream(self):
+        async def content():
+            yield b'data: 1\n\n'
+
+        request = RequestFactory().get(reverse('stock_events'))
+        request.resolver_match = resolve(reverse('stock_events'))
+        response = instrumentation.QueryStatsMiddleware(lambda request: StreamingHttpResponse(content()))(request)
+        self.assertTrue(response.is_async)
+
+        async def consume():
+            return [chunk async for chunk in response]
+        self.assertEqual(async_to_sync(consume)(), [b'data: 1\n\n'])
+        self.assertIn('stock_events', {row['url_name'] for row in instrumentation.summary()})
+
+    def test_debug_endpoint_requires_staff(self):
+        self.client.force_login(User.objects.create_user('personel', password='parola'))
+        self.assertEqual(self.client.get(reverse('query_stats')).status_code, 302)
+
+
+@contextmanager
+def query_budget(budget, using=DEFAULT_DB_ALIAS):
+    """Blok içinde çalışan sorgu sayısı budget'ı aşarsa AssertionError verir"""
+    with CaptureQueriesContext(connections[using]) as queries:
+        yield queries
+    if len(queries) > budget:
+        statements = '\n'.join(f"{number}. {query['sql']}" for number, query in enumerate(queries.captured_queries, 1))
+        raise AssertionError(f"{len(queries)} sorgu çalıştı, bütçe {budget}:\n{statements}")
+
+
+class ViewQueryBudgetTests(TestCase):
+    """Görünümlerin sorgu bütçeleri; veri büyüdükçe sorgu sayısı artmamalıdır"""
+
+    # Oturum ve kullanıcı sorguları dahil
+    BUDGETS = {
+        'dashboard': 11,
+        'product_detail': 4,
+        'shelf_visualization': 2,
+        'shelf_data_api': 2,
+        'product_list_api': 3,
+        'get_product_stock': 1,
+        'stock_report': 9,
+        'stock_as_of_api': 7,
+        'low_stock_alerts_api': 3,
+        'consumption_report': 6,
+        'consumption_api': 5,
+        'parameters': 4,
+        'export_transactions_to_csv': 4,
+        'export_products_to_excel': 1,
+        'export_transactions_to_excel': 4,
+        'export_parameters_to_excel': 3,
+        'warehouse_stock_report': 4,
+        'warehouse_stock_api': 4,
+    }
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        self.adet = QuantityType.objects.create(name='Adet')
+        self.department = Department.objects.create(name='Bakım')
+
+    def create_products(self, count, start=0):
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f'Ürün {i}', shelf=Shelf.objects.create(name=f'R{i}'), quantity_type=self.adet, minimum_quantity=5,
+            )
+            EntryTransaction.objects.create(product=product, quantity=10)
+            ExitTransaction.objects.create(product=product, quantity=7, department=self.department)
+
+    def url(self, name):
+        if name == 'product_detail':
+            return reverse(name, args=[Product.objects.order_by('pk').first().pk])
+        if name == 'get_product_stock':
+            return reverse(name) + f'?product_id={Product.objects.order_by("pk").first().pk}'
+        return reverse(name)
+
+    def assert_budgets(self):
+        for name, budget in self.BUDGETS.items():
+            url = self.url(name)
+            cache.clear()
+            with self.subTest(view=name), query_budget(budget):
+                response = self.client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, 200)
+
+    def test_views_within_budget(self):
+        self.create_products(3)
+        self.assert_budgets()
+        self.create_products(20, start=3)
+        self.assert_budgets()
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesMessage(AssertionError, '2 sorgu çalıştı, bütçe 1'):
+            with query_budget(1):
+                list(Product.objects.all())
+                list(Shelf.objects.all())
+
+
+class SyntheticDataTests(TestCase):
+    def test_generate_dataset(self):
+        counts = synthetic.generate_dataset(products=30, movements=600, days=90, seed=1)
+        self.assertEqual(counts['entries'] + counts['exits'], 600)
+        self.assertEqual(Product.objects.count(), 30)
+        self.assertEqual(Shelf.objects.count(), 3)
+        self.assertEqual(ledger.verify_balances(), [])
+        self.assertFalse(StockBalance.objects.filter(on_hand__lt=0).exists())
+        # Tarihler auto_now_add ile ezilmemeli
+        oldest = EntryTransaction.objects.order_by('entry_date').first().entry_date
+        self.assertLess(oldest, timezone.now() - timedelta(days=7))
+        # Çarpık dağılım: en çok hareket gören ürün ortalamanın çok üstündedir
+        busiest = StockBalance.objects.order_by('-total_in').first()
+        self.assertGreater(EntryTransaction.objects.filter(product_id=busiest.product_id).count(), counts['entries'] / 30 * 3)
+
+    def test_explicit_dates_do_not_leak_to_other_callers(self):
+        product = Product.objects.create(name='Vida')
+        past = timezone.now() - timedelta(days=30)
+        with explicit_movement_dates():
+            kept = EntryTransaction.objects.create(product=product, quantity=1, entry_date=past)
+        # Blok dışında verilen tarih yine ezilir; alanın kendisi değişmez
+        stamped = EntryTransaction.objects.create(product=product, quantity=1, entry_date=past)
+        self.assertEqual(kept.entry_date, past)
+        self.assertGreater(stamped.entry_date, past)
+        self.assertTrue(EntryTransaction._meta.get_field('entry_date').auto_now_add)
+
+    def test_command_refuses_non_empty_database(self):
+        Product.objects.create(name='Vida')
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_data', '--products', '5', '--movements', '10', stdout=StringIO())
+
+    def test_compare_results(self):
+        previous = {'views': {'scales': [{'views': {'dashboard': {'p50_ms': 100.0, 'queries': 11, 'status': 200}}}]}}
+        current = {'views': {'scales': [{'views': {'dashboard': {'p50_ms': 80.0, 'queries': 11, 'status': 200}}}]}}
+        self.assertEqual(bench.compare(previous, current), [('views.scales[0].views.dashboard.p50_ms', 100.0, 80.0)])
+
+
+class ProductPickerTests(TestCase):
+    def setUp(self):
+        adet = QuantityType.objects.create(name='Adet')
+        for name, stock in (('Vida', 10), ('Somun', 4), ('Civata', 0), ('Kablo Vida', 3)):
+            product = Product.objects.create(name=name, quantity_type=adet)
+            if stock:
+                EntryTransaction.objects.create(product=product, quantity=stock)
+
+    def test_small_catalogue_lists_all_products_in_one_query(self):
+        with self.assertNumQueries(1):
+            html = str(ExitTransactionForm()['product'])
+        self.assertIn('Vida (Kalan: 10 Adet)', html)
+        self.assertIn('Civata (Kalan: 0 Adet)', html)
+        self.assertNotIn('data-search-url', html)
+
+    @override_settings(DEPO_PRODUCT_PICKER_LIMIT=2)
+    def test_large_catalogue_renders_only_selected_product(self):
+        with self.assertNumQueries(1):
+            html = str(ExitTransactionForm()['product'])
+        self.assertIn(f'data-search-url="{reverse("product_search_api")}"', html)
+        self.assertNotIn('Vida', html)
+
+        somun = Product.objects.get(name='Somun')
+        form = ExitTransactionForm({'product': somun.pk, 'quantity': 10})
+        self.assertFalse(form.is_valid())
+        self.assertIn('Mevcut stok: 4', str(form.errors['quantity']))
+        html = str(form['product'])
+        self.assertIn('Somun (Kalan: 4 Adet)', html)
+        self.assertNotIn('Vida', html)
+
+        self.assertIn('data-search-url', str(EntryTransactionForm()['product_select']))
+
+    def test_search_api(self):
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        url = reverse('product_search_api')
+        results = self.client.get(url, {'q': 'vida'}).json()['results']
+        # Adı aranan metinle başlayan ürün önce gelir
+        self.assertEqual([r['name'] for r in results], ['Vida', 'Kablo Vida'])
+        self.assertEqual(results[0]['label'], 'Vida (Kalan: 10 Adet)')
+        self.assertEqual(results[0]['current_stock'], 10)
+        self.assertEqual(self.client.get(url, {'q': ''}).json()['results'], [])
+        self.assertEqual(self.client.get(url, {'q': 'vida', 'limit': 'x'}).status_code, 400)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.adet = QuantityType.objects.create(name='Adet')
+        self.shelf = Shelf.objects.create(name='Işık Rafı')
+        self.sise = Product.objects.create(name='Şişe Kapağı', quantity_type=self.adet)
+        self.eldiven = Product.objects.create(name='İş Eldiveni', quantity_type=self.adet, shelf=self.shelf)
+        self.vida = Product.objects.create(name='Vida M6', quantity_type=self.adet)
+        self.kablo = Product.objects.create(name='Kablo Vida Seti', quantity_type=self.adet)
+
+    def test_normalize(self):
+        self.assertEqual(search.normalize('ŞİŞE Kapağı'), 'sise kapagi')
+        self.assertEqual(search.normalize('IŞIK-rafı'), 'isik rafi')
+
+    def test_turkish_case_and_accent_folding(self):
+        for query in ('şişe', 'ŞİŞE', 'sise', 'KAPAĞI', 'kapagi'):
+            self.assertEqual(search.search(query), [self.sise.pk], query)
+        self.assertEqual(search.search('iş eldiven'), [self.eldiven.pk])
+        self.assertEqual(search.search('ISIK'), [self.eldiven.pk])
+
+    def test_prefix_matches_rank_first(self):
+        self.assertEqual(search.search('vida'), [self.vida.pk, self.kablo.pk])
+        self.assertEqual(search.search('vi'), [self.vida.pk, self.kablo.pk])
+
+    def test_many_matches_use_prefix_then_rest(self):
+        with mock.patch.object(search, 'RANK_LIMIT', 1):
+            self.assertEqual(search.search('vida'), [self.vida.pk, self.kablo.pk])
+            self.assertEqual(search.search('vida', limit=1), [self.vida.pk])
+            # Adı ilk kelimeyle başlayan ürün yoksa diğer eşleşmeler döner
+            self.assertCountEqual(search.search('adet'), [self.sise.pk, self.eldiven.pk, self.vida.pk, self.kablo.pk])
+
+    def test_typo_tolerance(self):
+        self.assertEqual(search.search('eldivne'), [self.eldiven.pk])
+        self.assertEqual(search.search('kapğı'), [self.sise.pk])
+        self.assertEqual(search.search('zzzz'), [])
+
+    def test_index_follows_changes(self):
+        self.sise.name = 'Cam Şişe'
+        self.sise.save()
+        self.assertEqual(search.search('cam'), [self.sise.pk])
+        self.assertEqual(search.search('kapak'), [])
+
+        self.shelf.name = 'Koridor 3'
+        self.shelf.save()
+        self.assertEqual(search.search('koridor'), [self.eldiven.pk])
+        self.shelf.delete()
+        self.assertEqual(search.search('koridor'), [])
+        self.assertEqual(search.search('eldiven'), [self.eldiven.pk])
+
+        self.vida.delete()
+        self.assertEqual(search.search('vida'), [self.kablo.pk])
+
+    def test_rebuild_index(self):
+        Product.objects.filter(pk=self.vida.pk).update(name='Somun')
+        self.assertEqual(search.search('somun'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search('somun'), [self.vida.pk])
+
+    def test_product_list_and_admin_use_index(self):
+        self.client.force_login(User.objects.create_superuser('yonetici', password='parola'))
+        results = self.client.get(reverse('product_list_api'), {'q': 'SISE'}).json()['results']
+        self.assertEqual([r['name'] for r in results], ['Şişe Kapağı'])
+        response = self.client.get(reverse('admin:depo_product_changelist'), {'q': 'eldivne'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.eldiven])
+
+
+class ConsumptionAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        self.bakim = Department.objects.create(name='Bakım')
+        self.uretim = Department.objects.create(name='Üretim')
+        self.vida = Product.objects.create(name='Vida')
+        self.pul = Product.objects.create(name='Pul')
+        EntryTransaction.objects.create(product=self.vida, quantity=100)
+        EntryTransaction.objects.create(product=self.pul, quantity=5)
+        now = timezone.now()
+        with explicit_movement_dates():
+            # Vida: 10 gün önce 20, dün 10 adet; pul hiç çıkmadı
+            ExitTransaction.objects.create(product=self.vida, quantity=20, department=self.bakim, exit_date=now - timedelta(days=10))
+            ExitTransaction.objects.create(product=self.vida, quantity=10, department=self.uretim, exit_date=now - timedelta(days=1))
+            # Pencere dışında
+            ExitTransaction.objects.create(product=self.vida, quantity=50, department=self.bakim, exit_date=now - timedelta(days=200))
+
+    @override_settings(DEPO_CONSUMPTION_WINDOW_DAYS=30, DEPO_REORDER_LEAD_DAYS=10, DEPO_REORDER_COVER_DAYS=20)
+    def test_rates_and_reorder_suggestion(self):
+        report = analytics.product_report()
+        vida = report.loc[self.vida.pk]
+        self.assertEqual(vida['on_hand'], 20)
+        self.assertEqual(vida['consumed'], 30)
+        self.assertAlmostEqual(vida['daily_rate'], 1.0)
+        # Günlük tüketim: 28 gün 0, bir gün 20, bir gün 10
+        std = ((400 + 100) / 30 - 1) ** 0.5
+        self.assertAlmostEqual(vida['daily_std'], std)
+        self.assertAlmostEqual(vida['days_of_cover'], 20.0)
+        reorder_point = math.ceil(10 + analytics.SERVICE_FACTOR * std * 10 ** 0.5)
+        self.assertEqual(vida['reorder_point'], reorder_point)
+        self.assertEqual(vida['reorder_quantity'], reorder_point + 20 - 20)
+
+        pul = report.loc[self.pul.pk]
+        self.assertEqual((pul['consumed'], pul['reorder_point'], pul['reorder_quantity']), (0, 0, 0))
+        self.assertTrue(math.isnan(pul['days_of_cover']))
+
+        departments = analytics.department_report()
+        self.assertEqual(departments.index.tolist(), [self.bakim.pk, self.uretim.pk])
+        self.assertEqual(departments['consumed'].tolist(), [20, 10])
+        self.assertEqual(analytics.product_departments([self.vida.pk]), {self.vida.pk: {self.bakim.pk: 20, self.uretim.pk: 10}})
+
+    def test_process_local_cache_keeps_totals_briefly(self):
+        # Başka süreçte değiştirilen çıkış buradaki CONSUMPTION sayacını artırmaz; toplamlar kısa yaşar
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            analytics.consumption_state()
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], settings.DEPO_LOCAL_CACHE_SECONDS)
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.assertEqual(versions.cache_timeout(analytics.TIMEOUT), analytics.TIMEOUT)
+
+    def test_refreshes_incrementally(self):
+        self.assertEqual(analytics.product_report().loc[self.vida.pk, 'consumed'], 30)
+        with CaptureQueriesContext(connection) as queries:
+            analytics.consumption_state()
+        self.assertIn('"depo_exittransaction"."id" >', queries[0]['sql'])
+
+        exit = ExitTransaction.objects.create(product=self.vida, quantity=5)
+        self.assertEqual(analytics.product_report().loc[self.vida.pk, 'consumed'], 35)
+        self.assertEqual(analytics.department_report().loc[analytics.NO_DEPARTMENT, 'consumed'], 5)
+
+        # Değişen ve silinen çıkışlar toplamları baştan hesaplatır
+        with self.captureOnCommitCallbacks(execute=True):
+            exit.quantity = 8
+            exit.save()
+        self.assertEqual(analytics.product_report().loc[self.vida.pk, 'consumed'], 38)
+        with self.captureOnCommitCallbacks(execute=True):
+            exit.delete()
+        self.assertEqual(analytics.product_report().loc[self.vida.pk, 'consumed'], 30)
+
+    def test_old_days_leave_the_window(self):
+        analytics.consumption_state()
+        later = analytics.window_start() + timedelta(days=85)
+        with mock.patch.object(analytics, 'window_start', return_value=later):
+            state = analytics.consumption_state()
+        self.assertEqual(state['rates'].loc[self.vida.pk, 'consumed'], 10)
+
+    def test_report_and_api(self):
+        response = self.client.get(reverse('consumption_report'))
+        self.assertContains(response, 'Vida')
+        self.assertNotContains(response, 'Pul')
+
+        data = self.client.get(reverse('consumption_api')).json()
+        self.assertEqual([row['product_id'] for row in data['results']], [self.vida.pk])
+        self.assertEqual([row['name'] for row in data['departments']], ['Bakım', 'Üretim'])
+
+        data = self.client.get(reverse('consumption_api'), {'product_id': f'{self.pul.pk},{self.vida.pk}'}).json()
+        results = {row['product_id']: row for row in data['results']}
+        self.assertIsNone(results[self.pul.pk]['days_of_cover'])
+        self.assertEqual(results[self.vida.pk]['departments'], {str(self.bakim.pk): 20, str(self.uretim.pk): 10})
+        self.assertEqual(self.client.get(reverse('consumption_api'), {'product_id': 'x'}).status_code, 400)
+
+
+class LiveStockUpdateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('depocu', password='parola')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+        self.product = Product.objects.create(name='Vida', minimum_quantity=5)
+        self.addCleanup(setattr, live, 'broker', live.broker)
+        live.broker = live.EventBroker(size=3)
+
+    def test_committed_movement_publishes_changed_rows(self):
+        start = live.broker.last_id
+        with mock.patch.object(live.broker, 'has_subscribers', return_value=True), \
+                self.captureOnCommitCallbacks(execute=True):
+            EntryTransaction.objects.create(product=self.product, quantity=3)
+        events, reload = live.broker.since(start)
+        self.assertFalse(reload)
+        [(_, data)] = events
+        self.assertEqual(data['products'][0]['current_stock'], 3)
+        self.assertTrue(data['products'][0]['is_below_minimum'])
+        self.assertIn(f'data-product-id="{self.product.pk}"', data['html'])
+
+    def test_idle_broker_skips_rendering(self):
+        # Bekleyen istemci yoksa satırlar okunmaz; sonradan gelen istemci tabloyu yeniden yükler
+        start = live.broker.last_id
+        self.assertFalse(live.broker.has_subscribers())
+        with mock.patch.object(live, 'stock_event') as stock_event, self.captureOnCommitCallbacks(execute=True):
+            EntryTransaction.objects.create(product=self.product, quantity=3)
+        stock_event.assert_not_called()
+        self.assertEqual(live.broker.since(start), ([(start + 1, {'reload': True})], False))
+
+        async_to_sync(live.broker.wait)(live.broker.last_id, 0.01)
+        self.assertTrue(live.broker.has_subscribers())
+        with mock.patch.object(live, 'IDLE_SECONDS', 0):
+            self.assertFalse(live.broker.has_subscribers())
+
+    @override_settings(DEPO_LIVE_UPDATES=False)
+    def test_disabled_live_updates_publish_nothing(self):
+        with mock.patch.object(live, 'publish_stock') as publish_stock, self.captureOnCommitCallbacks(execute=True):
+            EntryTransaction.objects.create(product=self.product, quantity=3)
+        publish_stock.assert_not_called()
+
+    def test_publish_waits_for_write_lock_release(self):
+        # on_commit geri çağrıları record_exit'in yazma kilidi içinde çalışır; yayın kilit bırakılınca yapılır
+        published = []
+        with ledger._serialized_writes():
+            ledger.after_serialized_writes(lambda: published.append(1))
+            with ledger._serialized_writes():
+                ledger.after_serialized_writes(lambda: published.append(2))
+            self.assertEqual(published, [])
+        self.assertEqual(published, [1, 2])
+        ledger.after_serialized_writes(lambda: published.append(3))
+        self.assertEqual(published, [1, 2, 3])
+
+    def test_missed_events_and_gaps(self):
+        start = live.broker.last_id
+        for value in range(2):
+            live.broker.publish({'value': value})
+        self.assertEqual([data for _, data in live.broker.since(start)[0]], [{'value': 0}, {'value': 1}])
+        self.assertEqual(live.broker.since(live.broker.last_id), ([], False))
+        # Kuyruktan düşmüş olaylar ve başka sürece ait numara
+        for value in range(2, 5):
+            live.broker.publish({'value': value})
+        self.assertEqual(live.broker.since(start), ([], True))
+        self.assertEqual(live.broker.since(live.broker.last_id + 10), ([], True))
+        self.assertEqual(live.stock_event(range(live.MAX_EVENT_PRODUCTS + 1)), {'reload': True})
+
+    async def test_sse_stream(self):
+        start = live.broker.last_id
+        live.broker.publish({'products': [], 'html': ''})
+        response = await self.async_client.get(reverse('stock_events'), {'last_id': start})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+        self.assertEqual(await anext(chunks), f'id: {start + 1}\nevent: stock\ndata: {{"products": [], "html": ""}}\n\n'.encode())
+
+        # Yeni olay beklenirken başka bir iş parçacığından yayınlanır
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0.05)
+        self.assertFalse(pending.done())
+        threading.Thread(target=live.broker.publish, args=({'reload': True},)).start()
+        self.assertTrue((await asyncio.wait_for(pending, 5)).startswith(f'id: {start + 2}\nevent: reload'.encode()))
+        await chunks.aclose()
+
+    async def test_long_poll(self):
+        response = await self.async_client.get(reverse('stock_events_poll'))
+        last_id = response.json()['last_id']
+        live.broker.publish({'value': 1})
+        data = (await self.async_client.get(reverse('stock_events_poll'), {'last_id': last_id})).json()
+        self.assertEqual(data, {'last_id': last_id + 1, 'events': [{'value': 1}], 'reload': False})
+
+        with mock.patch.object(live, 'LONG_POLL_SECONDS', 0.01):
+            data = (await self.async_client.get(reverse('stock_events_poll'), {'last_id': last_id + 1})).json()
+        self.assertEqual(data, {'last_id': last_id + 1, 'events': [], 'reload': False})
+
+    def test_sse_requires_asgi_and_login(self):
+        # WSGI altında akış ve uzun sorgulama yerine 204; bekleyen istekler worker tutmaz
+        self.assertEqual(self.client.get(reverse('stock_events')).status_code, 204)
+        self.assertEqual(self.client.get(reverse('stock_events_poll'), {'last_id': 1}).status_code, 204)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('stock_events_poll')).status_code, 403)
+
+    @override_settings(DEPO_LIVE_UPDATES=False)
+    async def test_disabled_for_multiple_processes(self):
+        # Başka sürecin kuyruğuna düşen sorgu hemen "yeniden yükle" dönerdi
+        self.assertEqual((await self.async_client.get(reverse('stock_events_poll'), {'last_id': 1})).status_code, 204)
+        self.assertEqual((await self.async_client.get(reverse('stock_events'))).status_code, 204)
+
+    def test_dashboard_starts_from_current_event(self):
+        live.broker.publish({'value': 1})
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, f'data-last-id="{live.broker.last_id}"')
+
+
+class ConcurrentStockExitTests(TransactionTestCase):
+    def setUp(self):
+        # Tabloları boşaltan flush migration'ın oluşturduğu depoyu da siler; süreç içi kopya eskimiş olur
+        reference.clear()
+
+    def test_parallel_exits_never_oversell(self):
+        product = Product.objects.create(name='Vida')
+        EntryTransaction.objects.create(product=product, quantity=50)
+        accepted, rejected = [], []
+
+        def worker(index):
+            for _ in range(10):
+                try:
+                    ledger.record_exit(Product.objects.get(pk=product.pk), 1)
+                    accepted.append(index)
+                except ledger.InsufficientStock:
+                    rejected.append(index)
+
+        bench.run_threads(10, worker)
+        self.assertEqual((len(accepted), len(rejected)), (50, 50))
+        self.assertEqual(StockBalance.objects.get(product=product).on_hand, 0)
+        self.assertEqual(ledger.verify_balances(), [])
+
+    def test_parallel_exits_from_separate_processes_never_oversell(self):
+        # Süreç içi kilit (ledger._serialized_writes) süreçler arasında geçerli değildir; sıralamayı
+        # sadece lock_balance'ın veritabanı yazma kilidi sağlar. Süreçler ortak bir dosya
+        # veritabanını kullanır (test veritabanı bellekte olduğu için başka süreçten görünmez)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, 'exit_test_settings.py'), 'w') as module:
+            module.write(
+                'from Depostok_Project.settings import *\n'
+                f'DATABASES["default"]["NAME"] = {os.path.join(directory.name, "db.sqlite3")!r}\n'
+            )
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'exit_test_settings',
+            'PYTHONPATH': os.pathsep.join([directory.name, str(settings.BASE_DIR)]),
+        }
+
+        def run(*args, **kwargs):
+            return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, cwd=settings.BASE_DIR, **kwargs)
+
+        run('manage.py', 'migrate', check=True)
+        setup = (
+            "from depo.models import Product, EntryTransaction; "
+            "EntryTransaction.objects.create(product=Product.objects.create(name='Vida'), quantity=20)"
+        )
+        run('manage.py', 'shell', '-c', setup, check=True)
+
+        worker = (
+            "import django; django.setup(); "
+            "from depo import ledger; from depo.models import Product\n"
+            "product = Product.objects.get(name='Vida'); accepted = 0\n"
+            "for _ in range(10):\n"
+            "    try:\n"
+            "        ledger.record_exit(product, 1); accepted += 1\n"
+            "    except ledger.InsufficientStock:\n"
+            "        pass\n"
+            "print(accepted)"
+        )
+        processes = [
+            subprocess.Popen([sys.executable, '-c', worker], stdout=subprocess.PIPE, text=True, env=env, cwd=settings.BASE_DIR)
+            for _ in range(4)
+        ]
+        accepted = sum(int(process.communicate(timeout=120)[0]) for process in processes)
+        self.assertEqual([process.returncode for process in processes], [0] * 4)
+        self.assertEqual(accepted, 20)
+
+        check = (
+            "from depo import ledger; from depo.models import StockBalance; "
+            "print(StockBalance.objects.get().on_hand, len(ledger.verify_balances()))"
+        )
+        self.assertEqual(run('manage.py', 'shell', '-c', check, check=True).stdout.split(), ['0', '0'])
+
+    def test_exit_view_rejects_quantity_above_locked_balance(self):
+        user = User.objects.create_user('depocu', password='parola')
+        self.client.force_login(user)
+        product = Product.objects.create(name='Somun')
+        EntryTransaction.objects.create(product=product, quantity=3)
+        # Form doğrulamasından sonra başka bir kullanıcının çıkışı stoğu tüketmiş gibi
+        with mock.patch.object(ExitTransactionForm, 'clean_quantity', lambda form: form.cleaned_data['quantity']):
+            ExitTransaction.objects.create(product=product, quantity=3)
+            response = self.client.post(reverse('product_exit'), {'product': product.pk, 'quantity': 2})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(StockBalance.objects.get(product=product).on_hand, 0)
+
+
+class ShelfVisualizationTests(TestCase):
+    def setUp(self):
+        self.adet = QuantityType.objects.create(name='Adet')
+        cache.clear()
+
+    def create_shelves(self, count, start=0):
+        for i in range(start, start + count):
+            shelf = Shelf.objects.create(name=f'R{i:02d}')
+            for j in range(3):
+                product = Product.objects.create(name=f'Ürün {i}-{j}', shelf=shelf, quantity_type=self.adet)
+                EntryTransaction.objects.create(product=product, quantity=j)
+
+    def test_shelf_data_groups_in_stock_products(self):
+        self.create_shelves(2)
+        Shelf.objects.create(name='Boş')
+        data = self.client.get(reverse('shelf_data_api')).json()['shelves']
+        self.assertEqual([shelf['name'] for shelf in data], ['Boş', 'R00', 'R01'])
+        self.assertEqual(data[0]['products'], [])
+        self.assertEqual(
+            [(p['name'], p['quantity'], p['quantity_type']) for p in data[1]['products']],
+            [('Ürün 0-1', 1, 'Adet'), ('Ürün 0-2', 2, 'Adet')],
+        )
+
+    def test_query_count_independent_of_shelves(self):
+        self.create_shelves(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('shelf_visualization'))
+        self.create_shelves(10, start=2)
+        with self.assertNumQueries(len(small)):
+            response = self.client.get(reverse('shelf_visualization'))
+        shelves = response.context['shelf_data']['shelves']
+        self.assertEqual(len(shelves), 12)
+        self.assertEqual(shelves[-1]['products'][-1]['name'], 'Ürün 11-2')
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(fragments.reset)
+        self.client.force_login(User.objects.create_user('depocu', password='parola', is_staff=True))
+        self.adet = QuantityType.objects.create(name='Adet')
+        self.shelf_a = Shelf.objects.create(name='A1')
+        self.shelf_b = Shelf.objects.create(name='B1')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vida = Product.objects.create(name='Vida', quantity_type=self.adet, shelf=self.shelf_a)
+            self.pul = Product.objects.create(name='Pul', quantity_type=self.adet, shelf=self.shelf_a)
+            EntryTransaction.objects.create(product=self.vida, quantity=10)
+            EntryTransaction.objects.create(product=self.pul, quantity=4)
+        cache.clear()
+        fragments.reset()
+
+    def rows(self):
+        return self.client.get(reverse('product_list_api')).json()['html']
+
+    def shelves(self):
+        data = self.client.get(reverse('shelf_data_api')).json()['shelves']
+        return {shelf['name']: [(p['name'], p['quantity']) for p in shelf['products']] for shelf in data}
+
+    def test_rows_reused_until_product_changes(self):
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(fragments.stats()['product_row'], {'hits': 0, 'misses': 2, 'hit_ratio': 0.0})
+        self.rows()
+        self.assertEqual(fragments.stats()['product_row']['hits'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExitTransaction.objects.create(product=self.vida, quantity=3)
+        html = self.rows()
+        # Sadece değişen satır yeniden çizilir (dinleyen olmadığı için canlı güncelleme olayı satır çizmez)
+        self.assertEqual(fragments.stats()['product_row'], {'hits': 3, 'misses': 3, 'hit_ratio': 0.5})
+        self.assertIn('>7<', html.replace(' ', '').replace('\n', ''))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pul.name = 'Rondela'
+            self.pul.save()
+        self.assertIn('Rondela', self.rows())
+
+    def test_parameter_rename_invalidates_rows(self):
+        self.rows()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shelf_a.name = 'A2'
+            self.shelf_a.save()
+        self.assertIn('A2', self.rows())
+        self.assertEqual(fragments.stats()['product_row']['misses'], 4)
+
+    def test_shelf_blocks_follow_movements_and_moves(self):
+        self.assertEqual(self.shelves(), {'A1': [('Pul', 4), ('Vida', 10)], 'B1': []})
+        # Sürümler değişmedikçe sadece raf listesi okunur
+        with self.assertNumQueries(1):
+            self.assertEqual(self.shelves()['A1'], [('Pul', 4), ('Vida', 10)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExitTransaction.objects.create(product=self.vida, quantity=3)
+        self.assertEqual(self.shelves()['A1'], [('Pul', 4), ('Vida', 7)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pul.shelf = self.shelf_b
+            self.pul.save()
+        self.assertEqual(self.shelves(), {'A1': [('Vida', 7)], 'B1': [('Pul', 4)]})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vida.delete()
+        self.assertEqual(self.shelves()['A1'], [])
+
+    def test_process_local_cache_keeps_fragments_briefly(self):
+        # Başka bir süreçteki sayaç artışı burada görünmez; parçalar süreç içi önbellekte kısa yaşar
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            self.shelves()
+        self.assertEqual(set_many.call_args.args[1], settings.DEPO_LOCAL_CACHE_SECONDS)
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.assertEqual(versions.cache_timeout(fragments.TIMEOUT), fragments.TIMEOUT)
+
+    def test_hit_ratio_in_query_stats(self):
+        self.shelves()
+        self.shelves()
+        stats = self.client.get(reverse('query_stats')).json()['fragment_cache']
+        self.assertEqual(stats['shelf'], {'hits': 2, 'misses': 2, 'hit_ratio': 0.5})
+        self.client.post(reverse('query_stats'))
+        self.assertEqual(fragments.stats(), {})
+
+
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        self.adet = QuantityType.objects.create(name='Adet')
+        self.shelf = Shelf.objects.create(name='A1')
+        self.department = Department.objects.create(name='Bakım')
+        self.product = Product.objects.create(name='Vida', quantity_type=self.adet, shelf=self.shelf)
+        EntryTransaction.objects.create(product=self.product, quantity=10)
+        reference.clear()
+        self.addCleanup(reference.clear)
+
+    def test_process_local_tables_expire_and_forms_accept_new_rows(self):
+        # Başka süreçteki değişiklik buradaki sayacı artırmaz; tablo kısa süre sonra yeniden okunur
+        with mock.patch.object(reference, 'time') as clock:
+            clock.monotonic.return_value = 1000.0
+            reference.objects(Shelf)
+            Shelf.objects.filter(pk=self.shelf.pk).update(name='A2')
+            self.assertEqual(reference.get(Shelf, self.shelf.pk).name, 'A1')
+            clock.monotonic.return_value += settings.DEPO_LOCAL_CACHE_SECONDS + 1
+            self.assertEqual(reference.get(Shelf, self.shelf.pk).name, 'A2')
+
+        # Tabloya henüz girmemiş yeni kayıt formda veritabanından doğrulanır
+        [shelf] = Shelf.objects.bulk_create([Shelf(name='C1')])
+        field = reference.ReferenceChoiceField(queryset=Shelf.objects.all())
+        self.assertEqual(field.clean(str(shelf.pk)), shelf)
+        with self.assertRaises(ValidationError):
+            field.clean(str(shelf.pk + 1))
+
+    def test_out_of_range_and_filtered_choices(self):
+        field = reference.ReferenceChoiceField(queryset=Shelf.objects.all())
+        with self.assertRaises(ValidationError):
+            field.clean(str(10 ** 30))
+
+        # Süzülmüş queryset önbellekteki tabloyu değil filtreyi kullanır
+        other = Shelf.objects.create(name='B1')
+        field = reference.ReferenceChoiceField(queryset=Shelf.objects.exclude(pk=self.shelf.pk), empty_label=None)
+        self.assertEqual([label for _, label in field.choices], ['B1'])
+        self.assertEqual(field.clean(str(other.pk)), other)
+        with self.assertRaises(ValidationError):
+            field.clean(str(self.shelf.pk))
+
+    def test_tables_read_once_until_version_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(reference.objects(Shelf), [self.shelf])
+        with self.assertNumQueries(0):
+            self.assertEqual(reference.get(Shelf, self.shelf.pk).name, 'A1')
+            self.assertIsNone(reference.get(Shelf, self.shelf.pk + 1))
+
+        # Sinyal göndermeyen değişiklik görülmez; başka bir süreç sayacı artırınca tablo yeniden okunur
+        Shelf.objects.filter(pk=self.shelf.pk).update(name='A2')
+        self.assertEqual(reference.get(Shelf, self.shelf.pk).name, 'A1')
+        bump_version(REFERENCE)
+        self.assertEqual(reference.get(Shelf, self.shelf.pk).name, 'A2')
+
+        Shelf.objects.create(name='B1')
+        self.assertEqual([shelf.name for shelf in reference.objects(Shelf)], ['A2', 'B1'])
+
+    def test_forms_resolve_choices_from_memory(self):
+        reference.objects(Shelf)
+        reference.objects(Department)
+        form = EntryTransactionForm({'product_name': 'Somun', 'quantity': 5, 'shelf': self.shelf.pk})
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['shelf'], self.shelf)
+        self.assertFalse(EntryTransactionForm({'product_name': 'Somun', 'quantity': 5, 'shelf': 999}).is_valid())
+
+        form = ExitTransactionForm()
+        with self.assertNumQueries(0):
+            html = str(form['department'])
+        self.assertIn('Bakım', html)
+        form = ExitTransactionForm({'product': self.product.pk, 'quantity': 3, 'department': self.department.pk})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['department'], self.department)
+
+    def test_movement_str_uses_cached_quantity_type(self):
+        reference.objects(QuantityType)
+        movement = EntryTransaction.objects.get(product=self.product)
+        # Sadece ürün okunur, miktar türü önbellekten gelir
+        with self.assertNumQueries(1):
+            self.assertIn('Vida - 10 Adet', str(movement))
+
+
+class WarehouseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reference.clear()
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+        self.central = Warehouse.objects.get(code='merkez')
+        self.izmir = Warehouse.objects.create(name='İzmir Depo', code='izmir')
+        self.central_shelf = Shelf.objects.create(name='A1')
+        self.izmir_shelf = Shelf.objects.create(name='B1', warehouse=self.izmir)
+        self.product = Product.objects.create(name='Vida')
+
+    def stock(self, warehouse):
+        return WarehouseStock.objects.filter(product=self.product, warehouse=warehouse).values_list('on_hand', flat=True).first()
+
+    def test_balances_follow_shelf_and_exit_warehouse(self):
+        self.assertEqual(Shelf.objects.create(name='C1').warehouse, self.central)
+        for shelf, quantity in ((self.central_shelf, 10), (self.izmir_shelf, 4)):
+            self.client.post(reverse('product_entry'), {'product_select': self.product.pk, 'quantity': quantity, 'shelf': shelf.pk})
+        self.assertEqual((self.stock(self.central), self.stock(self.izmir)), (10, 4))
+
+        # Toplam stok yetse de İzmir'deki stoktan fazlası çıkamaz
+        self.client.post(reverse('product_exit'), {'product': self.product.pk, 'quantity': 6, 'warehouse': self.izmir.pk})
+        self.assertEqual(self.stock(self.izmir), 4)
+        self.client.post(reverse('product_exit'), {'product': self.product.pk, 'quantity': 3, 'warehouse': self.izmir.pk})
+        # Depo seçilmezse varsayılan depodan çıkılır
+        self.client.post(reverse('product_exit'), {'product': self.product.pk, 'quantity': 2})
+        self.assertEqual((self.stock(self.central), self.stock(self.izmir)), (8, 1))
+        self.assertEqual(StockBalance.objects.get(product=self.product).on_hand, 9)
+
+        # Hareketin deposu değişince iki deponun bakiyesi de düzelir
+        exit = ExitTransaction.objects.get(warehouse=self.izmir)
+        exit.warehouse = self.central
+        exit.save()
+        self.assertEqual((self.stock(self.central), self.stock(self.izmir)), (5, 4))
+        self.assertEqual(ledger.verify_balances(), [])
+
+        # Arşivlemede devir kayıtları depo başına tutulur
+        archive.archive_movements(timezone.now() + timedelta(days=1))
+        self.assertEqual(EntryTransaction.objects.filter(is_opening_balance=True).count(), 2)
+        WarehouseStock.objects.filter(warehouse=self.izmir).update(on_hand=0)
+        self.assertEqual([item['warehouse_id'] for item in ledger.verify_balances()], [self.izmir.pk])
+        ledger.rebuild_balances()
+        self.assertEqual(ledger.verify_balances(), [])
+        self.assertEqual((self.stock(self.central), self.stock(self.izmir)), (5, 4))
+
+    def test_import_writes_entries_to_shelf_warehouse(self):
+        rows = [{'product': 'Vida', 'quantity': 3, 'shelf': 'B1'}, {'product': 'Pul', 'quantity': 2, 'shelf': 'A1'}]
+        import_entries(rows)
+        self.assertEqual(self.stock(self.izmir), 3)
+        self.assertEqual(
+            list(WarehouseStock.objects.filter(product__name='Pul').values_list('warehouse__code', 'on_hand')), [('merkez', 2)],
+        )
+        self.assertEqual(ledger.verify_balances(), [])
+
+    def test_consolidated_stock_merges_warehouses(self):
+        EntryTransaction.objects.create(product=self.product, quantity=7)
+        EntryTransaction.objects.create(product=self.product, quantity=2, warehouse=self.izmir)
+        empty = Product.objects.create(name='Pul')
+        EntryTransaction.objects.create(product=empty, quantity=1)
+        ExitTransaction.objects.create(product=empty, quantity=1)
+
+        columns, rows = warehouses.consolidated_stock()
+        self.assertEqual([column['code'] for column in columns], ['merkez', 'izmir'])
+        self.assertEqual(rows, [{'name': 'Vida', 'quantity_type': '', 'quantities': [7, 2], 'total': 9}])
+
+        response = self.client.get(reverse('warehouse_stock_api'))
+        self.assertEqual(response.json()['results'][0]['quantities'], [7, 2])
+        response = self.client.get(reverse('warehouse_stock_report'))
+        self.assertContains(response, 'İzmir Depo')
+        response = self.client.get(reverse('product_detail', args=[self.product.pk]))
+        self.assertContains(response, 'Depolardaki Stok')
+
+    @override_settings(DEPO_WAREHOUSE_DATABASES={'izmir': 'izmir'})
+    def test_router_sends_depot_tables_to_selected_database(self):
+        self.assertEqual(database_aliases(), ['default', 'izmir'])
+        self.assertEqual(router.db_for_write(Product), 'default')
+        key = make_cache_key('depo:version:dataset', '', 1)
+        with use_warehouse('izmir'):
+            self.assertEqual(router.db_for_write(Product), 'izmir')
+            self.assertEqual(router.db_for_read(WarehouseStock), 'izmir')
+            # Kullanıcılar ve oturumlar ayrılmaz; okunmuş kayıt kendi veritabanında kalır
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_write(Product, instance=self.product), 'default')
+            self.assertNotEqual(make_cache_key('depo:version:dataset', '', 1), key)
+        with use_warehouse('bilinmiyor'):
+            self.assertEqual(router.db_for_write(Product), 'default')
+
+        depot_router = WarehouseRouter()
+        self.assertTrue(depot_router.allow_migrate('izmir', 'depo'))
+        self.assertFalse(depot_router.allow_migrate('izmir', 'auth'))
+        self.assertIsNone(depot_router.allow_migrate('default', 'auth'))
+
+
+class WarehouseDatabaseTests(TransactionTestCase):
+    """'izmir' deposu gerçek bir ikinci veritabanında; birleşik görünüm iki veritabanını iş
+    parçacıklarında okuduğu için kayıtlar işlem sonunda kalıcı olmalıdır
+    """
+
+    def setUp(self):
+        cache.clear()
+        reference.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.settings['izmir'] = {**connections.settings['default'], 'NAME': os.path.join(directory, 'izmir.sqlite3')}
+        self.addCleanup(connections.settings.pop, 'izmir')
+        self.addCleanup(connections.__delitem__, 'izmir')
+        self.addCleanup(lambda: connections['izmir'].close())
+        self.addCleanup(reference.clear)
+        databases = override_settings(DEPO_WAREHOUSE_DATABASES={'izmir': 'izmir'})
+        databases.enable()
+        self.addCleanup(databases.disable)
+        call_command('migrate', database='izmir', verbosity=0)
+        self.client.force_login(User.objects.create_user('depocu', password='parola'))
+
+    def test_warehouse_database_keeps_its_own_stock(self):
+        # Her veritabanının kendi varsayılan deposu vardır; ikinci bir "merkez" oluşmaz
+        self.assertEqual(list(Warehouse.objects.using('izmir').values_list('code', flat=True)), ['izmir'])
+        product = Product.objects.create(name='Vida')
+        EntryTransaction.objects.create(product=product, quantity=4)
+        self.assertEqual(list(Warehouse.objects.values_list('code', flat=True)), ['merkez'])
+
+        self.client.get(reverse('dashboard'), {'warehouse': 'izmir'})
+        with use_warehouse('izmir'):
+            shelf = Shelf.objects.create(name='B1')
+        self.client.post(reverse('product_entry'), {'product_name': 'Vida', 'quantity': 5, 'shelf': shelf.pk})
+        with use_warehouse('izmir'):
+            izmir_product = Product.objects.get(name='Vida')
+            ledger.record_exit(izmir_product, 3)
+            with self.assertRaises(ledger.InsufficientStock):
+                ledger.record_exit(izmir_product, 3)
+            self.assertEqual(list(WarehouseStock.objects.values_list('warehouse__code', 'on_hand')), [('izmir', 2)])
+            self.assertEqual(ledger.verify_balances(), [])
+        self.assertEqual(StockBalance.objects.get(product=product).on_hand, 4)
+
+        columns, rows = warehouses.consolidated_stock()
+        self.assertEqual([(column['database'], column['code']) for column in columns], [('default', 'merkez'), ('izmir', 'izmir')])
+        self.assertEqual(rows, [{'name': 'Vida', 'quantity_type': '', 'quantities': [4, 2], 'total': 6}])
+
+        # CSV akışı görünüm döndükten sonra okunur; yine de seçili deponun hareketlerini yazar
+        response = self.client.get(reverse('export_transactions_to_csv'))
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual([row[1:3] for row in rows[1:]], [['Giriş', '5'], ['Çıkış', '3']])
+
+        # Bakım komutları --warehouse ile seçilen deponun veritabanında çalışır
+        with self.assertRaises(CommandError):
+            call_command('reconcile_low_stock_alerts', warehouse='ankara', stdout=StringIO())
+        EntryTransaction.objects.using('izmir').update(entry_date=timezone.now() - timedelta(days=2))
+        call_command('take_stock_snapshot', warehouse='izmir', date=str(timezone.localdate() - timedelta(days=1)), stdout=StringIO())
+        self.assertTrue(StockSnapshot.objects.using('izmir').exists())
+        self.assertFalse(StockSnapshot.objects.exists())
@@ -6,11 +6,29 @@ urlpatterns = [
     path('product/<int:pk>/', views.ProductDetailView.as_view(), name='product_detail'),
     path('product_entry/', views.product_entry, name='product_entry'),
     path('product_exit/', views.product_exit, name='product_exit'),
+    path('import/entries/', views.import_entries_view, name='import_entries'),
     path('create_product/', views.create_product, name='create_product'),
     path('shelf_visualization/', views.shelf_visualization, name='shelf_visualization'),
+    path('api/shelves/', views.shelf_data_api, name='shelf_data_api'),
     path('get_product_stock/', views.get_product_stock, name='get_product_stock'),
+    path('api/products/', views.product_list_api, name='product_list_api'),
+    path('api/products/search/', views.product_search_api, name='product_search_api'),
+    path('reports/stock/', views.stock_report, name='stock_report'),
+    path('api/stock-as-of/', views.stock_as_of_api, name='stock_as_of_api'),
+    path('reports/consumption/', views.consumption_report, name='consumption_report'),
+    path('api/consumption/', views.consumption_api, name='consumption_api'),
+    path('reports/warehouses/', views.warehouse_stock_report, name='warehouse_stock_report'),
+    path('api/warehouse-stock/', views.warehouse_stock_api, name='warehouse_stock_api'),
+    path('events/stock/', views.stock_events, name='stock_events'),
+    path('api/stock-events/', views.stock_events_poll, name='stock_events_poll'),
+    path('api/alerts/', views.low_stock_alerts_api, name='low_stock_alerts_api'),
+    path('debug/query-stats/', views.query_stats_view, name='query_stats'),
     path('parameters/', views.parameters_view, name='parameters'),
     path('export/products/', views.export_products_to_excel, name='export_products_to_excel'),
     path('export/transactions/', views.export_transactions_to_excel, name='export_transactions_to_excel'),
+    path('export/transactions/csv/', views.export_transactions_to_csv, name='export_transactions_to_csv'),
     path('export/parameters/', views.export_parameters_to_excel, name='export_parameters_to_excel'),
+    path('export/jobs/', views.export_job_create, name='export_job_create'),
+    path('export/jobs/<uuid:pk>/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<uuid:pk>/download/', views.export_job_download, name='export_job_download'),
 ] 
\ No newline at end of file
@@ -1,27 +1,30 @@
-from django.db.models import Sum, Value
-from django.db.models.functions import Coalesce
-from .models import EntryTransaction, ExitTransaction
+from django.urls import reverse
+from . import fragments
+from .models import Shelf, StockBalance
 
 def calculate_product_stock(product):
     """Ürünün güncel stok miktarını hesaplar"""
-    total_entry = EntryTransaction.objects.filter(product=product).aggregate(total=Coalesce(Sum('quantity'), Value(0)))['total']
-    total_exit = ExitTransaction.objects.filter(product=product).aggregate(total=Coalesce(Sum('quantity'), Value(0)))['total']
-    return max(0, total_entry - total_exit)
+    on_hand = StockBalance.objects.filter(product=product).values_list('on_hand', flat=True).first() or 0
+    return max(0, on_hand)
 
 def get_product_stock_details(product):
     """Ürünün stok detaylarını hesaplar"""
-    total_entry = EntryTransaction.objects.filter(product=product).aggregate(
-        total=Coalesce(Sum('quantity'), Value(0))
-    )['total'] or 0
-    
-    total_exit = ExitTransaction.objects.filter(product=product).aggregate(
-        total=Coalesce(Sum('quantity'), Value(0))
-    )['total'] or 0
-    
-    current_stock = max(0, total_entry - total_exit)
+    balance = StockBalance.objects.filter(product=product).values('total_in', 'total_out', 'on_hand').first()
+    if balance is None:
+        balance = {'total_in': 0, 'total_out': 0, 'on_hand': 0}
     
     return {
-        'total_entry': total_entry,
-        'total_exit': total_exit,
-        'current_stock': current_stock
-    } 
\ No newline at end of file
+        'total_entry': balance['total_in'],
+        'total_exit': balance['total_out'],
+        'current_stock': max(0, balance['on_hand'])
+    }
+
+def get_shelf_data():
+    """Raf -> ürün -> kalan stok yapısı; rafların ürün listeleri parça önbelleğinden gelir (bkz. fragments.py)"""
+    shelves = list(Shelf.objects.order_by('name').values_list('pk', 'name'))
+    blocks = fragments.shelf_blocks([shelf_id for shelf_id, _ in shelves])
+    return [{'id': shelf_id, 'name': name, 'products': blocks[shelf_id]} for shelf_id, name in shelves]
+
+def product_url_template():
+    """Ürün detay adresinin kalıbı; ürün başına reverse() çağırmamak için istemcide {id} doldurulur"""
+    return reverse('product_detail', kwargs={'pk': 0}).replace('/0/', '/{id}/')
@@ -0,0 +1,93 @@
+"""Önbellekte tutulan sürüm sayaçları.
+
+Bir veri kümesi değiştiğinde sayacı artırılır; sürümü anahtarına katan önbellek
+kayıtları böylece silinmeden geçersiz olur. Sayaçlar Django önbelleğinde durduğu için
+paylaşımlı bir önbellek arka ucuyla (ör. FileBasedCache) süreçler arasında da geçerlidir.
+
+Önbellek süreç içiyse (LocMemCache) bir süreçteki artış diğer süreçlere ulaşmaz; sayaca bağlı
+kayıtlar bu durumda cache_timeout() ile en fazla DEPO_LOCAL_CACHE_SECONDS saniye tutulur.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+KEY_PREFIX = 'depo:version:'
+
+# depo uygulamasındaki herhangi bir kayıt değiştiğinde artırılır
+DATASET = 'dataset'
+
+# Tüketim analizi toplamları; çıkış değiştirildiğinde ya da silindiğinde artırılır (bkz. analytics.py)
+CONSUMPTION = 'consumption'
+
+# Miktar türü, raf ya da departman tablosu değiştiğinde artırılır (bkz. reference.py)
+REFERENCE = 'reference'
+
+# Raf ya da miktar türü eklendiğinde, değiştiğinde ya da silindiğinde artırılır
+PARAMETERS = 'parameters'
+
+
+def process_local():
+    """Sayaçlar süreç içi bir önbellekte mi (artışlar diğer süreçlere ulaşmaz)"""
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def cache_timeout(seconds):
+    """Sürüm sayacına bağlı bir kaydın önbellek süresi; süreç içi önbellekte kısaltılır"""
+    if process_local():
+        return min(seconds, settings.DEPO_LOCAL_CACHE_SECONDS)
+    return seconds
+
+
+def _key(name):
+    return f'{KEY_PREFIX}{name}'
+
+
+def _initial():
+    # Sayaç önbellekten düşerse eski sürümlerle çakışmasın diye zamana bağlı başlar
+    return time.time_ns() // 1000
+
+
+def get_version(name):
+    key = _key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(names):
+    """Birden fazla sayacı tek önbellek çağrısıyla okur, {ad: sürüm} döner"""
+    keys = {_key(name): name for name in names}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        initial = _initial()
+        for key in missing:
+            cache.add(key, initial, timeout=None)
+        found.update(cache.get_many(missing))
+        # Dolu bir önbellek yeni eklenen sayacı hemen silmiş olabilir
+        for key in missing:
+            found.setdefault(key, initial)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def product_stock(product_id):
+    """Ürünün stok bilgisinin sürüm sayacı adı"""
+    return f'stock:{product_id}'
+
+
+def shelf_contents(shelf_id):
+    """Raftaki ürünlerin (ad, stok, miktar türü) sürüm sayacı adı"""
+    return f'shelf:{shelf_id}'
+
+
+def bump_version(*names):
+    for name in names:
+        key = _key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), timeout=None)
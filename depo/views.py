@@ -1,12 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Sum, Value, F, CharField, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.db.models import Count, Sum, Value
 from django.db.models.functions import Coalesce
-from django.http import HttpResponse, JsonResponse
-from .models import Product, QuantityType, Shelf, Department, EntryTransaction, ExitTransaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_http_methods, require_POST
+from .models import Product, QuantityType, Shelf, Department, EntryTransaction, StockBalance, ExportJob
 from .forms import (
     ProductForm,
     EntryTransactionForm,
@@ -14,9 +22,35 @@ from .forms import (
     QuantityTypeForm,
     ShelfForm,
     DepartmentForm,
+    product_choice_label,
+    product_choices,
 )
-from .utils import calculate_product_stock, get_product_stock_details
-import pandas as pd
+from .utils import get_shelf_data, product_url_template
+from .listing import InvalidCursor, InvalidFilter, product_page, serialize_product
+from .parsing import parse_day, parse_int
+from .snapshots import end_of_day, totals_as_of
+from .history import InvalidHistoryFilter, movement_history, parse_history_filters
+from .exports import (
+    TRANSACTION_HEADERS,
+    InvalidExportFilter,
+    export_parameters,
+    export_products,
+    export_transactions,
+    iter_csv,
+    parse_transaction_filters,
+    transaction_rows,
+)
+from .jobs import submit_export
+from .imports import ImportFileError, import_entries, read_rows
+from .ledger import InsufficientStock, record_exit
+from .alerts import open_alerts
+from .warehouses import consolidated_stock, product_warehouses
+from .routers import current_database
+from . import fragments, instrumentation, live, reference, search
+from .caching import MAX_PRODUCTS as MAX_STOCK_PRODUCTS, get_stock_payloads, stock_etag, stock_versions
+import json
+import os
+import tempfile
 from datetime import datetime  # Eksikti, Excel export için gerekli
 
 class DashboardView(LoginRequiredMixin, ListView):
@@ -24,24 +58,28 @@ class DashboardView(LoginRequiredMixin, ListView):
     template_name = 'depo/dashboard.html'
     context_object_name = 'products'
 
-    def get_queryset(self):
-        return Product.objects.annotate(
-            total_entry=Coalesce(Sum('entrytransaction__quantity'), Value(0)),
-            total_exit=Coalesce(Sum('exittransaction__quantity'), Value(0)),
-            stock_calc=F('total_entry') - F('total_exit')  # isim değişti!
-        ).order_by('name')
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        queryset = list(self.get_queryset())
-        context['total_products'] = len(queryset)
-        context['total_stock'] = sum(p.stock_calc for p in queryset)
-        context['products'] = queryset
+        # Sadece ilk sayfa sunucuda çizilir, kalanı product_list_api ile yüklenir
+        try:
+            products, next_cursor = product_page(self.request.GET)
+        except (InvalidCursor, InvalidFilter):
+            messages.error(self.request, 'Geçersiz filtre, tüm ürünler listeleniyor.')
+            products, next_cursor = product_page({})
+        totals = StockBalance.objects.aggregate(total_products=Count('pk'), total_stock=Coalesce(Sum('on_hand'), Value(0)))
+        context['total_products'] = totals['total_products']
+        context['total_stock'] = totals['total_stock']
+        context['products'] = products
+        context['product_rows'] = fragments.product_rows(products)
+        context['next_cursor'] = next_cursor
+        # Canlı güncellemeler bu olaydan sonrasından başlar; sayfa çizilirken yapılan işlemler kaçmaz
+        context['live_last_id'] = live.get_broker().last_id
+        context['live_updates'] = settings.DEPO_LIVE_UPDATES
         context['entry_form'] = EntryTransactionForm()
         context['exit_form'] = ExitTransactionForm()
         context['product_form'] = ProductForm()
-        context['quantity_types'] = QuantityType.objects.all()
-        context['shelves'] = Shelf.objects.all()
+        context['quantity_types'] = reference.objects(QuantityType)
+        context['shelves'] = reference.objects(Shelf)
         return context
 
 class ProductDetailView(DetailView):
@@ -49,45 +87,32 @@ class ProductDetailView(DetailView):
     template_name = 'depo/product_detail.html'
     context_object_name = 'product'
 
+    def get_queryset(self):
+        return Product.objects.with_stock().select_related('quantity_type', 'shelf')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        product = self.get_object()
-
-        # Giriş işlemleri
-        entry_transactions = EntryTransaction.objects.filter(product=product).annotate(
-            transaction_type=Value('Giriş', output_field=CharField()),
-            department_name=Value('Depo', output_field=CharField())  # Giriş işlemleri için sabit
-        ).values('entry_date', 'quantity', 'transaction_type', 'department_name')
-
-        # Çıkış işlemleri
-        exit_transactions = ExitTransaction.objects.filter(product=product).annotate(
-            transaction_type=Value('Çıkış', output_field=CharField()),
-            department_name=F('department__name')
-        ).values('exit_date', 'quantity', 'transaction_type', 'department_name')
-
-        # Tüm işlemleri birleştir ve sırala
-        all_transactions = []
-
-        for entry in entry_transactions:
-            all_transactions.append({
-                'date': entry['entry_date'],
-                'quantity': entry['quantity'],
-                'transaction_type': entry['transaction_type'],
-                'department_name': entry['department_name']
-            })
-
-        for exit in exit_transactions:
-            all_transactions.append({
-                'date': exit['exit_date'],
-                'quantity': exit['quantity'],
-                'transaction_type': exit['transaction_type'],
-                'department_name': exit['department_name'] or 'Bilinmiyor'
-            })
-
-        all_transactions.sort(key=lambda x: x['date'], reverse=True)
-
-        context['transactions'] = all_transactions
-        context['current_stock'] = product.calculated_stock  # Burada artık property kullanıyoruz
+        product = self.object
+
+        try:
+            filters = parse_history_filters(self.request.GET)
+            transactions, next_cursor = movement_history(product.pk, filters, self.request.GET.get('cursor'))
+        except (InvalidHistoryFilter, InvalidCursor):
+            messages.error(self.request, 'Geçersiz filtre, tüm hareketler listeleniyor.')
+            transactions, next_cursor = movement_history(product.pk)
+
+        next_url = None
+        if next_cursor:
+            params = self.request.GET.copy()
+            params['cursor'] = next_cursor
+            next_url = f'?{params.urlencode()}'
+
+        context['transactions'] = transactions
+        context['next_url'] = next_url
+        context['history_filters'] = {key: self.request.GET.get(key, '') for key in ('date_from', 'date_to', 'department')}
+        context['departments'] = reference.objects(Department)
+        context['current_stock'] = product.current_stock
+        context['warehouse_stocks'] = product_warehouses(product.pk)
         return context
 
 
@@ -119,9 +144,11 @@ def product_entry(request):
             else:
                 product = product_select
             
+            # Giriş, seçilen rafın deposuna yazılır
             entry = EntryTransaction.objects.create(
                 product=product,
-                quantity=form.cleaned_data['quantity']
+                quantity=form.cleaned_data['quantity'],
+                warehouse_id=form.cleaned_data['shelf'].warehouse_id,
             )
             
             product.shelf = form.cleaned_data['shelf']
@@ -141,14 +168,13 @@ def product_exit(request):
             product = form.cleaned_data['product']
             quantity = form.cleaned_data['quantity']
 
-            current_stock = product.calculated_stock  # sadece oku
-
-            if quantity > current_stock:
+            # Stok, kilit altında yeniden kontrol edilerek düşülür
+            try:
+                record_exit(product, quantity, form.cleaned_data['department'], form.cleaned_data['warehouse'])
+            except InsufficientStock:
                 messages.error(request, 'Yetersiz stok!')
                 return redirect('dashboard')
 
-            exit = form.save()
-
             # stok sıfırsa rafı temizle
             if product.calculated_stock == 0:
                 product.shelf = None
@@ -160,6 +186,26 @@ def product_exit(request):
         form = ExitTransactionForm()
     return render(request, 'depo/exit_form.html', {'form': form})
 
+@login_required
+def import_entries_view(request):
+    if request.method != 'POST':
+        return render(request, 'depo/entry_import.html')
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'Dosya seçilmedi.'}, status=400)
+    try:
+        rows = read_rows(upload, upload.name)
+    except ImportFileError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    result = import_entries(
+        rows,
+        partial=request.POST.get('partial') == 'on',
+        dry_run=request.POST.get('dry_run') == 'on',
+    )
+    return JsonResponse(result, status=200 if not result['summary']['errors'] else 422)
+
 def parameters_view(request):
     if request.method == 'POST':
         form_type = request.POST.get('form_type')
@@ -182,14 +228,10 @@ def parameters_view(request):
         
         return redirect('parameters')
     
-    quantity_types = QuantityType.objects.all()
-    shelves = Shelf.objects.all()
-    departments = Department.objects.all()
-    
     context = {
-        'quantity_types': quantity_types,
-        'shelves': shelves,
-        'departments': departments,
+        'quantity_types': reference.objects(QuantityType),
+        'shelves': reference.objects(Shelf),
+        'departments': reference.objects(Department),
         'quantity_type_form': QuantityTypeForm(),
         'shelf_form': ShelfForm(),
         'department_form': DepartmentForm(),
@@ -221,108 +263,396 @@ def create_department(request):
     return redirect('parameters')
 
 def export_products_to_excel(request):
-    products = Product.objects.all()
-    data = []
-    
-    for product in products:
-        data.append({
-            'Ürün Adı': product.name,
-            'Miktar Türü': product.quantity_type.name if product.quantity_type else '',
-            'Raf Numarası': product.shelf.name if product.shelf else '',
-            'Minimum Miktar': product.minimum_quantity,
-            'Mevcut Stok': product.calculated_stock
-        })
-    
-    df = pd.DataFrame(data)
     response = HttpResponse(content_type='application/vnd.ms-excel')
     response['Content-Disposition'] = f'attachment; filename=products_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    df.to_excel(response, index=False)
+    export_products(response)
     return response
 
 def export_transactions_to_excel(request):
-    entries = EntryTransaction.objects.all()
-    exits = ExitTransaction.objects.all()
-    data = []
-    
-    for entry in entries:
-        data.append({
-            'Ürün': entry.product.name,
-            'İşlem Türü': 'Giriş',
-            'Miktar': entry.quantity,
-            'Departman': 'Depo',
-            'Tarih': entry.entry_date.strftime('%Y-%m-%d %H:%M:%S')
-        })
-    
-    for exit in exits:
-        data.append({
-            'Ürün': exit.product.name,
-            'İşlem Türü': 'Çıkış',
-            'Miktar': exit.quantity,
-            'Departman': exit.department.name if exit.department else '',
-            'Tarih': exit.exit_date.strftime('%Y-%m-%d %H:%M:%S')
-        })
-    
-    df = pd.DataFrame(data)
-    response = HttpResponse(content_type='application/vnd.ms-excel')
-    response['Content-Disposition'] = f'attachment; filename=transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    df.to_excel(response, index=False)
+    try:
+        filters = parse_transaction_filters(request.GET)
+    except InvalidExportFilter as exc:
+        return JsonResponse({'error': f'Invalid filter: {exc}'}, status=400)
+
+    output = export_transactions(tempfile.TemporaryFile(), **filters)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+def export_transactions_to_csv(request):
+    try:
+        filters = parse_transaction_filters(request.GET)
+    except InvalidExportFilter as exc:
+        return JsonResponse({'error': f'Invalid filter: {exc}'}, status=400)
+
+    response = StreamingHttpResponse(
+        iter_csv(TRANSACTION_HEADERS, transaction_rows(**filters, using=current_database())),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename=transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
     return response
 
 def export_parameters_to_excel(request):
-    quantity_types = QuantityType.objects.all()
-    shelves = Shelf.objects.all()
-    departments = Department.objects.all()
-    
-    data = {
-        'Miktar Türleri': pd.DataFrame([{'Miktar Türü': qt.name} for qt in quantity_types]),
-        'Raflar': pd.DataFrame([{'Raf Numarası': shelf.name} for shelf in shelves]),
-        'Departmanlar': pd.DataFrame([{'Departman Adı': dept.name} for dept in departments])
-    }
-    
     response = HttpResponse(content_type='application/vnd.ms-excel')
     response['Content-Disposition'] = f'attachment; filename=parameters_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        for sheet_name, df in data.items():
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-    
+    export_parameters(response)
     return response
 
+def export_job_payload(job):
+    return {
+        'id': str(job.pk),
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'error': job.error if job.status == ExportJob.STATUS_FAILED else '',
+        'status_url': reverse('export_job_status', args=[job.pk]),
+        'download_url': reverse('export_job_download', args=[job.pk]) if job.status == ExportJob.STATUS_DONE else None,
+    }
+
+@require_POST
+def export_job_create(request):
+    try:
+        job = submit_export(request.POST.get('kind', ''), request.POST)
+    except (ValueError, InvalidExportFilter) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(export_job_payload(job), status=202)
+
+def export_job_status(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk)
+    return JsonResponse(export_job_payload(job))
+
+def export_job_download(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk)
+    if job.status != ExportJob.STATUS_DONE or not os.path.exists(job.file_path):
+        return JsonResponse(export_job_payload(job), status=409)
+    return FileResponse(
+        open(job.file_path, 'rb'),
+        as_attachment=True,
+        filename=os.path.basename(job.file_path),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+def _requested_product_ids(request):
+    """?product_id=1,2,3, form verisi ya da {"product_ids": [...]} JSON gövdesinden ID listesi çıkarır"""
+    if request.method == 'POST' and request.content_type == 'application/json':
+        try:
+            raw = json.loads(request.body).get('product_ids', [])
+        except (ValueError, AttributeError):
+            raise ValueError('Invalid JSON body')
+        if not isinstance(raw, list):
+            raise ValueError('product_ids must be a list')
+    else:
+        data = request.POST if request.method == 'POST' else request.GET
+        raw = [part for value in data.getlist('product_id') for part in value.split(',') if part.strip()]
+    return list(dict.fromkeys(parse_int(value) for value in raw))
+
+@require_http_methods(['GET', 'POST'])
 def get_product_stock(request):
-    product_id = request.GET.get('product_id')
-    if product_id:
-        product = get_object_or_404(Product, id=product_id)
-        current_stock = calculate_product_stock(product)
-        return JsonResponse({
-            'current_stock': current_stock,
-            'quantity_type': product.quantity_type.name if product.quantity_type else ''
-        })
-    return JsonResponse({'error': 'Product ID is required'}, status=400)
+    try:
+        product_ids = _requested_product_ids(request)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Product IDs must be integers'}, status=400)
+    if not product_ids:
+        return JsonResponse({'error': 'Product ID is required'}, status=400)
+    if len(product_ids) > MAX_STOCK_PRODUCTS:
+        return JsonResponse({'error': f'At most {MAX_STOCK_PRODUCTS} products can be requested'}, status=400)
+
+    versions = stock_versions(product_ids)
+    etag = stock_etag(versions)
+    if request.method == 'GET' and etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        payloads = get_stock_payloads(versions)
+        batch = request.method == 'POST' or ',' in request.GET.get('product_id', '') or len(product_ids) > 1
+        if batch:
+            response = JsonResponse({'results': {str(product_id): payloads[product_id] for product_id in product_ids if product_id in payloads}})
+        elif product_ids[0] in payloads:
+            response = JsonResponse(payloads[product_ids[0]])
+        else:
+            return JsonResponse({'error': 'Product not found'}, status=404)
+    response['ETag'] = etag
+    # Tarayıcı her seferinde ETag ile doğrulasın
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@login_required
+def product_list_api(request):
+    try:
+        limit = int(request.GET.get('limit', 50))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    try:
+        products, next_cursor = product_page(request.GET, limit)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    except InvalidFilter as exc:
+        return JsonResponse({'error': f'{exc} must be an integer'}, status=400)
+    return JsonResponse({
+        'results': [serialize_product(product) for product in products],
+        'next_cursor': next_cursor,
+        'html': fragments.product_rows(products),
+    })
+
+PRODUCT_SEARCH_LIMIT = 20
+
+
+@login_required
+def product_search_api(request):
+    # Giriş/çıkış formlarındaki ürün seçimi için; sonuçlar arama indeksinin alaka sırasıyla gelir
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'results': []})
+    try:
+        limit = max(1, min(int(request.GET.get('limit', PRODUCT_SEARCH_LIMIT)), 50))
+    except ValueError:
+        return JsonResponse({'error': 'Geçersiz limit'}, status=400)
+    ids = search.search(query, limit)
+    found = product_choices().in_bulk(ids)
+    products = [found[pk] for pk in ids if pk in found]
+    return JsonResponse({'results': [
+        {
+            'id': product.pk,
+            'name': product.name,
+            'label': product_choice_label(product),
+            'current_stock': product.current_stock,
+            'quantity_type': product.quantity_type.name if product.quantity_type else '',
+        }
+        for product in products
+    ]})
+
+@login_required
+def low_stock_alerts_api(request):
+    return JsonResponse({'results': [
+        {
+            'id': alert.pk,
+            'product_id': alert.product_id,
+            'product_name': alert.product.name,
+            'quantity_type': alert.product.quantity_type.name if alert.product.quantity_type else '',
+            'current_stock': alert.current_stock,
+            'minimum_quantity': alert.current_minimum,
+            'opened_at': alert.opened_at.isoformat(),
+        }
+        for alert in open_alerts()
+    ]})
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def query_stats_view(request):
+    # POST tabloyu sıfırlar (ör. bir değişikliğin öncesini/sonrasını karşılaştırmak için)
+    if request.method == 'POST':
+        instrumentation.reset()
+        fragments.reset()
+    return JsonResponse({
+        'enabled': settings.DEPO_QUERY_STATS,
+        'sample_size': instrumentation.SAMPLE_SIZE,
+        'results': instrumentation.summary(),
+        'fragment_cache': fragments.stats(),
+    })
+
+def _live_updates_available(request):
+    # WSGI'da akış ve uzun sorgulama bağlantı boyunca bir worker'ı tutar; olay kuyruğu süreç içi
+    # olduğu için birden fazla süreçte de güvenilir değildir (bkz. live.py)
+    return settings.DEPO_LIVE_UPDATES and isinstance(request, ASGIRequest)
+
+async def stock_events(request):
+    """Dashboard için Server-Sent Events akışı (sadece ASGI altında)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=403)
+    if not _live_updates_available(request):
+        # 204 tarayıcının yeniden bağlanmasını durdurur; istemci uzun sorgulamayı dener
+        return HttpResponse(status=204)
+    last_id = live.parse_last_id(request.headers.get('Last-Event-ID') or request.GET.get('last_id'))
+    broker = live.get_broker()
+    response = StreamingHttpResponse(
+        live.sse_stream(broker.last_id if last_id is None else last_id, source=broker), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+async def stock_events_poll(request):
+    """SSE kullanılamadığında uzun sorgulama: last_id'den sonraki olayları ya da LONG_POLL_SECONDS sonra boş liste döner"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=403)
+    if not _live_updates_available(request):
+        # İstemci canlı güncellemeyi bırakır
+        return HttpResponse(status=204)
+    last_id = live.parse_last_id(request.GET.get('last_id'))
+    broker = live.get_broker()
+    if last_id is None:
+        return JsonResponse({'last_id': broker.last_id, 'events': [], 'reload': False})
+    events, reload = await broker.wait(last_id, live.LONG_POLL_SECONDS)
+    return JsonResponse({
+        'last_id': events[-1][0] if events else (broker.last_id if reload else last_id),
+        'events': [data for _, data in events],
+        'reload': reload,
+    })
+
+def _as_of_moment(value):
+    """Rapor tarihini (gün sonu) döner; boşsa bugünün sonu, hatalıysa None"""
+    if not value:
+        return timezone.localdate(), end_of_day(timezone.localdate())
+    day = parse_day(value)
+    if day is None:
+        return None, None
+    return day, end_of_day(day)
+
+@login_required
+def stock_report(request):
+    day, moment = _as_of_moment(request.GET.get('date'))
+    if moment is None:
+        messages.error(request, 'Geçersiz tarih, bugünün stoğu gösteriliyor.')
+        day, moment = _as_of_moment(None)
+
+    products = Product.objects.select_related('quantity_type', 'shelf').order_by('name', 'pk')
+    page = Paginator(products, 100).get_page(request.GET.get('page'))
+    totals, cutoff = totals_as_of(moment, [product.pk for product in page])
+    rows = [
+        {'product': product, 'total_in': totals[product.pk][0], 'total_out': totals[product.pk][1],
+         'on_hand': totals[product.pk][0] - totals[product.pk][1]}
+        for product in page
+    ]
+    return render(request, 'depo/stock_report.html', {
+        'day': day,
+        'snapshot_at': cutoff,
+        'rows': rows,
+        'page_obj': page,
+    })
+
+@login_required
+def stock_as_of_api(request):
+    day, moment = _as_of_moment(request.GET.get('date'))
+    if moment is None:
+        return JsonResponse({'error': 'date must be YYYY-MM-DD'}, status=400)
+    try:
+        product_ids = _requested_product_ids(request) or None
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Product IDs must be integers'}, status=400)
+
+    totals, cutoff = totals_as_of(moment, product_ids)
+    stock = {product_id: total_in - total_out for product_id, (total_in, total_out) in totals.items()}
+    if product_ids is not None:
+        results = {str(product_id): stock.get(product_id, 0) for product_id in product_ids}
+    else:
+        results = {str(product_id): on_hand for product_id, on_hand in stock.items() if on_hand}
+    return JsonResponse({
+        'date': day.isoformat(),
+        'snapshot_at': cutoff.isoformat() if cutoff else None,
+        'results': results,
+    })
+
+@login_required
+def warehouse_stock_report(request):
+    columns, rows = consolidated_stock()
+    page = Paginator(rows, 100).get_page(request.GET.get('page'))
+    return render(request, 'depo/warehouse_stock.html', {
+        'columns': columns,
+        'rows': page.object_list,
+        'page_obj': page,
+    })
+
+@login_required
+def warehouse_stock_api(request):
+    columns, rows = consolidated_stock()
+    return JsonResponse({'warehouses': columns, 'results': rows})
+
+def _consumption_row(row):
+    # NaN (tüketimi olmayan ürünün yeterlilik süresi) JSON'da ve şablonda boş değer olur
+    return {
+        'on_hand': int(row.on_hand),
+        'consumed': int(row.consumed),
+        'daily_rate': round(row.daily_rate, 2),
+        'daily_std': round(row.daily_std, 2),
+        'days_of_cover': None if row.days_of_cover != row.days_of_cover else round(row.days_of_cover, 1),
+        'reorder_point': int(row.reorder_point),
+        'reorder_quantity': int(row.reorder_quantity),
+    }
+
+def _consumption_departments(state):
+    from . import analytics
+
+    report = analytics.department_report(state)
+    departments = [reference.get(Department, department_id) for department_id in report.index]
+    return [
+        {
+            'department_id': department_id or None,
+            'name': department.name if department else 'Departmansız',
+            'consumed': int(row.consumed),
+            'daily_rate': round(row.daily_rate, 2),
+            'share': round(row.share, 4),
+            'products': int(row.products),
+        }
+        for department_id, department, row in zip(report.index, departments, report.itertuples())
+    ]
+
+def _filtered_consumption(report, request, all_products):
+    if not all_products:
+        report = report[report['consumed'] > 0]
+    if request.GET.get('reorder') == '1':
+        report = report[report['reorder_quantity'] > 0]
+    # Stoğu en önce bitecek ürünler başta
+    return report.sort_values(['days_of_cover', 'consumed'], ascending=[True, False], na_position='last')
+
+@login_required
+def consumption_report(request):
+    # pandas/NumPy sadece tüketim analizi açıldığında yüklenir
+    from . import analytics
+
+    state = analytics.consumption_state()
+    report = _filtered_consumption(analytics.product_report(state=state), request, all_products=False)
+    page = Paginator(report.index.tolist(), 100).get_page(request.GET.get('page'))
+    products = Product.objects.select_related('quantity_type', 'shelf').in_bulk(page.object_list)
+    rows = [
+        {'product': products[product_id], **_consumption_row(row)}
+        for product_id, row in zip(page.object_list, report.loc[page.object_list].itertuples())
+        if product_id in products
+    ]
+    return render(request, 'depo/consumption_report.html', {
+        'rows': rows,
+        'page_obj': page,
+        'reorder_only': request.GET.get('reorder') == '1',
+        'departments': _consumption_departments(state),
+        'window_days': settings.DEPO_CONSUMPTION_WINDOW_DAYS,
+        'lead_days': settings.DEPO_REORDER_LEAD_DAYS,
+        'cover_days': settings.DEPO_REORDER_COVER_DAYS,
+    })
+
+@login_required
+def consumption_api(request):
+    try:
+        product_ids = _requested_product_ids(request) or None
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Product IDs must be integers'}, status=400)
+    from . import analytics
+
+    state = analytics.consumption_state()
+    report = _filtered_consumption(analytics.product_report(product_ids, state), request, all_products=product_ids is not None)
+    results = []
+    by_department = analytics.product_departments(report.index.tolist(), state) if product_ids is not None else {}
+    for product_id, row in zip(report.index, report.itertuples()):
+        result = {'product_id': int(product_id), **_consumption_row(row)}
+        if product_ids is not None:
+            result['departments'] = {
+                str(department_id or ''): quantity for department_id, quantity in by_department[product_id].items()
+            }
+        results.append(result)
+    return JsonResponse({
+        'window_days': settings.DEPO_CONSUMPTION_WINDOW_DAYS,
+        'lead_days': settings.DEPO_REORDER_LEAD_DAYS,
+        'cover_days': settings.DEPO_REORDER_COVER_DAYS,
+        'results': results,
+        'departments': _consumption_departments(state),
+    })
 
 def shelf_visualization(request):
-    shelves = Shelf.objects.all().order_by('name')
-    shelf_data = []
-    
-    for shelf in shelves:
-        products = Product.objects.filter(shelf=shelf)
-        product_data = []
-        
-        for product in products:
-            total_entry = EntryTransaction.objects.filter(product=product).aggregate(total=Coalesce(Sum('quantity'), Value(0)))['total']
-            total_exit = ExitTransaction.objects.filter(product=product).aggregate(total=Coalesce(Sum('quantity'), Value(0)))['total']
-            current_stock = max(0, total_entry - total_exit)
-            
-            if current_stock > 0:
-                product_data.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'quantity': current_stock,
-                    'quantity_type': product.quantity_type.name if product.quantity_type else ''
-                })
-        
-        shelf_data.append({
-            'name': shelf.name,
-            'products': product_data
-        })
-    
-    return render(request, 'depo/shelf_visualization.html', {'shelf_data': shelf_data})
+    return render(request, 'depo/shelf_visualization.html', {
+        'shelf_data': {'product_url': product_url_template(), 'shelves': get_shelf_data()},
+    })
+
+def shelf_data_api(request):
+    return JsonResponse({'product_url': product_url_template(), 'shelves': get_shelf_data()})
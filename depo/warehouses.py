@@ -0,0 +1,78 @@
+"""Depo bakiyeleri ve depolar arası birleşik stok görünümü.
+
+Birleşik görünümde her depo veritabanı (bkz. routers.py) ayrı bir iş parçacığında paralel okunur
+ve satırlar ürün adına göre birleştirilir; toplam süre en yavaş veritabanınınki kadar olur. Ürün
+id'leri veritabanları arasında çakıştığı için eşleştirme benzersiz olan ürün adıyla yapılır. Depo
+veritabanı yoksa sorgular istek içinde çalışır.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+from .models import Warehouse, WarehouseStock
+from .routers import database_aliases
+
+
+def product_warehouses(product_id):
+    """Ürünün depolardaki bakiyeleri: [(depo, WarehouseStock)], depo sırasıyla"""
+    stocks = WarehouseStock.objects.filter(product_id=product_id).select_related('warehouse').order_by('warehouse_id')
+    return [(stock.warehouse, stock) for stock in stocks]
+
+
+def _read_database(alias):
+    warehouses = list(Warehouse.objects.using(alias).order_by('pk').values_list('pk', 'code', 'name'))
+    # Bakiyesi sıfır olan satırlar birleşik görünümde yer almaz
+    stocks = list(
+        WarehouseStock.objects.using(alias)
+        .exclude(on_hand=0)
+        .order_by()
+        .values_list('warehouse_id', 'product__name', 'product__quantity_type__name', 'on_hand')
+    )
+    return warehouses, stocks
+
+
+def _read_in_worker(alias):
+    try:
+        return _read_database(alias)
+    finally:
+        # İş parçacığının açtığı bağlantılar havuza geri dönmez, kapatılır
+        connections.close_all()
+
+
+def read_databases(aliases=None):
+    """Her veritabanının (depolar, bakiye satırları) çifti; birden fazla veritabanı paralel okunur"""
+    aliases = list(aliases or database_aliases())
+    if len(aliases) == 1:
+        return [_read_database(aliases[0])]
+    with ThreadPoolExecutor(max_workers=len(aliases), thread_name_prefix='depo-warehouse') as executor:
+        return list(executor.map(_read_in_worker, aliases))
+
+
+def consolidated_stock(aliases=None):
+    """Tüm depoların stoğu: (sütunlar, satırlar).
+
+    Sütunlar {'database', 'code', 'name'} sözlükleridir. Satırlar ada göre sıralı
+    {'name', 'quantity_type', 'quantities', 'total'} sözlükleridir; quantities sütun sırasındadır.
+    """
+    aliases = list(aliases or database_aliases())
+    results = read_databases(aliases)
+
+    columns = []
+    positions = {}
+    for alias, (warehouses, _) in zip(aliases, results):
+        for pk, code, name in warehouses:
+            positions[alias, pk] = len(columns)
+            columns.append({'database': alias, 'code': code, 'name': name})
+
+    products = {}
+    for alias, (_, stocks) in zip(aliases, results):
+        for warehouse_id, product_name, quantity_type, on_hand in stocks:
+            row = products.get(product_name)
+            if row is None:
+                row = products[product_name] = {'name': product_name, 'quantity_type': quantity_type or '', 'quantities': [0] * len(columns)}
+            row['quantities'][positions[alias, warehouse_id]] += on_hand
+
+    rows = sorted(products.values(), key=lambda row: row['name'])
+    for row in rows:
+        row['total'] = sum(row['quantities'])
+    return columns, rows